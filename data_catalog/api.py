@@ -0,0 +1,104 @@
+"""A read-only JSON API for the data catalog's resources."""
+
+from hashlib import md5
+
+from django.http import HttpResponse, HttpResponseNotModified
+
+from data_catalog import caching, databases
+from data_catalog.databases import replica_reads
+from data_catalog.export import EXPORT_MODELS, export as export_catalog
+from data_catalog.models import App, Data, Project
+from data_catalog.pagination import CursorPaginator, InvalidCursor
+from data_catalog.serializers import FIELDS, model_label, serialize
+from data_catalog.utils import JSONResponse, filter_by_tags, prefetch_tags
+
+
+AVAILABLE_MODELS = {'apps': App, 'data': Data, 'projects': Project}
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def error(message, status_code=400):
+    response = JSONResponse({'error': message})
+    response.status_code = status_code
+    return response
+
+
+def etag(request, model):
+    """
+    A strong ETag for a request, built from the model's change counter and
+    the query string, so it can be checked without reading any rows.
+    """
+    version = caching.get_version(model.type)
+    query = md5(request.META.get('QUERY_STRING', '')).hexdigest()
+    return '"%s-%s-%s"' % (model.type, version, query)
+
+
+@replica_reads
+def resources(request, resource_type):
+    """
+    List apps, data or projects. Takes a comma separated list of `fields`,
+    any number of `tag` filters that a resource must all have (or any of,
+    with `match=any`), a `limit`, and the `after` token from the previous
+    page.
+    """
+    model = AVAILABLE_MODELS[resource_type]
+    tag = etag(request, model)
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if tag in [t.strip() for t in if_none_match.split(',')]:
+        response = HttpResponseNotModified()
+        response['ETag'] = tag
+        return response
+    available_fields = list(FIELDS[model_label(model)]) + ['tags']
+    fields = request.GET.get('fields')
+    fields = fields.split(',') if fields else available_fields
+    unknown = [field for field in fields if field not in available_fields]
+    if unknown:
+        return error('Unknown fields: %s' % ', '.join(unknown))
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return error('The limit must be a number.')
+    if not 1 <= limit <= MAX_LIMIT:
+        return error('The limit must be from 1 to %d.' % MAX_LIMIT)
+    queryset = filter_by_tags(model.objects.all(), request.GET.getlist('tag'),
+                              request.GET.get('match') == 'any')
+    try:
+        page = CursorPaginator(queryset.distinct(), limit).page(
+            request.GET.get('after'))
+    except InvalidCursor:
+        return error('Invalid after token.')
+    object_list = page.object_list
+    if 'tags' in fields:
+        object_list = prefetch_tags(object_list)
+    objects = []
+    for instance in object_list:
+        data = serialize(instance)
+        data['tags'] = [t.name for t in getattr(instance, 'tag_list', [])]
+        objects.append(dict((field, data[field]) for field in fields))
+    response = JSONResponse({'objects': objects, 'next': page.next_token})
+    # A replica that's behind a write may have answered with less than the
+    # version in the tag.
+    if databases.can_cache():
+        response['ETag'] = tag
+    return response
+
+
+@replica_reads
+def export(request, format):
+    """
+    Stream every resource, or those of the requested `type`s, as NDJSON or
+    CSV. The export is gzipped on the fly for clients that accept it.
+    """
+    types = request.GET.getlist('type')
+    unknown = [name for name in types if name not in EXPORT_MODELS]
+    if unknown:
+        return error('Unknown types: %s' % ', '.join(unknown))
+    gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    chunks, content_type = export_catalog(format, types, gzip)
+    response = HttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename=catalog.%s' % format
+    response['Vary'] = 'Accept-Encoding'
+    if gzip:
+        response['Content-Encoding'] = 'gzip'
+    return response
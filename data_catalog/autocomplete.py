@@ -0,0 +1,185 @@
+"""An in-memory tag index for the search bar's autocomplete."""
+
+import heapq
+import threading
+import time
+
+from django.db.models import Count
+from taggit.models import Tag
+
+from data_catalog import caching
+
+# The shared cache version other processes' indexes are checked against.
+VERSION = 'tag'
+
+
+class TagIndex(object):
+    """
+    Tag names held in memory, ranked by how many resources use them. Every
+    lowercased name is indexed by its n-grams of up to `gram_size`
+    characters, so a query of that length is a single lookup and a longer
+    one is the intersection of its n-grams. The index is loaded from the
+    database on first use, then kept up to date by taggit's signals. Tag
+    changes made by other processes are noticed through a version in the
+    shared cache, checked every `check_interval` seconds, which reloads
+    the index.
+    """
+    gram_size = 3
+    # Past this many matches per result wanted, walk the tags in usage
+    # order rather than ranking every match.
+    scan_ratio = 20
+    check_interval = 5
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        """Drop everything, so the index is reloaded on its next search."""
+        with self.lock:
+            self.loaded = False
+            self.version = None
+            self.checked_at = 0
+            self.names = {}
+            self.keys = {}
+            self.counts = {}
+            self.grams = {}
+            self.ranking = None
+
+    def load(self):
+        tags = Tag.objects.annotate(uses=Count('taggit_taggeditem_items'))
+        with self.lock:
+            # Read before the tags, so a change made while they load is
+            # picked up by the next check.
+            version = caching.get_version(VERSION)
+            self.clear()
+            for pk, name, uses in tags.values_list('pk', 'name', 'uses'):
+                self._add(pk, name, uses)
+            self.loaded = True
+            self.version = version
+            self.checked_at = time.time()
+
+    def is_stale(self):
+        """Whether another process has changed the tags since loading."""
+        now = time.time()
+        if now - self.checked_at < self.check_interval:
+            return False
+        self.checked_at = now
+        return caching.get_version(VERSION) != self.version
+
+    def changed(self):
+        """
+        Tell other processes the tags have changed. This index stays current
+        only when no other process changed them since it last looked.
+        """
+        with self.lock:
+            version = caching.bump_version(VERSION)
+            if self.version is not None and version == self.version + 1:
+                self.version = version
+
+    def ngrams(self, key, sizes):
+        for size in sizes:
+            for i in xrange(len(key) - size + 1):
+                yield key[i:i + size]
+
+    def _add(self, pk, name, count=0):
+        key = name.lower()
+        self.names[pk] = name
+        self.keys[pk] = key
+        self.counts[pk] = count
+        for gram in self.ngrams(key, xrange(1, self.gram_size + 1)):
+            self.grams.setdefault(gram, set()).add(pk)
+        self.ranking = None
+
+    def add(self, pk, name):
+        """Add a new tag, or rename one that's already indexed."""
+        with self.lock:
+            if not self.loaded:
+                return
+            count = self.counts.get(pk, 0)
+            self.remove(pk)
+            self._add(pk, name, count)
+
+    def remove(self, pk):
+        with self.lock:
+            if not self.loaded or pk not in self.names:
+                return
+            key = self.keys.pop(pk)
+            del self.names[pk]
+            del self.counts[pk]
+            for gram in self.ngrams(key, xrange(1, self.gram_size + 1)):
+                self.grams[gram].discard(pk)
+            self.ranking = None
+
+    def used(self, pk, change):
+        """Adjust a tag's usage count when a resource is (un)tagged."""
+        with self.lock:
+            if self.loaded and pk in self.counts:
+                self.counts[pk] += change
+                self.ranking = None
+
+    def matches(self, query):
+        """The ids of every tag containing the lowercased `query`."""
+        if len(query) <= self.gram_size:
+            return self.grams.get(query, set())
+        grams = sorted((self.grams.get(gram, set()) for gram in
+                        self.ngrams(query, [self.gram_size])), key=len)
+        candidates = grams[0].intersection(*grams[1:])
+        return set(pk for pk in candidates if query in self.keys[pk])
+
+    def search(self, query, limit=10):
+        """
+        Return up to `limit` tag names containing `query`, the most used
+        first. Tags starting with the query win ties.
+        """
+        if limit <= 0:
+            return []
+        with self.lock:
+            if not self.loaded or self.is_stale():
+                self.load()
+            query = query.lower()
+            matches = self.matches(query)
+            rank = lambda pk: (-self.counts[pk],
+                               not self.keys[pk].startswith(query),
+                               self.keys[pk])
+            if len(matches) > limit * self.scan_ratio:
+                if self.ranking is None:
+                    self.ranking = sorted(self.names, key=lambda pk: (
+                        -self.counts[pk], self.keys[pk]))
+                found = []
+                for pk in self.ranking:
+                    if pk not in matches:
+                        continue
+                    # Keep going past `limit` while counts tie, so prefix
+                    # matches can still move ahead.
+                    if (len(found) >= limit and
+                            self.counts[pk] < self.counts[found[limit - 1]]):
+                        break
+                    found.append(pk)
+                matches = found
+            ranked = heapq.nsmallest(limit, matches, key=rank)
+            return [self.names[pk] for pk in ranked]
+
+
+tag_index = TagIndex()
+
+
+def tag_saved(sender, instance, **kwargs):
+    tag_index.add(instance.pk, instance.name)
+    tag_index.changed()
+
+
+def tag_deleted(sender, instance, **kwargs):
+    tag_index.remove(instance.pk)
+    tag_index.changed()
+
+
+def tagged_item_saved(sender, instance, created=False, **kwargs):
+    if created:
+        tag_index.used(instance.tag_id, 1)
+        tag_index.changed()
+
+
+def tagged_item_deleted(sender, instance, **kwargs):
+    tag_index.used(instance.tag_id, -1)
+    tag_index.changed()
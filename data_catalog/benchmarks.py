@@ -0,0 +1,551 @@
+"""Benchmarks for the data catalog's hot paths."""
+
+import random
+import re
+import shutil
+import tempfile
+import time
+from collections import Counter
+from urllib import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import connection, reset_queries
+from django.db.models import Model
+from django.db.models.query import QuerySet
+from django.template import context as template_context, loader
+from django.test.client import Client
+from django.utils.encoding import force_unicode
+from django.utils.simplejson import dumps, JSONEncoder
+from haystack import site
+from haystack.query import SearchQuerySet
+from south.management.commands import patch_for_test_db_setup
+from taggit.models import Tag, TaggedItem
+
+from data_catalog import datacouch, search_queue, video
+from data_catalog.autocomplete import tag_index
+from data_catalog.models import (App, Data, Project, SearchQueueItem,
+                                 Supporter, TagCount)
+from data_catalog.profiling import percentiles
+from data_catalog.search import load_missing
+from data_catalog.templatetags import chrome
+from data_catalog.utils import JSONResponse, bulk_insert, bulk_update
+
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    """Register a benchmark to be run by the `benchmark` command."""
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def measure(func, *args, **kwargs):
+    """
+    Call a function and return a dictionary with its result, the number of
+    `seconds` it took and the number of `queries` it ran.
+    """
+    debug, settings.DEBUG = settings.DEBUG, True
+    reset_queries()
+    start = time.time()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        settings.DEBUG = debug
+    return {
+        'result': result,
+        'seconds': round(time.time() - start, 4),
+        'queries': len(connection.queries),
+    }
+
+
+def latencies(func, calls):
+    """Time each call of `func(*args)` for every `args` in `calls`."""
+    timings = []
+    for args in calls:
+        start = time.time()
+        func(*args)
+        timings.append(time.time() - start)
+    return percentiles(timings)
+
+
+def scenario(func, calls):
+    """
+    Time each call like `latencies`, and count the queries they ran. Each
+    request would reset the query log, so that's held off until the end.
+    """
+    request_started.disconnect(reset_queries)
+    connection.use_debug_cursor = True
+    reset_queries()
+    try:
+        results = latencies(func, calls)
+        results['queries_per_call'] = round(
+            len(connection.queries) / float(len(calls)), 1)
+    finally:
+        connection.use_debug_cursor = None
+        request_started.connect(reset_queries)
+    return results
+
+
+class ScratchEnvironment(object):
+    """
+    A throwaway test database and search index, so benchmarks never touch
+    the real catalog.
+    """
+
+    def __enter__(self):
+        self.search_path = settings.HAYSTACK_WHOOSH_PATH
+        settings.HAYSTACK_WHOOSH_PATH = tempfile.mkdtemp()
+        self.reset()
+        self.database_name = connection.settings_dict['NAME']
+        # Make the tables from South's migrations too, as `manage.py test`
+        # does, since `syncdb` alone skips the apps that have migrations.
+        patch_for_test_db_setup()
+        connection.creation.create_test_db(verbosity=0)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection.creation.destroy_test_db(self.database_name, verbosity=0)
+        shutil.rmtree(settings.HAYSTACK_WHOOSH_PATH, ignore_errors=True)
+        settings.HAYSTACK_WHOOSH_PATH = self.search_path
+        self.reset()
+
+    def reset(self):
+        """
+        Have the search backends open the index at the current path on
+        their next use, rather than the one they last opened, and drop the
+        tags loaded from the last database.
+        """
+        for model in site.get_indexed_models():
+            site.get_index(model).backend.setup_complete = False
+        tag_index.clear()
+
+
+def datacouch_rows(count, offset=0):
+    """Generate rows the way the Data Couch API returns them."""
+    return [{
+        'id': 'dataset-%d' % i,
+        'value': 'Data set %d' % i,
+        'doc': {'description': 'Description of data set %d.' % i},
+    } for i in xrange(offset, offset + count)]
+
+
+def get_or_create_rows(rows):
+    """The per-row import `Data.check_exists` used before `bulk_import`."""
+    for data in reversed(rows):
+        url = 'http://datacouch.com/edit/#/' + data['id']
+        instance, created = Data.objects.get_or_create(name=data['value'],
+                                                       url=url)
+        if created:
+            instance.description = data['doc']['description']
+            instance.slug = data['id']
+            instance.save()
+
+
+@benchmark
+def bulk_import(rows=10000):
+    """Importing Data Couch data sets, row by row against in bulk."""
+    rows = datacouch_rows(rows)
+    results = {}
+    results['get_or_create'] = measure(get_or_create_rows, rows)
+    Data.objects.all().delete()
+    SearchQueueItem.objects.all().delete()
+    results['bulk_import'] = measure(Data.check_exists, rows)
+    results['search_queue'] = measure(search_queue.process_all)
+    results['bulk_import_unchanged'] = measure(Data.check_exists, rows)
+    for row in rows[::10]:
+        row['doc']['description'] += ' Updated.'
+    results['bulk_import_tenth_changed'] = measure(Data.check_exists, rows)
+    return results
+
+
+SYLLABLES = ('bo', 'ston', 'da', 'ta', 'park', 'crime', 'food', 'map', 'gis',
+             'tran', 'sit', 'bus', 'rail', 'school', 'tax', 'fire', 'tree',
+             'water', 'street', 'light', 'permit', 'zone', 'bike', 'snow')
+
+
+def tag_names(count, seed=0):
+    """Generate `count` unique, word-like tag names."""
+    generator = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        words = [''.join(generator.sample(SYLLABLES, generator.randint(1, 3)))
+                 for _ in xrange(generator.randint(1, 3))]
+        names.add(' '.join(words))
+    return sorted(names)
+
+
+@benchmark
+def autocomplete(tags=50000, queries=500):
+    """Autocomplete latency, the LIKE query against the in-memory index."""
+    generator = random.Random(1)
+    names = tag_names(tags)
+    bulk_insert(Tag, [Tag(name=name, slug='tag-%d' % i)
+                      for i, name in enumerate(names)])
+    content_type = ContentType.objects.get_for_model(Data)
+    tag_ids = list(Tag.objects.values_list('pk', flat=True))
+    bulk_insert(TaggedItem, [
+        TaggedItem(tag_id=generator.choice(tag_ids), object_id=i,
+                   content_type=content_type) for i in xrange(tags * 2)])
+    calls = []
+    for _ in xrange(queries):
+        name = generator.choice(names)
+        start = generator.randint(0, len(name) - 1)
+        calls.append((name[start:start + generator.randint(1, 6)],))
+
+    def icontains(query):
+        return list(Tag.objects.filter(name__icontains=query).values('name'))
+
+    tag_index.clear()
+    return {
+        'icontains': latencies(icontains, calls),
+        'index_load': measure(tag_index.load),
+        'index_search': latencies(tag_index.search, calls),
+    }
+
+
+def jsonify_model(model):
+    """The serializer `JSONResponse` used before `data_catalog.serializers`."""
+    model_dict = model.__dict__
+    for key, value in model_dict.items():
+        if key.startswith('_'):
+            del model_dict[key]
+        else:
+            model_dict[key] = force_unicode(value)
+    return model_dict
+
+
+class API_JSONEncoder(JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, QuerySet):
+            return [jsonify_model(o) for o in obj]
+        if isinstance(obj, Model):
+            return jsonify_model(obj)
+        return JSONEncoder.default(self, obj)
+
+
+@benchmark
+def json_encoding(rows=2000, repeat=5):
+    """Encoding QuerySets as JSON, the old encoder against the new one."""
+    bulk_insert(Data, [Data(name='Data set %d' % i, slug='data-%d' % i,
+                            url='http://data.com/%d' % i,
+                            description='Description of data set %d.' % i)
+                       for i in xrange(rows)])
+    bulk_insert(Project, [Project(name='Project %d' % i, slug='project-%d' % i,
+                                  organization='Code for America',
+                                  video_url='http://vimeo.com/%d' % i,
+                                  embed_url='http://player.vimeo.com/%d' % i,
+                                  description='Project %d.' % i, featured=False)
+                          for i in xrange(rows)])
+
+    def legacy():
+        for _ in xrange(repeat):
+            dumps({'data': Data.objects.all(), 'projects': Project.objects.all()},
+                  ensure_ascii=False, indent=2, cls=API_JSONEncoder)
+
+    def compact():
+        for _ in xrange(repeat):
+            JSONResponse({'data': Data.objects.all(),
+                          'projects': Project.objects.all()}).content
+
+    def streamed():
+        for _ in xrange(repeat):
+            JSONResponse(Data.objects.all()).content
+            JSONResponse(Project.objects.all()).content
+
+    return {
+        'legacy_encoder': measure(legacy),
+        'compact_encoder': measure(compact),
+        'streamed_encoder': measure(streamed),
+    }
+
+
+@benchmark
+def search_page(rows=2000, queries=50, per_page=20):
+    """Rendering a page of search results, per hit, in bulk and stored."""
+    generator = random.Random(2)
+    words = SYLLABLES[:12]
+    for model in (App, Data):
+        bulk_insert(model, [model(name='%s %s %d' % (model.type,
+                                                     generator.choice(words), i),
+                                  slug='%s-%d' % (model.type, i),
+                                  description='Description %d.' % i)
+                            for i in xrange(rows // 2)])
+        index = site.get_index(model)
+        index.backend.update(index, model.objects.all())
+    calls = [(generator.choice(words),) for _ in xrange(queries)]
+
+    def fetch(query):
+        return SearchQuerySet().auto_query(query)[:per_page]
+
+    def per_hit(query):
+        return [(result.object.get_absolute_url(), result.object.name,
+                 result.object.description) for result in fetch(query)]
+
+    def bulk(query):
+        return [(result.object.get_absolute_url(), result.object.name,
+                 result.object.description)
+                for result in SearchQuerySet().load_all()
+                .auto_query(query)[:per_page]]
+
+    def stored(query):
+        return [(result.url, result.name, result.description)
+                for result in load_missing(list(fetch(query)))]
+
+    results = {}
+    for name, func in (('per_hit', per_hit), ('bulk_load', bulk),
+                       ('stored_fields', stored)):
+        totals = measure(lambda: [func(*args) for args in calls])
+        results[name] = latencies(func, calls)
+        results[name]['queries_per_page'] = round(
+            totals['queries'] / float(len(calls)), 1)
+    return results
+
+
+def legacy_parse_video_id(video_url):
+    """The parser `Project.save` used before `data_catalog.video`."""
+    if 'youtube' in video_url:
+        hosting_provider = 'youtube'
+        video_id = re.search(r'v=(.\w+)', video_url).group(1)
+    elif 'vimeo' in video_url:
+        hosting_provider = 'vimeo'
+        video_id = re.search(r'\d+', video_url).group()
+    else:
+        hosting_provider, video_id = None, None
+    return hosting_provider, video_id
+
+
+@benchmark
+def video_parsing(urls=100000, distinct=5000):
+    """Parsing video URLs, the old way, the registry, and in bulk."""
+    generator = random.Random(3)
+    forms = ('http://www.youtube.com/watch?v=%s', 'http://youtu.be/%s',
+             'http://vimeo.com/%d', 'http://vimeo.com/channels/staff/%d')
+    pool = []
+    for i in xrange(distinct):
+        form = generator.choice(forms)
+        pool.append(form % (i if '%d' in form else 'video%06d' % i))
+    video_urls = [generator.choice(pool) for _ in xrange(urls)]
+    legacy_urls = [url for url in video_urls if 'youtu.be' not in url]
+
+    def registry():
+        video._parsed.clear()
+        for url in video_urls:
+            video.parse(url)
+
+    def uncached():
+        for url in video_urls:
+            video._parsed.clear()
+            video.parse(url)
+
+    projects = [Project(video_url=url) for url in video_urls]
+    return {
+        # The old parser can't read youtu.be links, so it gets fewer URLs.
+        'legacy': measure(lambda: [legacy_parse_video_id(url)
+                                   for url in legacy_urls]),
+        'registry_uncached': measure(uncached),
+        'registry': measure(registry),
+        'bulk_resolve': measure(video.resolve_embed_urls, projects),
+    }
+
+
+def seed_catalog(apps=200, data=1000, projects=200, tags=300, users=500,
+                 supporters=5, seed=0):
+    """
+    Fill the database with a synthetic catalog: resources with three tags
+    each, owned by `users` users who each support `supporters` projects,
+    all indexed for search. The same arguments always make the same
+    catalog. Returns the tag names, and the resources' slugs by type.
+    """
+    generator = random.Random(seed)
+    names = tag_names(tags, seed)
+    bulk_insert(Tag, [Tag(name=name, slug='tag-%d' % i)
+                      for i, name in enumerate(names)])
+    tag_ids = list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+    bulk_insert(User, [User(username='user%d' % i,
+                            email='user%d@example.com' % i)
+                       for i in xrange(users)])
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    slugs = {}
+    for model, count in ((App, apps), (Data, data), (Project, projects)):
+        instances = []
+        for i in xrange(count):
+            instance = model(name='%s %s %d' % (model.type,
+                                                generator.choice(SYLLABLES), i),
+                             slug='%s-%d' % (model.type, i),
+                             description='Description of %s %d.' % (
+                                 model.type, i),
+                             user_id=generator.choice(user_ids))
+            if model is Project:
+                instance.organization = 'Code for America'
+                instance.video_url = 'http://vimeo.com/%d' % i
+                instance.embed_url = video.embed_url(instance.video_url)
+            else:
+                instance.url = 'http://example.com/%s/%d' % (model.type, i)
+            instances.append(instance)
+        bulk_insert(model, instances)
+        content_type = ContentType.objects.get_for_model(model)
+        ids = model.objects.order_by('pk').values_list('pk', flat=True)
+        bulk_insert(TaggedItem, [
+            TaggedItem(tag_id=tag_id, object_id=pk, content_type=content_type)
+            for pk in ids
+            for tag_id in generator.sample(tag_ids, min(3, len(tag_ids)))])
+        slugs[model.type] = [instance.slug for instance in instances]
+    bulk_insert(Supporter, [Supporter(user_id=pk) for pk in user_ids])
+    project_ids = list(Project.objects.order_by('pk')
+                       .values_list('pk', flat=True))
+    through = Supporter.projects.through
+    supported = [
+        through(supporter_id=pk, project_id=project_id)
+        for pk in Supporter.objects.order_by('pk').values_list('pk', flat=True)
+        for project_id in generator.sample(project_ids,
+                                           min(supporters, len(project_ids)))]
+    bulk_insert(through, supported)
+    counts = Counter(row.project_id for row in supported)
+    bulk_update(Project, 'supporter_count', counts.items())
+    TagCount.refresh()
+    tag_index.clear()
+    for model in (App, Data, Project):
+        index = site.get_index(model)
+        index.backend.update(index, model.objects.all())
+    return {'tags': names, 'slugs': slugs}
+
+
+class BenchmarkClient(Client):
+    """A test client that refuses to time a page that didn't render."""
+
+    def request(self, **request):
+        response = super(BenchmarkClient, self).request(**request)
+        if response.status_code != 200:
+            raise RuntimeError('%s answered %d' % (request['PATH_INFO'],
+                                                   response.status_code))
+        return response
+
+
+@benchmark
+def endpoints(apps=200, data=1000, projects=200, tags=300, users=500,
+              supporters=5, requests=50, seed=0):
+    """Response times of the hot pages, against a seeded catalog."""
+    generator = random.Random(seed)
+    catalog = seed_catalog(apps, data, projects, tags, users, supporters, seed)
+    client = BenchmarkClient()
+    user = User(username='benchmark', email='benchmark@example.com')
+    user.set_password('benchmark')
+    user.save()
+    client.login(username='benchmark', password='benchmark')
+
+    def pages(count):
+        return range(1, max(1, count // 20) + 1)
+
+    def get(path, cold=False):
+        if cold:
+            cache.clear()
+        client.get(path)
+
+    def support(slug):
+        client.post('/support/%s/' % slug, {'project': slug},
+                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def fragment(name):
+        start = generator.randint(0, len(name) - 1)
+        return name[start:start + generator.randint(1, 6)]
+
+    def sync(rows):
+        fetch_datasets = datacouch.fetch_datasets
+        datacouch.fetch_datasets = lambda *args, **kwargs: {
+            'rows': rows, 'etag': '', 'last_modified': ''}
+        try:
+            datacouch.sync(force=True)
+        finally:
+            datacouch.fetch_datasets = fetch_datasets
+
+    def choose(values):
+        return [generator.choice(values) for _ in xrange(requests)]
+
+    names = catalog['tags']
+    scenarios = (
+        ('data_cold', get, [('/data?page=%d' % page, True)
+                            for page in choose(pages(data))]),
+        ('data_warm', get, [('/data?page=%d' % page,)
+                            for page in choose(pages(data))]),
+        ('data_tagged', get, [('/data?' + urlencode({'tag': name}),)
+                              for name in choose(names)]),
+        ('projects_cold', get, [('/projects?page=%d' % page, True)
+                                for page in choose(pages(projects))]),
+        ('autocomplete', get, [('/autocomplete?' +
+                                urlencode({'q': fragment(name)}),)
+                               for name in choose(names)]),
+        ('search', get, [('/search?q=%s' % word,)
+                         for word in choose(SYLLABLES)]),
+        ('support', support, [(slug,) for slug
+                              in choose(catalog['slugs']['project'])]),
+        ('datacouch_sync', sync, [(datacouch_rows(data),)]),
+    )
+    results = {}
+    for name, func, calls in scenarios:
+        results[name] = scenario(func, calls)
+    return results
+
+
+def legacy_settings_context(request):
+    """The `settings_context` before it read the settings only once."""
+    context_settings = {}
+    for value in settings.TEMPLATE_CONTEXT_SETTINGS:
+        context_settings[value] = getattr(settings, value)
+    return {'settings': context_settings}
+
+
+def configure_templates(loaders, processors, fragment_caching):
+    """Switch template loading and context processors, and start afresh."""
+    settings.TEMPLATE_LOADERS = loaders
+    settings.TEMPLATE_CONTEXT_PROCESSORS = processors
+    settings.TEMPLATE_FRAGMENT_CACHING = fragment_caching
+    loader.template_source_loaders = None
+    template_context._standard_context_processors = None
+    chrome._fragments.clear()
+
+
+@benchmark
+def page_rendering(requests=200):
+    """Rendering pages, parsing everything each time against caching."""
+    client = BenchmarkClient()
+    user = User(username='benchmark', email='benchmark@example.com')
+    user.set_password('benchmark')
+    user.save()
+    plain_loaders = ('django.template.loaders.filesystem.Loader',
+                     'django.template.loaders.app_directories.Loader')
+    processors = settings.TEMPLATE_CONTEXT_PROCESSORS
+    legacy_processors = tuple(
+        'data_catalog.benchmarks.legacy_settings_context'
+        if path == 'data_catalog.context_processors.settings_context'
+        else path for path in processors)
+    configurations = (
+        ('legacy', plain_loaders, legacy_processors, False),
+        ('cached', (('django.template.loaders.cached.Loader', plain_loaders),),
+         processors, True),
+    )
+    pages = (('home', '/'), ('about', '/about'), ('faq', '/faq'),
+             ('data', '/data'))
+    original = (settings.TEMPLATE_LOADERS, processors,
+                settings.TEMPLATE_FRAGMENT_CACHING)
+    results = {}
+    try:
+        for name, loaders, processors, fragment_caching in configurations:
+            configure_templates(loaders, processors, fragment_caching)
+            for logged_in in (False, True):
+                if logged_in:
+                    client.login(username='benchmark', password='benchmark')
+                else:
+                    client.logout()
+                for page, path in pages:
+                    label = '%s_%s%s' % (name, page,
+                                         '_logged_in' if logged_in else '')
+                    results[label] = latencies(client.get,
+                                               [(path,)] * requests)
+    finally:
+        configure_templates(*original)
+    return results
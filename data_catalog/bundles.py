@@ -0,0 +1,153 @@
+"""
+Concatenate and minify the site's CSS and JavaScript into bundles with
+content-hashed names, and keep a manifest of the current name of each.
+The hashed names never change content, so they can be cached forever.
+"""
+
+import gzip
+import os
+import posixpath
+import re
+from hashlib import md5
+
+from django.conf import settings
+from django.utils import simplejson as json
+
+
+CSS_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+# Spaces before a colon are left alone, as in a `.nav :hover` selector.
+CSS_SPACE = re.compile(r'\s*([{};,>])\s*|(:)\s+')
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+# A block comment with nothing else on its lines. It can't run past its
+# own `*/`, so a comment followed by code is left alone.
+JS_BLOCK_COMMENT = re.compile(r'^[ \t]*/\*(?!!)(?:[^*]|\*(?!/))*\*/[ \t]*$',
+                              re.M)
+
+_manifest = {}
+
+
+def static_root():
+    """The directory bundles are built from and written to."""
+    return settings.STATICFILES_DIRS[0]
+
+
+def manifest_path():
+    return os.path.join(static_root(), settings.STATIC_BUNDLE_DIR,
+                        'manifest.json')
+
+
+def rewrite_urls(css, path):
+    """
+    Point relative `url()`s in a stylesheet at the same files from the
+    bundle directory, by making them absolute under `STATIC_URL`.
+    """
+    directory = posixpath.dirname(path)
+
+    def absolute(match):
+        quote, url = match.groups()
+        if url.startswith(('/', 'data:', 'http:', 'https:')):
+            return match.group(0)
+        url = posixpath.normpath(posixpath.join(directory, url))
+        return 'url(%s%s%s%s)' % (quote, settings.STATIC_URL, url, quote)
+
+    return CSS_URL.sub(absolute, css)
+
+
+def minify_css(css):
+    css = CSS_COMMENT.sub('', css)
+    css = CSS_SPACE.sub(lambda match: match.group(1) or match.group(2), css)
+    return re.sub(r'\s+', ' ', css).replace(';}', '}').strip()
+
+
+def minify_js(js):
+    """
+    A conservative minifier: it drops comments that take up whole lines,
+    indentation and blank lines, but keeps every line break so automatic
+    semicolon insertion still sees the same code.
+    """
+    js = JS_BLOCK_COMMENT.sub('', js)
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines
+                     if line and not line.startswith('//'))
+
+
+def build_bundle(name, paths):
+    """Return the minified contents of a bundle made from its source files."""
+    sources = []
+    for path in paths:
+        source = open(os.path.join(static_root(), path)).read()
+        if name.endswith('.css'):
+            sources.append(minify_css(rewrite_urls(source, path)))
+        else:
+            sources.append(minify_js(source))
+    separator = '\n' if name.endswith('.css') else ';\n'
+    return separator.join(sources) + '\n'
+
+
+def hashed_name(name, content):
+    root, extension = os.path.splitext(name)
+    return posixpath.join(settings.STATIC_BUNDLE_DIR, '%s.%s%s' % (
+        root, md5(content).hexdigest()[:12], extension))
+
+
+def write_gzipped(path, content):
+    """Write a `.gz` sibling that the web server can send as it is."""
+    output = gzip.GzipFile(path + '.gz', 'wb', 9, mtime=0)
+    try:
+        output.write(content)
+    finally:
+        output.close()
+
+
+def build(bundles=None):
+    """
+    Build every bundle in `STATIC_BUNDLES`, with a precompressed `.gz`
+    next to each, and write the manifest. Returns the manifest.
+    """
+    bundles = bundles or settings.STATIC_BUNDLES
+    directory = os.path.join(static_root(), settings.STATIC_BUNDLE_DIR)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    manifest = {}
+    for name, paths in sorted(bundles.items()):
+        content = build_bundle(name, paths)
+        manifest[name] = hashed_name(name, content)
+        path = os.path.join(static_root(), manifest[name])
+        if not os.path.exists(path):
+            output = open(path, 'wb')
+            try:
+                output.write(content)
+            finally:
+                output.close()
+            write_gzipped(path, content)
+    output = open(manifest_path(), 'w')
+    try:
+        json.dump(manifest, output, indent=2, sort_keys=True)
+    finally:
+        output.close()
+    _manifest.clear()
+    return manifest
+
+
+def load_manifest():
+    """
+    The built manifest, read once per process; empty if not built, which
+    is remembered too, so pages don't look for it on every request.
+    """
+    if 'manifest' not in _manifest:
+        try:
+            _manifest['manifest'] = json.load(open(manifest_path()))
+        except (IOError, ValueError):
+            _manifest['manifest'] = {}
+    return _manifest['manifest']
+
+
+def urls(name):
+    """
+    The URLs to load a bundle from: the hashed bundle once it's built, or
+    each of its source files until then, or while debugging.
+    """
+    manifest = {} if settings.DEBUG else load_manifest()
+    if name in manifest:
+        return [settings.STATIC_URL + manifest[name]]
+    return [settings.STATIC_URL + path for path in settings.STATIC_BUNDLES[name]]
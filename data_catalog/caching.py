@@ -0,0 +1,154 @@
+"""
+Versioned caching of rendered resource listings, along with the community
+page's member fragments and the featured project.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.safestring import mark_safe
+
+from data_catalog import databases
+
+
+RESOURCE_TYPES = ('app', 'data', 'project')
+
+
+def timeout():
+    """
+    How long to keep listings. Other processes' changes never reach a cache
+    of this process's own, so it only keeps them for a short while.
+    """
+    if isinstance(cache, LocMemCache):
+        return min(settings.LISTING_CACHE_TIMEOUT, settings.LOCAL_CACHE_TIMEOUT)
+    return settings.LISTING_CACHE_TIMEOUT
+
+
+def version_key(resource_type):
+    return 'catalog:version:%s' % resource_type
+
+
+def get_version(resource_type):
+    """Return the current listing version for a resource type."""
+    key = version_key(resource_type)
+    version = cache.get(key)
+    if version is None:
+        # Not a change, just a version the cache has lost or never had.
+        version = new_version(key)
+    return version
+
+
+def new_version(key):
+    """
+    Start a version from the current time, so an evicted version never
+    comes back around to stale fragments.
+    """
+    version = int(time.time() * 1000)
+    cache.add(key, version, timeout())
+    # Another process may have started one first.
+    return cache.get(key) or version
+
+
+def bump_version(resource_type):
+    """
+    Move a resource type onto a new version, so every listing fragment
+    cached for it is missed from now on. It's a write the replica may not
+    have yet, so `databases.wrote` holds off caching what's read from it.
+    """
+    databases.wrote()
+    key = version_key(resource_type)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return new_version(key)
+
+
+def listing_key(resource_type, page, layout):
+    """The cache key for one page of a listing in a given layout."""
+    return 'catalog:listing:%s:%s:%s:%s' % (
+        resource_type, get_version(resource_type), page or '', layout or '')
+
+
+def get_listing(resource_type, page, layout):
+    """Return a cached listing fragment, or `None` on a miss."""
+    fragment = cache.get(listing_key(resource_type, page, layout))
+    if fragment is not None:
+        fragment = mark_safe(fragment)
+    return fragment
+
+
+def set_listing(resource_type, page, layout, fragment):
+    cache.set(listing_key(resource_type, page, layout), fragment, timeout())
+
+
+def invalidate_resource(sender, instance, **kwargs):
+    """Signal handler for when an App, Data or Project changes."""
+    bump_version(sender.type)
+
+
+def invalidate_tagged_item(sender, instance, **kwargs):
+    """Signal handler for when a resource is tagged or untagged."""
+    model = ContentType.objects.get_for_id(instance.content_type_id).model_class()
+    resource_type = getattr(model, 'type', None)
+    if resource_type in RESOURCE_TYPES:
+        bump_version(resource_type)
+
+
+def invalidate_tag(sender, instance, **kwargs):
+    """Signal handler for when a tag, which any listing may show, changes."""
+    for resource_type in RESOURCE_TYPES:
+        bump_version(resource_type)
+
+
+def member_key(user_id):
+    return 'catalog:member:%d' % user_id
+
+
+def get_member_fragments(user_ids):
+    """Return the cached gravatar fragments of the given users by id."""
+    fragments = cache.get_many([member_key(pk) for pk in user_ids])
+    return dict((pk, mark_safe(fragments[member_key(pk)]))
+                for pk in user_ids if member_key(pk) in fragments)
+
+
+def set_member_fragments(fragments):
+    cache.set_many(dict((member_key(pk), fragment)
+                        for pk, fragment in fragments.items()), timeout())
+
+
+def invalidate_member(sender, instance, **kwargs):
+    """Signal handler for when a user, whose gravatar may change, is saved."""
+    cache.delete(member_key(instance.pk))
+
+
+FEATURED_KEY = 'catalog:featured'
+
+
+def get_featured():
+    """
+    Return the cached list of projects in the featured rotation, which is
+    empty when nothing is featured, or `None` on a miss.
+    """
+    return cache.get(FEATURED_KEY)
+
+
+def set_featured(projects):
+    cache.set(FEATURED_KEY, list(projects), timeout())
+
+
+def invalidate_featured(sender, instance, **kwargs):
+    """
+    Signal handler for when a project changes. The cached rotation is
+    dropped if this project is featured, or was in the rotation.
+    """
+    featured = cache.get(FEATURED_KEY) or []
+    if instance.featured or instance.pk in [project.pk for project in featured]:
+        cache.delete(FEATURED_KEY)
+
+
+def invalidate_rotation(sender, **kwargs):
+    """Signal handler for when the featured rotation is rescheduled."""
+    cache.delete(FEATURED_KEY)
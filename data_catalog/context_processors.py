@@ -2,13 +2,16 @@
 
 from django.conf import settings
 
+# Read once, when the module's first loaded.
+_settings = dict((value, getattr(settings, value))
+                 for value in settings.TEMPLATE_CONTEXT_SETTINGS)
+
 
 def settings_context(request):
     """
     Exposes specific project settings in a `TEMPLATE_CONTEXT_SETTINGS` iterable
-    in your settings.py file to a `settings` variable to all templates.
+    in your settings.py file to a `settings` variable to all templates. They're
+    read once, and each request gets its own copy, so nothing one request
+    changes is seen by the next.
     """
-    context_settings = {}
-    for value in settings.TEMPLATE_CONTEXT_SETTINGS:
-        context_settings[value] = getattr(settings, value)
-    return {'settings': context_settings}
+    return {'settings': dict(_settings)}
@@ -0,0 +1,160 @@
+"""
+Database connection tuning: SQLite pragmas, connections kept open between
+requests, and a router that sends the catalog's read-only pages to a read
+replica.
+"""
+
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpRequest
+
+_state = threading.local()
+
+# Set on a browser that has just written, to read from the primary.
+PRIMARY_COOKIE = 'primary_until'
+# Set while the replica may not have the latest write.
+RECENT_WRITE_KEY = 'catalog:recent-write'
+
+# Apps whose tables the read-only pages read. Sessions and users stay on
+# the primary, so a login is never missed by a replica that's behind.
+REPLICA_APPS = ('data_catalog', 'taggit')
+
+
+def connection_opened(sender, connection, **kwargs):
+    """
+    Signal handler for each new connection, which notes when it was opened
+    and, for SQLite, applies the `SQLITE_PRAGMAS`.
+    """
+    connection.created_at = time.time()
+    if connection.vendor == 'sqlite':
+        for pragma in settings.SQLITE_PRAGMAS:
+            connection.connection.execute('PRAGMA %s' % pragma)
+
+
+def close_old_connections(**kwargs):
+    """
+    Used in place of Django's `close_connection` at the end of a request
+    when `DATABASE_CONNECTION_MAX_AGE` is set. Connections are kept for the
+    next request until they're that many seconds old, but are rolled back
+    first, so none sits in a transaction between requests.
+    """
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        age = time.time() - getattr(connection, 'created_at', 0)
+        if age >= settings.DATABASE_CONNECTION_MAX_AGE:
+            connection.close()
+        else:
+            connection._rollback()
+
+
+def wrote():
+    """
+    Note a write the replica may not have yet. For the next
+    `DATABASE_REPLICA_LAG` seconds the browser that made it reads from the
+    primary, through `PrimaryCookieMiddleware`, and nothing read from the
+    replica is cached, since it may be older than the cache version the
+    write moved onto.
+    """
+    _state.wrote = True
+    if settings.DATABASE_READ_REPLICA:
+        cache.set(RECENT_WRITE_KEY, True, settings.DATABASE_REPLICA_LAG)
+
+
+def is_pinned(request):
+    """Whether a request comes from a browser that has just written."""
+    try:
+        return float(request.COOKIES[PRIMARY_COOKIE]) > time.time()
+    except (KeyError, ValueError):
+        return False
+
+
+def can_cache():
+    """
+    Whether what the current view reads can be cached, which it can't when
+    it's read from a replica that may be behind a recent write.
+    """
+    return (not getattr(_state, 'replica', False) or
+            not cache.get(RECENT_WRITE_KEY))
+
+
+def replica_reads(view):
+    """
+    Send a view's reads of the catalog to the `DATABASE_READ_REPLICA`, when
+    one is configured and the browser hasn't just written. For pages that
+    can be a moment behind a write. A streamed response's reads, which run
+    after the view returns, are sent to the same database.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        request = [arg for arg in args if isinstance(arg, HttpRequest)][0]
+        replica = (settings.DATABASE_READ_REPLICA is not None and
+                   not is_pinned(request))
+        previous = getattr(_state, 'replica', False)
+        _state.replica = replica
+        try:
+            response = view(*args, **kwargs)
+        finally:
+            _state.replica = previous
+        if not getattr(response, '_is_string', True):
+            response._container = reading(response._container, replica)
+        return response
+    return wrapper
+
+
+def reading(chunks, replica):
+    """Iterate over a streamed response's chunks, reading as its view did."""
+    chunks = iter(chunks)
+    while True:
+        previous = getattr(_state, 'replica', False)
+        _state.replica = replica
+        try:
+            chunk = next(chunks)
+        finally:
+            _state.replica = previous
+        yield chunk
+
+
+class PrimaryCookieMiddleware(object):
+    """Pins a browser that has just written to the primary, with a cookie."""
+
+    def process_request(self, request):
+        _state.wrote = False
+
+    def process_response(self, request, response):
+        if getattr(_state, 'wrote', False) and settings.DATABASE_READ_REPLICA:
+            lag = settings.DATABASE_REPLICA_LAG
+            response.set_cookie(PRIMARY_COOKIE, '%.3f' % (time.time() + lag),
+                                max_age=lag)
+        _state.wrote = False
+        return response
+
+
+class ReplicaRouter(object):
+    """Reads from the replica inside `replica_reads`; writes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        replica = settings.DATABASE_READ_REPLICA
+        if (replica and getattr(_state, 'replica', False) and
+                model._meta.app_label in REPLICA_APPS):
+            return replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Otherwise Django writes an instance back to the database it was
+        # read from, which may be the replica.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_syncdb(self, db, model):
+        # The replica gets its tables by replication.
+        if db == settings.DATABASE_READ_REPLICA:
+            return False
+        return None
@@ -0,0 +1,85 @@
+"""Incremental synchronization of data sets from Data Couch."""
+
+import socket
+import time
+from urllib2 import Request, HTTPError, URLError, urlopen
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.utils import simplejson as json
+
+from data_catalog.models import Data, SyncState
+
+
+DATACOUCH_API = 'http://datacouch.com/api/datasets/'
+
+
+def fetch_datasets(user, etag='', last_modified='', timeout=30):
+    """
+    Fetch the data sets published by a Data Couch user. Sends the
+    conditional headers from the last sync, and returns `None` if Data
+    Couch answers that nothing has changed.
+    """
+    request = Request(DATACOUCH_API + user)
+    if etag:
+        request.add_header('If-None-Match', etag)
+    if last_modified:
+        request.add_header('If-Modified-Since', last_modified)
+    try:
+        response = urlopen(request, timeout=timeout)
+    except HTTPError, error:
+        if error.code == 304:
+            return None
+        raise
+    headers = response.info()
+    rows = json.loads(response.read())['rows']
+    return {
+        'rows': rows,
+        'etag': headers.get('ETag', ''),
+        'last_modified': headers.get('Last-Modified', ''),
+    }
+
+
+def sync(user=None, force=False):
+    """
+    Run a single sync against Data Couch, and return a dictionary with
+    the number of `created`, `updated` and `unchanged` data sets. `None`
+    is returned when Data Couch reports that nothing has changed since the
+    last sync.
+    """
+    user = user or settings.DATACOUCH_USER
+    state, created = SyncState.objects.get_or_create(source=user)
+    if force:
+        etag, last_modified = '', ''
+    else:
+        etag, last_modified = state.etag, state.last_modified
+    result = fetch_datasets(user, etag, last_modified)
+    if result is None:
+        return None
+    counts = Data.check_exists(result['rows'])
+    state.etag = result['etag']
+    state.last_modified = result['last_modified']
+    state.save()
+    return counts
+
+
+def run_forever(interval, user=None, log=None):
+    """
+    A simple scheduler loop that syncs every `interval` seconds. A failed
+    sync is logged, and tried again after the next interval.
+    """
+    while True:
+        try:
+            counts = sync(user)
+        except (URLError, socket.timeout, ValueError), error:
+            # Data Couch being unreachable or sending a bad response
+            # shouldn't stop the worker.
+            counts = error
+        except DatabaseError, error:
+            # Start the next sync on a new connection, rather than one left
+            # in a failed transaction.
+            connection.close()
+            counts = error
+        if log is not None:
+            log(counts)
+        time.sleep(interval)
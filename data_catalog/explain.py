@@ -0,0 +1,75 @@
+"""
+Check the query plans of the catalog's hot lookups, so a missing index
+shows up as a failed check instead of a slow page.
+"""
+
+import re
+
+from django.contrib.auth.models import User
+from django.db import connections
+
+from data_catalog.models import App, Data, Project
+
+
+# SQLite's plans say `SCAN TABLE data_catalog_app`, or just `SCAN
+# data_catalog_app` in newer versions, when they read every row.
+SQLITE_SCAN = re.compile(r'^SCAN (TABLE )?\S+$')
+
+
+def hot_queries():
+    """The lookups that run on every import, edit and page view."""
+    queries = [
+        ('Data by name and URL', Data.objects.filter(name='', url='')),
+        ('Featured project', Project.objects.filter(featured=True)),
+        ('User by username', User.objects.filter(username='')),
+    ]
+    for model in (App, Data, Project):
+        name = model._meta.verbose_name.title()
+        queries.append(('%s by name' % name, model.objects.filter(name='')))
+        queries.append(('%s by user' % name, model.objects.filter(user=1)))
+    return queries
+
+
+def query_plan(queryset):
+    """Return the lines of the database's plan for a queryset's query."""
+    connection = connections[queryset.db]
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    cursor = connection.cursor()
+    if connection.vendor == 'sqlite':
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+    if connection.vendor == 'postgresql':
+        # Small tables are cheaper to read whole, so make sequential scans
+        # the last resort, taken only when there's no usable index.
+        cursor.execute('SET enable_seqscan = off')
+        try:
+            cursor.execute('EXPLAIN ' + sql, params)
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.execute('SET enable_seqscan = on')
+    cursor.execute('EXPLAIN ' + sql, params)
+    columns = [column[0] for column in cursor.description]
+    return [' '.join('%s=%s' % pair for pair in zip(columns, row))
+            for row in cursor.fetchall()]
+
+
+def is_full_scan(line, vendor):
+    """Whether a line of a query plan reads a whole table."""
+    if vendor == 'sqlite':
+        return bool(SQLITE_SCAN.match(line))
+    if vendor == 'postgresql':
+        return 'Seq Scan' in line
+    return 'type=ALL' in line
+
+
+def audit(using='default'):
+    """
+    Explain each hot query, and return `(label, plan, full scan)` for each.
+    """
+    vendor = connections[using].vendor
+    results = []
+    for label, queryset in hot_queries():
+        plan = query_plan(queryset.using(using))
+        scans = [line for line in plan if is_full_scan(line, vendor)]
+        results.append((label, plan, bool(scans)))
+    return results
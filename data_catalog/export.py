@@ -0,0 +1,98 @@
+"""Streaming exports of the whole catalog as NDJSON or CSV."""
+
+import csv
+import zlib
+from cStringIO import StringIO
+
+from data_catalog.models import App, Data, Project
+from data_catalog.serializers import encoder, serialize
+from data_catalog.utils import prefetch_tags
+
+
+EXPORT_MODELS = {'apps': App, 'data': Data, 'projects': Project}
+CSV_COLUMNS = ('type', 'id', 'name', 'slug', 'description', 'url', 'tags')
+
+
+def iter_resources(model, batch_size=1000):
+    """
+    Yield every instance of a model, reading it in primary key order one
+    batch at a time, with each batch's tags loaded in a single query. Only
+    one batch is ever held in memory.
+    """
+    last_pk = 0
+    while True:
+        batch = list(model.objects.filter(pk__gt=last_pk)
+                     .order_by('pk')[:batch_size])
+        if not batch:
+            return
+        for instance in prefetch_tags(batch):
+            yield instance
+        last_pk = batch[-1].pk
+
+
+def record(instance):
+    """The exported fields of a resource."""
+    data = serialize(instance)
+    data['type'] = instance.type
+    data['url'] = getattr(instance, 'url', '') or instance.get_absolute_url()
+    data['tags'] = [tag.name for tag in instance.tag_list]
+    return data
+
+
+def ndjson(models, batch_size=1000):
+    """Yield one JSON document per line for every resource."""
+    encode = encoder().encode
+    for model in models:
+        for instance in iter_resources(model, batch_size):
+            yield encode(record(instance)) + '\n'
+
+
+def csv_rows(models, batch_size=1000):
+    """Yield CSV lines, starting with a header, for every resource."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    def line(row):
+        writer.writerow([unicode(value).encode('utf-8') for value in row])
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    yield line(CSV_COLUMNS)
+    for model in models:
+        for instance in iter_resources(model, batch_size):
+            data = record(instance)
+            data['tags'] = ';'.join(data['tags'])
+            yield line([data[column] for column in CSV_COLUMNS])
+
+
+def gzipped(chunks):
+    """Gzip a stream of chunks as it goes."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        if isinstance(chunk, unicode):
+            chunk = chunk.encode('utf-8')
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+FORMATS = {
+    'ndjson': (ndjson, 'application/x-ndjson'),
+    'csv': (csv_rows, 'text/csv'),
+}
+
+
+def export(format, types=None, gzip=False, batch_size=1000):
+    """
+    Return a `(chunks, content_type)` pair exporting the given resource
+    types, or all of them, in the given format.
+    """
+    writer, content_type = FORMATS[format]
+    models = [EXPORT_MODELS[name] for name in (types or sorted(EXPORT_MODELS))]
+    chunks = writer(models, batch_size)
+    if gzip:
+        chunks = gzipped(chunks)
+    return chunks, content_type
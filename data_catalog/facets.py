@@ -0,0 +1,57 @@
+"""Tag facets for listings and search results, read from `TagCount`."""
+
+from urllib import urlencode
+
+from data_catalog.models import TagCount
+
+
+LISTING_PATHS = {'app': '/apps', 'data': '/data', 'project': '/projects'}
+
+
+def filter_query(tags, match_any=False):
+    """The query string that filters a listing by the given tags."""
+    params = [('tag', name.encode('utf-8')) for name in tags]
+    if match_any and tags:
+        params.append(('match', 'any'))
+    return urlencode(params)
+
+
+def listing_facets(resource_type, selected, match_any=False, limit=10):
+    """
+    The most used tags for a resource type, followed by any selected tags
+    that aren't among them. Each facet has the query string that toggles
+    its tag in or out of the current filter.
+    """
+    facets = []
+    names = set()
+    for tag_count in TagCount.facets(resource_type, limit):
+        names.add(tag_count.tag.name)
+        facets.append((tag_count.tag.name, tag_count.count))
+    facets.extend((name, None) for name in selected if name not in names)
+    return [{
+        'name': name,
+        'count': count,
+        'selected': name in selected,
+        'query': filter_query(
+            [tag for tag in selected if tag != name] if name in selected
+            else list(selected) + [name], match_any),
+    } for name, count in facets]
+
+
+def search_facets(results, limit=10):
+    """
+    The tags found on a page of search results, with how many resources of
+    each type carry them and a link to that filtered listing.
+    """
+    names = set()
+    for result in results:
+        names.update(result.tags or [])
+    if not names:
+        return []
+    return [{
+        'name': tag_count.tag.name,
+        'count': tag_count.count,
+        'resource_type': tag_count.resource_type,
+        'url': '%s?%s' % (LISTING_PATHS[tag_count.resource_type],
+                          filter_query([tag_count.tag.name])),
+    } for tag_count in TagCount.for_tags(names)[:limit]]
@@ -0,0 +1,86 @@
+"""Run the data catalog benchmarks against a scratch database."""
+
+import inspect
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import simplejson as json
+
+from data_catalog.benchmarks import BENCHMARKS, ScratchEnvironment
+
+
+class Command(BaseCommand):
+    args = '[benchmark ...]'
+    help = 'Run benchmarks against a scratch database and search index.'
+    option_list = BaseCommand.option_list + (
+        make_option('--list', action='store_true', dest='list',
+                    default=False, help='List the available benchmarks.'),
+        make_option('--param', action='append', dest='parameters', default=[],
+                    metavar='NAME=VALUE',
+                    help='Pass a whole number argument to each benchmark '
+                         'that takes it, like --param data=5000.'),
+        make_option('--json', dest='json', metavar='FILE',
+                    help='Also write the results as JSON to FILE, or to '
+                         'standard output for -.'),
+    )
+
+    def handle(self, *names, **options):
+        if options['list']:
+            for name in sorted(BENCHMARKS):
+                self.stdout.write('%s: %s\n' % (name, BENCHMARKS[name].__doc__))
+            return
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise CommandError('Unknown benchmark: %s' % ', '.join(unknown))
+        names = names or sorted(BENCHMARKS)
+        parameters = self.parse_parameters(options['parameters'], names)
+        report = {}
+        for name in names:
+            arguments = inspect.getargspec(BENCHMARKS[name]).args
+            kwargs = dict((key, value) for key, value in parameters.items()
+                          if key in arguments)
+            with ScratchEnvironment():
+                results = BENCHMARKS[name](**kwargs)
+            report[name] = {'parameters': kwargs, 'results': dict(
+                (label, dict(item for item in measurements.items()
+                             if item[0] != 'result'))
+                for label, measurements in results.items())}
+            if options['json'] != '-':
+                self.write_results(name, report[name]['results'])
+        if options['json']:
+            self.write_json(options['json'], report)
+
+    def parse_parameters(self, pairs, names):
+        parameters = {}
+        for pair in pairs:
+            try:
+                key, value = pair.split('=', 1)
+                parameters[key] = int(value)
+            except ValueError:
+                raise CommandError('Parameters look like NAME=NUMBER, '
+                                   'not %s.' % pair)
+        accepted = set()
+        for name in names:
+            accepted.update(inspect.getargspec(BENCHMARKS[name]).args)
+        unused = sorted(set(parameters) - accepted)
+        if unused:
+            raise CommandError('No benchmark takes: %s' % ', '.join(unused))
+        return parameters
+
+    def write_results(self, name, results):
+        self.stdout.write('%s\n' % name)
+        for label in sorted(results):
+            measurements = ' '.join('%s=%s' % item
+                                    for item in sorted(results[label].items()))
+            self.stdout.write('  %-28s %s\n' % (label, measurements))
+
+    def write_json(self, path, report):
+        """Write sorted, indented JSON, so runs diff line by line."""
+        output = self.stdout if path == '-' else open(path, 'w')
+        try:
+            json.dump(report, output, indent=2, sort_keys=True,
+                      separators=(',', ': '))
+            output.write('\n')
+        finally:
+            if output is not self.stdout:
+                output.close()
@@ -0,0 +1,13 @@
+"""Build the site's content-hashed CSS and JavaScript bundles."""
+
+from django.core.management.base import BaseCommand
+
+from data_catalog import bundles
+
+
+class Command(BaseCommand):
+    help = 'Concatenate and minify the STATIC_BUNDLES into hashed files.'
+
+    def handle(self, **options):
+        for name, path in sorted(bundles.build().items()):
+            self.stdout.write('%s -> %s\n' % (name, path))
@@ -0,0 +1,29 @@
+"""Fail if any of the catalog's hot lookups reads a whole table."""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_catalog import explain
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot lookups, and fail on any full table scan.'
+    option_list = BaseCommand.option_list + (
+        make_option('--database', dest='database', default='default',
+                    help='The database alias to explain the queries on.'),
+    )
+
+    def handle(self, **options):
+        failed = []
+        for label, plan, full_scan in explain.audit(options['database']):
+            self.stdout.write('%s %s\n' % ('FAIL' if full_scan else 'ok  ',
+                                           label))
+            for line in plan:
+                self.stdout.write('       %s\n' % line)
+            if full_scan:
+                failed.append(label)
+        if failed:
+            raise CommandError('Full table scans in: %s. Run '
+                               '`manage.py migrate data_catalog`?'
+                               % ', '.join(failed))
@@ -0,0 +1,42 @@
+"""Export the whole catalog as NDJSON or CSV."""
+
+import sys
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_catalog.export import EXPORT_MODELS, FORMATS, export
+
+
+class Command(BaseCommand):
+    help = 'Export every app, data set and project as NDJSON or CSV.'
+    option_list = BaseCommand.option_list + (
+        make_option('--format', dest='format', default='ndjson',
+                    help='Either ndjson (the default) or csv.'),
+        make_option('--type', action='append', dest='types', default=[],
+                    help='Only export apps, data or projects. Can be given '
+                         'more than once.'),
+        make_option('--gzip', action='store_true', dest='gzip', default=False,
+                    help='Gzip the export.'),
+        make_option('--output', dest='output', default=None,
+                    help='The file to write to, instead of standard output.'),
+    )
+
+    def handle(self, **options):
+        if options['format'] not in FORMATS:
+            raise CommandError('Unknown format: %s' % options['format'])
+        unknown = [name for name in options['types']
+                   if name not in EXPORT_MODELS]
+        if unknown:
+            raise CommandError('Unknown types: %s' % ', '.join(unknown))
+        chunks, content_type = export(options['format'], options['types'],
+                                      options['gzip'])
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, unicode):
+                    chunk = chunk.encode('utf-8')
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
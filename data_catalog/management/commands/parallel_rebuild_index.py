@@ -0,0 +1,37 @@
+"""Rebuild the search index across several processes."""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_catalog import search_rebuild
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the whole search index in parallel, and swap it in '
+            'once it is ready.')
+    option_list = BaseCommand.option_list + (
+        make_option('--workers', type='int', dest='workers', default=None,
+                    help='How many processes to use. Defaults to the number '
+                         'of CPUs.'),
+        make_option('--batch-size', type='int', dest='batch_size',
+                    default=500,
+                    help='How many resources each process reads at a time.'),
+        make_option('--keep-old', action='store_true', dest='keep_old',
+                    default=False,
+                    help='Leave the previous index on disk after the swap.'),
+    )
+
+    def handle(self, **options):
+        try:
+            result = search_rebuild.rebuild(options['workers'],
+                                            options['batch_size'],
+                                            options['keep_old'])
+        except search_rebuild.IndexNotLinked, e:
+            raise CommandError('%s is a directory, so it can\'t be swapped '
+                               'in one step. Move it aside and link to it '
+                               'from there first.' % e)
+        rate = result['documents'] / max(result['seconds'], 0.001)
+        self.stdout.write('Indexed %d resources in %.1f seconds '
+                          '(%.0f docs/sec).\n'
+                          % (result['documents'], result['seconds'], rate))
@@ -0,0 +1,30 @@
+"""Write queued resource changes to the search index."""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from data_catalog import search_queue
+
+
+class Command(BaseCommand):
+    help = 'Write queued resource changes to the search index in batches.'
+    option_list = BaseCommand.option_list + (
+        make_option('--batch-size', type='int', dest='batch_size',
+                    default=search_queue.BATCH_SIZE,
+                    help='How many queued items to take at a time.'),
+        make_option('--loop', type='int', dest='interval', default=0,
+                    help='Keep running, checking the queue every INTERVAL '
+                         'seconds.'),
+    )
+
+    def handle(self, **options):
+        if options['interval']:
+            search_queue.run_forever(options['interval'],
+                                     options['batch_size'], self.report)
+        else:
+            self.report(search_queue.process_all(options['batch_size']))
+
+    def report(self, counts):
+        self.stdout.write('Updated %(updated)d and removed %(removed)d '
+                          'resources.\n' % counts)
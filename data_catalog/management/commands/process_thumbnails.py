@@ -0,0 +1,30 @@
+"""Make the queued thumbnails of uploaded images."""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from data_catalog import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Resize uploaded app and project images into their thumbnails.'
+    option_list = BaseCommand.option_list + (
+        make_option('--batch-size', type='int', dest='batch_size',
+                    default=50,
+                    help='How many queued thumbnails to take at a time.'),
+        make_option('--loop', type='int', dest='interval', default=0,
+                    help='Keep running, checking the queue every INTERVAL '
+                         'seconds.'),
+    )
+
+    def handle(self, **options):
+        if options['interval']:
+            thumbnails.run_forever(options['interval'],
+                                   options['batch_size'], self.report)
+        else:
+            self.report(thumbnails.process_all(options['batch_size']))
+
+    def report(self, counts):
+        self.stdout.write('Made %(made)d and dropped %(dropped)d '
+                          'thumbnails.\n' % counts)
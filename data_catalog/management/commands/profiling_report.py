@@ -0,0 +1,45 @@
+"""Summarize the requests sampled by the profiling middleware."""
+
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from data_catalog import profiling
+
+
+class Command(BaseCommand):
+    help = 'Print latency percentiles by view, and the slowest queries.'
+    option_list = BaseCommand.option_list + (
+        make_option('--log', dest='log', default=settings.PROFILING_LOG,
+                    help='The profiling log to read.'),
+        make_option('--queries', type='int', dest='queries', default=10,
+                    help='How many of the slowest queries to show.'),
+    )
+
+    def handle(self, **options):
+        records = profiling.read_records(options['log'],
+                                         settings.PROFILING_LOG_BACKUPS)
+        views, queries = profiling.summarize(records, options['queries'])
+        if not views:
+            raise CommandError('No profiled requests in %s.' % options['log'])
+        self.stdout.write('%-44s %6s %9s %9s %9s %7s %8s %8s %6s\n' % (
+            'view', 'count', 'p50 ms', 'p95 ms', 'p99 ms', 'queries',
+            'sql ms', 'tmpl ms', 'hits'))
+        ordered = sorted(views.items(), key=lambda item: -sum(item[1]['timings']))
+        for name, view in ordered:
+            timings = profiling.percentiles(view['timings'])
+            count = float(view['requests'])
+            lookups = view['cache_hits'] + view['cache_misses']
+            self.stdout.write(
+                '%-44s %6d %9.1f %9.1f %9.1f %7.1f %8.1f %8.1f %6s\n' % (
+                    name, view['requests'], timings['p50_ms'],
+                    timings['p95_ms'], timings['p99_ms'],
+                    view['queries'] / count, view['sql_ms'] / count,
+                    view['template_ms'] / count,
+                    '%d%%' % (100 * view['cache_hits'] / lookups)
+                    if lookups else '-'))
+        if queries:
+            self.stdout.write('\nSlowest queries:\n')
+        for ms, view, sql in queries:
+            self.stdout.write('%9.1f ms  %s\n    %s\n' % (ms, view, sql))
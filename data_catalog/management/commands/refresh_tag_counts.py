@@ -0,0 +1,23 @@
+"""Recount the tags on every resource type."""
+
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from data_catalog.models import TagCount
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the tag counts that listing and search facets are read from.'
+    option_list = BaseCommand.option_list + (
+        make_option('--loop', type='int', dest='interval', default=0,
+                    help='Keep running, recounting every INTERVAL seconds.'),
+    )
+
+    def handle(self, **options):
+        while True:
+            self.stdout.write('Counted %d tags.\n' % TagCount.refresh())
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
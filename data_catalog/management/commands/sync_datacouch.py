@@ -0,0 +1,37 @@
+"""Sync new and changed data sets from Data Couch into the catalog."""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from data_catalog import datacouch
+
+
+class Command(BaseCommand):
+    help = 'Sync new and changed data sets from Data Couch.'
+    option_list = BaseCommand.option_list + (
+        make_option('--user', dest='user', default=None,
+                    help='The Data Couch user to sync. Defaults to the '
+                         'DATACOUCH_USER setting.'),
+        make_option('--force', action='store_true', dest='force',
+                    default=False,
+                    help='Ignore the ETag and Last-Modified of the last sync.'),
+        make_option('--loop', type='int', dest='interval', default=0,
+                    help='Keep running, syncing every INTERVAL seconds.'),
+    )
+
+    def handle(self, **options):
+        user = options['user']
+        if options['interval']:
+            datacouch.run_forever(options['interval'], user, self.report)
+        else:
+            self.report(datacouch.sync(user, force=options['force']))
+
+    def report(self, counts):
+        if counts is None:
+            self.stdout.write('Data Couch has not changed since the last sync.\n')
+        elif isinstance(counts, dict):
+            self.stdout.write('Created %(created)d and updated %(updated)d '
+                              'data sets.\n' % counts)
+        else:
+            self.stderr.write('Data Couch sync failed: %s\n' % counts)
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+def restore_indexes():
+    """
+    SQLite adds and drops columns by remaking the table, which loses its
+    single column indexes, so make those again.
+    """
+    if db.backend_name == 'sqlite3':
+        db.create_index('data_catalog_project', ['name'])
+        db.create_index('data_catalog_project', ['user_id'])
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'FeaturedRotation'
+        db.create_table('data_catalog_featuredrotation', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('project', self.gf('django.db.models.fields.related.OneToOneField')(related_name='rotation', unique=True, to=orm['data_catalog.Project'])),
+            ('position', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+        ))
+        db.send_create_signal('data_catalog', ['FeaturedRotation'])
+
+        # Adding model 'Thumbnail'
+        db.create_table('data_catalog_thumbnail', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('source', self.gf('django.db.models.fields.CharField')(max_length=255)),
+            ('size', self.gf('django.db.models.fields.CharField')(max_length=20)),
+            ('format', self.gf('django.db.models.fields.CharField')(max_length=4)),
+            ('name', self.gf('django.db.models.fields.CharField')(max_length=255, blank=True)),
+            ('queued_at', self.gf('django.db.models.fields.DateTimeField')(auto_now_add=True, blank=True)),
+        ))
+        db.send_create_signal('data_catalog', ['Thumbnail'])
+
+        # Adding unique constraint on 'Thumbnail', fields ['source', 'size', 'format']
+        db.create_unique('data_catalog_thumbnail', ['source', 'size', 'format'])
+
+        # Adding model 'TagCount'
+        db.create_table('data_catalog_tagcount', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('resource_type', self.gf('django.db.models.fields.CharField')(max_length=10)),
+            ('tag', self.gf('django.db.models.fields.related.ForeignKey')(to=orm['taggit.Tag'])),
+            ('count', self.gf('django.db.models.fields.IntegerField')()),
+        ))
+        db.send_create_signal('data_catalog', ['TagCount'])
+
+        # Adding unique constraint on 'TagCount', fields ['resource_type', 'tag']
+        db.create_unique('data_catalog_tagcount', ['resource_type', 'tag_id'])
+
+        # Adding model 'SearchQueueItem'
+        db.create_table('data_catalog_searchqueueitem', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('model', self.gf('django.db.models.fields.CharField')(max_length=100)),
+            ('object_id', self.gf('django.db.models.fields.IntegerField')()),
+            ('action', self.gf('django.db.models.fields.CharField')(default='update', max_length=6)),
+            ('queued_at', self.gf('django.db.models.fields.DateTimeField')(auto_now_add=True, blank=True)),
+        ))
+        db.send_create_signal('data_catalog', ['SearchQueueItem'])
+
+        # Adding model 'SyncState'
+        db.create_table('data_catalog_syncstate', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('source', self.gf('django.db.models.fields.CharField')(unique=True, max_length=150)),
+            ('etag', self.gf('django.db.models.fields.CharField')(max_length=255, blank=True)),
+            ('last_modified', self.gf('django.db.models.fields.CharField')(max_length=64, blank=True)),
+            ('synced_at', self.gf('django.db.models.fields.DateTimeField')(auto_now=True, blank=True)),
+        ))
+        db.send_create_signal('data_catalog', ['SyncState'])
+
+        # Adding field 'Project.supporter_count'
+        db.add_column('data_catalog_project', 'supporter_count',
+                      self.gf('django.db.models.fields.PositiveIntegerField')(default=0),
+                      keep_default=False)
+        # Count the supporters projects already have.
+        db.execute('UPDATE data_catalog_project SET supporter_count = ('
+                   'SELECT COUNT(*) FROM data_catalog_supporter_projects '
+                   'WHERE data_catalog_supporter_projects.project_id = '
+                   'data_catalog_project.id)')
+        restore_indexes()
+
+
+    def backwards(self, orm):
+        # Removing unique constraint on 'TagCount', fields ['resource_type', 'tag']
+        db.delete_unique('data_catalog_tagcount', ['resource_type', 'tag_id'])
+
+        # Removing unique constraint on 'Thumbnail', fields ['source', 'size', 'format']
+        db.delete_unique('data_catalog_thumbnail', ['source', 'size', 'format'])
+
+        # Deleting model 'FeaturedRotation'
+        db.delete_table('data_catalog_featuredrotation')
+
+        # Deleting model 'Thumbnail'
+        db.delete_table('data_catalog_thumbnail')
+
+        # Deleting model 'TagCount'
+        db.delete_table('data_catalog_tagcount')
+
+        # Deleting model 'SearchQueueItem'
+        db.delete_table('data_catalog_searchqueueitem')
+
+        # Deleting model 'SyncState'
+        db.delete_table('data_catalog_syncstate')
+
+        # Deleting field 'Project.supporter_count'
+        db.delete_column('data_catalog_project', 'supporter_count')
+        restore_indexes()
+
+
+    models = {
+        'auth.group': {
+            'Meta': {'object_name': 'Group'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '80'}),
+            'permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'})
+        },
+        'auth.permission': {
+            'Meta': {'ordering': "('content_type__app_label', 'content_type__model', 'codename')", 'unique_together': "(('content_type', 'codename'),)", 'object_name': 'Permission'},
+            'codename': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['contenttypes.ContentType']"}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'})
+        },
+        'auth.user': {
+            'Meta': {'object_name': 'User'},
+            'date_joined': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '75', 'blank': 'True'}),
+            'first_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'groups': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Group']", 'symmetrical': 'False', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_active': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'is_staff': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'is_superuser': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'last_login': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'last_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'password': ('django.db.models.fields.CharField', [], {'max_length': '128'}),
+            'user_permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'}),
+            'username': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '30'})
+        },
+        'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        },
+        'data_catalog.app': {
+            'Meta': {'object_name': 'App'},
+            'description': ('django.db.models.fields.TextField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'image': ('django.db.models.fields.files.ImageField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '150', 'db_index': 'True'}),
+            'slug': ('autoslug.fields.AutoSlugField', [], {'unique': 'True', 'max_length': '50', 'populate_from': 'None', 'unique_with': '()'}),
+            'url': ('django.db.models.fields.URLField', [], {'max_length': '200'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['auth.User']", 'null': 'True', 'blank': 'True'})
+        },
+        'data_catalog.data': {
+            'Meta': {'object_name': 'Data'},
+            'description': ('django.db.models.fields.TextField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '150', 'db_index': 'True'}),
+            'slug': ('autoslug.fields.AutoSlugField', [], {'unique': 'True', 'max_length': '50', 'populate_from': 'None', 'unique_with': '()'}),
+            'url': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['auth.User']", 'null': 'True', 'blank': 'True'})
+        },
+        'data_catalog.featuredrotation': {
+            'Meta': {'ordering': "('position', 'id')", 'object_name': 'FeaturedRotation'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'position': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'project': ('django.db.models.fields.related.OneToOneField', [], {'related_name': "'rotation'", 'unique': 'True', 'to': "orm['data_catalog.Project']"})
+        },
+        'data_catalog.link': {
+            'Meta': {'object_name': 'Link'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'url': ('django.db.models.fields.URLField', [], {'max_length': '200'})
+        },
+        'data_catalog.project': {
+            'Meta': {'object_name': 'Project'},
+            'description': ('django.db.models.fields.TextField', [], {}),
+            'embed_url': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'}),
+            'featured': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'image': ('django.db.models.fields.files.ImageField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '150', 'db_index': 'True'}),
+            'organization': ('django.db.models.fields.CharField', [], {'max_length': '150'}),
+            'slug': ('autoslug.fields.AutoSlugField', [], {'unique': 'True', 'max_length': '50', 'populate_from': 'None', 'unique_with': '()'}),
+            'supporter_count': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['auth.User']", 'null': 'True', 'blank': 'True'}),
+            'video_url': ('django.db.models.fields.URLField', [], {'max_length': '200'})
+        },
+        'data_catalog.searchqueueitem': {
+            'Meta': {'object_name': 'SearchQueueItem'},
+            'action': ('django.db.models.fields.CharField', [], {'default': "'update'", 'max_length': '6'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'object_id': ('django.db.models.fields.IntegerField', [], {}),
+            'queued_at': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'})
+        },
+        'data_catalog.supporter': {
+            'Meta': {'object_name': 'Supporter'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'links': ('django.db.models.fields.related.ManyToManyField', [], {'related_name': "'supporters'", 'symmetrical': 'False', 'to': "orm['data_catalog.Link']"}),
+            'projects': ('django.db.models.fields.related.ManyToManyField', [], {'related_name': "'supporters'", 'symmetrical': 'False', 'to': "orm['data_catalog.Project']"}),
+            'user': ('django.db.models.fields.related.OneToOneField', [], {'to': "orm['auth.User']", 'unique': 'True'})
+        },
+        'data_catalog.syncstate': {
+            'Meta': {'object_name': 'SyncState'},
+            'etag': ('django.db.models.fields.CharField', [], {'max_length': '255', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'last_modified': ('django.db.models.fields.CharField', [], {'max_length': '64', 'blank': 'True'}),
+            'source': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '150'}),
+            'synced_at': ('django.db.models.fields.DateTimeField', [], {'auto_now': 'True', 'blank': 'True'})
+        },
+        'data_catalog.tagcount': {
+            'Meta': {'unique_together': "(('resource_type', 'tag'),)", 'object_name': 'TagCount'},
+            'count': ('django.db.models.fields.IntegerField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'resource_type': ('django.db.models.fields.CharField', [], {'max_length': '10'}),
+            'tag': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['taggit.Tag']"})
+        },
+        'data_catalog.thumbnail': {
+            'Meta': {'unique_together': "(('source', 'size', 'format'),)", 'object_name': 'Thumbnail'},
+            'format': ('django.db.models.fields.CharField', [], {'max_length': '4'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '255', 'blank': 'True'}),
+            'queued_at': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'size': ('django.db.models.fields.CharField', [], {'max_length': '20'}),
+            'source': ('django.db.models.fields.CharField', [], {'max_length': '255'})
+        },
+        'taggit.tag': {
+            'Meta': {'object_name': 'Tag'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'unique': 'True', 'max_length': '100'})
+        },
+        'taggit.taggeditem': {
+            'Meta': {'object_name': 'TaggedItem'},
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'taggit_taggeditem_tagged_items'", 'to': "orm['contenttypes.ContentType']"}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'object_id': ('django.db.models.fields.IntegerField', [], {'db_index': 'True'}),
+            'tag': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'taggit_taggeditem_items'", 'to': "orm['taggit.Tag']"})
+        }
+    }
+
+    complete_apps = ['data_catalog']
\ No newline at end of file
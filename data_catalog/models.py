@@ -1,13 +1,23 @@
 """Models for the data catalog."""
 
-import re
-from urllib import urlencode
+import time
+from datetime import datetime
 
-from django.db import models
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.signals import request_finished
+from django.db import (IntegrityError, close_connection, connection, models,
+                       transaction)
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.contrib.auth.models import User
 from autoslug import AutoSlugField
 from taggit.managers import TaggableManager
-from taggit.models import Tag
+from taggit.models import Tag, TaggedItem
+
+from data_catalog import autocomplete, caching, databases, video
+from data_catalog.utils import bulk_insert, bulk_update, unique_slug
 
 
 class Resource(models.Model):
@@ -46,15 +56,104 @@ class Data(Resource):
 
     @staticmethod
     def check_exists(data_sets):
-        """Check to see if data sets from Data Couch already exist."""
-        for data in reversed(data_sets):
-            name = data['value']
-            url = 'http://datacouch.com/edit/#/' + data['id']
-            instance, created = Data.objects.get_or_create(name=name, url=url)
-            if created:
-                instance.description = data['doc']['description']
-                instance.slug = data['id']
-                instance.save()
+        """
+        Check to see if data sets from Data Couch already exist, and import
+        the ones that don't. Returns the counts from `bulk_import`.
+        """
+        # Data Couch lists newest first, so older data sets get created first.
+        return Data.bulk_import([{
+            'name': data['value'],
+            'url': 'http://datacouch.com/edit/#/' + data['id'],
+            'description': data['doc']['description'],
+            'slug': data['id'],
+        } for data in reversed(data_sets)])
+
+    @staticmethod
+    @transaction.commit_on_success
+    def bulk_import(data_sets):
+        """
+        Create or update data sets keyed on their URL, which stays the same
+        when a data set is renamed; only data sets without one are keyed on
+        their name. Existing rows are read with a single query, and the
+        descriptions of just the ones being imported again with one more per
+        batch. Missing rows are inserted in batches with their unique slugs
+        worked out up front, and changed names and descriptions are updated
+        in batches. Returns a dictionary with the number of `created`,
+        `updated` and `unchanged` data sets.
+        """
+        existing, taken = {}, set()
+        last_pk = 0
+        for pk, name, url, slug in Data.objects.order_by('-pk').values_list(
+                'pk', 'name', 'url', 'slug'):
+            # Of rows with the same key, the oldest is the one kept.
+            existing[Data._import_key(name, url)] = (pk, name)
+            taken.add(slug)
+            last_pk = max(last_pk, pk)
+        # A data set listed twice takes its last values, in its first place.
+        imported, keys = {}, []
+        for data in data_sets:
+            key = Data._import_key(data['name'], data['url'])
+            if key not in imported:
+                keys.append(key)
+            imported[key] = data
+        descriptions = Data._descriptions([existing[key][0] for key in keys
+                                           if key in existing])
+        slug_field = Data._meta.get_field('slug')
+        new, names, changed, unchanged = [], {}, {}, 0
+        for key in keys:
+            data = imported[key]
+            description = data.get('description', '')
+            if key not in existing:
+                slug = unique_slug(slug_field, data.get('slug') or data['name'],
+                                   taken)
+                new.append(Data(name=data['name'], url=data['url'], slug=slug,
+                                description=description))
+                continue
+            pk, name = existing[key]
+            if name != data['name']:
+                names[pk] = data['name']
+            if descriptions[pk] != description:
+                changed[pk] = description
+            if pk not in names and pk not in changed:
+                unchanged += 1
+        bulk_insert(Data, new)
+        bulk_update(Data, 'name', names.items())
+        bulk_update(Data, 'description', changed.items())
+        updated = set(names) | set(changed)
+        if new or updated:
+            caching.bump_version(Data.type)
+        Data._update_search_index(last_pk if new else None, updated)
+        return {'created': len(new), 'updated': len(updated),
+                'unchanged': unchanged}
+
+    @staticmethod
+    def _import_key(name, url):
+        return url or (None, name)
+
+    @staticmethod
+    def _descriptions(pks, batch_size=500):
+        """Read the descriptions of the given rows, a batch at a time."""
+        descriptions = {}
+        for start in xrange(0, len(pks), batch_size):
+            descriptions.update(Data.objects.filter(
+                pk__in=pks[start:start + batch_size]).values_list(
+                    'pk', 'description'))
+        return descriptions
+
+    @staticmethod
+    def _update_search_index(last_pk, updated_pks):
+        """
+        Bulk writes skip the `post_save` signal, so the new and changed rows
+        are queued for the search index here, to be written in one commit by
+        `process_search_queue`. New rows are the ones past `last_pk`, which
+        is `None` if none were added.
+        """
+        pks = list(updated_pks)
+        if last_pk is not None:
+            pks.extend(Data.objects.filter(pk__gt=last_pk)
+                       .values_list('pk', flat=True))
+        if pks:
+            SearchQueueItem.enqueue(Data, pks)
 
 
 class Project(Resource):
@@ -64,58 +163,80 @@ class Project(Resource):
     embed_url = models.URLField('Embed URL', verify_exists=False, blank=True)
     image = models.ImageField(upload_to='projects', blank=True, null=True)
     featured = models.BooleanField()
+    supporter_count = models.PositiveIntegerField(default=0, editable=False)
     type = 'project'
 
+    def __init__(self, *args, **kwargs):
+        super(Project, self).__init__(*args, **kwargs)
+        # The video URL the current `embed_url` was made from. Read from
+        # `__dict__` so that deferred fields aren't loaded.
+        self._embedded_video_url = (self.__dict__.get('embed_url') and
+                                    self.__dict__.get('video_url'))
+
     def save_embed_url(self):
-        """Code generated to embed a video -- either from YouTube or Vimeo."""
-        video_url = self.video_url
-        hosting_provider, video_id = self.parse_video_id(video_url)
-        if hosting_provider == 'youtube':
-            embed_url = 'http://www.youtube.com/embed/%s' % (video_id)
-        elif hosting_provider == 'vimeo':
-            # Haven't added a color parameter yet.
-            params = urlencode({
-                'byline': 0,
-                'portrait': 0,
-                'title': 0,
-            })
-            embed_url = 'http://player.vimeo.com/video/%s?%s' % (video_id, params)
-        else:
-            # It was neither YouTube or Vimeo.
-            raise Exception("You did not provide a correct YouTube or Vimeo link.")
-        self.embed_url = embed_url
+        """
+        Set the URL to embed the project's video with. Raises
+        `UnknownVideoURL` unless it's a YouTube or Vimeo link.
+        """
+        self.embed_url = video.embed_url(self.video_url)
 
     def parse_video_id(self, video_url):
         """
         Given a video URL, parse the relevant hosting provider (YouTube,
         Vimeo) and unique video ID.
         """
-        if 'youtube' in video_url:
-            hosting_provider = 'youtube'
-            video_id = re.search(r'v=(.\w+)', video_url).group(1)
-        elif 'vimeo' in video_url:
-            hosting_provider = 'vimeo'
-            video_id = re.search(r'\d+', video_url).group()
-        else:
-            hosting_provider, video_id = None, None
-        return hosting_provider, video_id
+        return video.parse(video_url)
 
     @staticmethod
-    def featured_project():
-        """Return the currently featured project or None."""
-        try:
-            featured = Project.objects.get(featured=True)
-        except:
-            featured = None
-        return featured
+    def featured_project(now=None):
+        """
+        Return the featured project, or None. When projects are scheduled
+        in the `FeaturedRotation`, each takes its turn for
+        `FEATURED_ROTATION_SECONDS`; otherwise it's the project marked as
+        `featured`. The rotation is cached, so this needn't query.
+        """
+        schedule = caching.get_featured()
+        if schedule is None:
+            schedule = Project.featured_schedule()
+            caching.set_featured(schedule)
+        if not schedule:
+            return None
+        now = time.time() if now is None else now
+        slot = int(now // settings.FEATURED_ROTATION_SECONDS)
+        return schedule[slot % len(schedule)]
+
+    @staticmethod
+    def featured_schedule():
+        """The projects in the featured rotation, in order."""
+        rotation = FeaturedRotation.objects.select_related('project')
+        schedule = [entry.project for entry in rotation]
+        return schedule or list(Project.objects.filter(featured=True)[:1])
 
     def save(self, **kwargs):
         """
         Overwrite the normal save method so that an `embed_url` is generated
-        for the model.
+        for the model whenever its `video_url` changes. Only one project is
+        featured at a time, so featuring this one unfeatures any other.
         """
-        self.save_embed_url()
+        if self.video_url != self._embedded_video_url or not self.embed_url:
+            self.save_embed_url()
         super(Project, self).save(**kwargs)
+        self._embedded_video_url = self.video_url
+        if self.featured:
+            (Project.objects.filter(featured=True).exclude(pk=self.pk)
+             .update(featured=False))
+
+
+class FeaturedRotation(models.Model):
+    """A project's turn in the rotation of featured projects."""
+    project = models.OneToOneField(Project, related_name='rotation')
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('position', 'id')
+
+    def __unicode__(self):
+        return u'%d. %s' % (self.position, self.project)
 
 
 class Supporter(models.Model):
@@ -130,23 +251,273 @@ class Supporter(models.Model):
     @staticmethod
     def add_project_supporter(project, user):
         """
-        Get or create a supporter instance from a user, and add that
-        supporter instance to a project.
+        Add a user as a supporter of a project, by instance or slug, and
+        return the project's new `supporter_count`. Adding a supporter twice
+        changes nothing.
         """
-        if isinstance(project, unicode):
-            # Then it's actually a project slug.
-            project = Project.objects.get(slug=project)
-        supporter, existed = Supporter.objects.get_or_create(user=user)
-        project.supporters.add(supporter)
+        return Supporter.set_support(project, user, True)
 
     @staticmethod
     def remove_project_supporter(project, user):
-        """Remove a supporter from a project."""
-        if isinstance(project, unicode):
-            # Then it's actually a project slug.
-            project = Project.objects.get(slug=project)
-        supporter, existed = Supporter.objects.get_or_create(user=user)
-        project.supporters.remove(supporter)
+        """Remove a supporter from a project, and return the new count."""
+        return Supporter.set_support(project, user, False)
+
+    @staticmethod
+    @transaction.commit_on_success
+    def set_support(project, user, supporting):
+        """
+        Make a user support a project or not, and return the project's
+        `supporter_count`. The project and the user's supporter row are
+        looked up together, and the through-table row is inserted only if
+        it's missing or deleted only if it's there, so repeated and
+        concurrent requests leave the count right. `project` can be an
+        instance or a slug; an unknown slug raises `Project.DoesNotExist`.
+        """
+        qn = connection.ops.quote_name
+        field = Supporter._meta.get_field('projects')
+        through = qn(field.rel.through._meta.db_table)
+        supporter_column = qn(field.m2m_column_name())
+        project_column = qn(field.m2m_reverse_name())
+        projects = qn(Project._meta.db_table)
+        supporters = qn(Supporter._meta.db_table)
+        cursor = connection.cursor()
+        if isinstance(project, basestring):
+            lookup, value = qn('slug'), project
+        else:
+            lookup, value = qn('id'), project.pk
+        cursor.execute(
+            'SELECT p.%s, s.%s FROM %s p LEFT OUTER JOIN %s s ON s.%s = %%s '
+            'WHERE p.%s = %%s' % (qn('id'), qn('id'), projects, supporters,
+                                  qn('user_id'), lookup), [user.pk, value])
+        row = cursor.fetchone()
+        if row is None:
+            raise Project.DoesNotExist
+        project_id, supporter_id = row
+        if supporter_id is None and supporting:
+            supporter_id = Supporter.objects.get_or_create(user=user)[0].pk
+        changed = 0
+        if supporter_id is not None and supporting:
+            savepoint = transaction.savepoint()
+            try:
+                cursor.execute(
+                    'INSERT INTO %s (%s, %s) SELECT %%s, %%s WHERE NOT EXISTS '
+                    '(SELECT 1 FROM %s WHERE %s = %%s AND %s = %%s)' % (
+                        through, supporter_column, project_column, through,
+                        supporter_column, project_column),
+                    [supporter_id, project_id, supporter_id, project_id])
+            except IntegrityError:
+                # Another request inserted the same row first.
+                transaction.savepoint_rollback(savepoint)
+            else:
+                transaction.savepoint_commit(savepoint)
+                changed = cursor.rowcount
+        elif supporter_id is not None:
+            cursor.execute('DELETE FROM %s WHERE %s = %%s AND %s = %%s' % (
+                through, supporter_column, project_column),
+                [supporter_id, project_id])
+            changed = -cursor.rowcount
+        if changed:
+            cursor.execute('UPDATE %s SET %s = %s + %%s WHERE %s = %%s' % (
+                projects, qn('supporter_count'), qn('supporter_count'),
+                qn('id')), [changed, project_id])
+        cursor.execute('SELECT %s FROM %s WHERE %s = %%s' % (
+            qn('supporter_count'), projects, qn('id')), [project_id])
+        count = cursor.fetchone()[0]
+        if isinstance(project, Project):
+            project.supporter_count = count
+        transaction.set_dirty()
+        if changed:
+            databases.wrote()
+        return count
+
+    @staticmethod
+    def projects_changed(sender, instance, action, reverse, pk_set, **kwargs):
+        """
+        Signal handler that recounts the `supporter_count` of the projects a
+        supporter was added to or removed from through the many-to-many
+        managers, as the admin does, rather than through `set_support`.
+        """
+        if action == 'pre_clear' and not reverse:
+            # Which projects a clear affects is only known before it.
+            instance._cleared_projects = list(
+                instance.projects.values_list('pk', flat=True))
+            return
+        if action not in ('post_add', 'post_remove', 'post_clear'):
+            return
+        if reverse:
+            project_ids = [instance.pk]
+        elif action == 'post_clear':
+            project_ids = instance.__dict__.pop('_cleared_projects', [])
+        else:
+            project_ids = list(pk_set)
+        if not project_ids:
+            return
+        qn = connection.ops.quote_name
+        field = Supporter._meta.get_field('projects')
+        through = qn(field.rel.through._meta.db_table)
+        projects = qn(Project._meta.db_table)
+        connection.cursor().execute(
+            'UPDATE %s SET %s = (SELECT COUNT(*) FROM %s WHERE %s = %s.%s) '
+            'WHERE %s IN (%s)' % (
+                projects, qn('supporter_count'), through,
+                qn(field.m2m_reverse_name()), projects, qn('id'), qn('id'),
+                ', '.join(['%s'] * len(project_ids))), project_ids)
+        transaction.commit_unless_managed()
+        if reverse:
+            instance.supporter_count = Project.objects.filter(
+                pk=instance.pk).values_list('supporter_count', flat=True)[0]
+        databases.wrote()
+
+
+class SyncState(models.Model):
+    """The conditional request headers from the last Data Couch sync."""
+    source = models.CharField(max_length=150, unique=True)
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    def __unicode__(self):
+        return self.source
+
+
+class SearchQueueItem(models.Model):
+    """A resource waiting to be written to, or removed from, the search index."""
+    UPDATE, DELETE = 'update', 'delete'
+    ACTIONS = ((UPDATE, 'Update'), (DELETE, 'Delete'))
+
+    model = models.CharField(max_length=100)
+    object_id = models.IntegerField()
+    action = models.CharField(max_length=6, choices=ACTIONS, default=UPDATE)
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    def __unicode__(self):
+        return u'%s %s.%s' % (self.action, self.model, self.object_id)
+
+    @staticmethod
+    def enqueue(model, pks, action=UPDATE):
+        """Queue instances of a model by primary key, in one write."""
+        label = '%s.%s' % (model._meta.app_label, model._meta.module_name)
+        now = datetime.now()
+        bulk_insert(SearchQueueItem, [
+            SearchQueueItem(model=label, object_id=pk, action=action,
+                            queued_at=now) for pk in pks])
+        transaction.commit_unless_managed()
+
+    @staticmethod
+    def dequeue(last_pk):
+        """Delete every queued item up to and including `last_pk`."""
+        qn = connection.ops.quote_name
+        connection.cursor().execute('DELETE FROM %s WHERE %s <= %%s' % (
+            qn(SearchQueueItem._meta.db_table), qn('id')), [last_pk])
+        transaction.commit_unless_managed()
+
+
+class TagCount(models.Model):
+    """
+    How many resources of one type carry a tag. The table is rebuilt by
+    the `refresh_tag_counts` command, so facets never need a `GROUP BY`
+    over the tagged items while serving a page.
+    """
+    resource_type = models.CharField(max_length=10)
+    tag = models.ForeignKey(Tag)
+    count = models.IntegerField()
+
+    class Meta:
+        unique_together = ('resource_type', 'tag')
+
+    def __unicode__(self):
+        return u'%s %s (%d)' % (self.resource_type, self.tag, self.count)
+
+    @staticmethod
+    @transaction.commit_on_success
+    def refresh():
+        """Recount every tag per resource type, and return the row count."""
+        counts = []
+        for model in (App, Data, Project):
+            content_type = ContentType.objects.get_for_model(model)
+            rows = (TaggedItem.objects.filter(content_type=content_type)
+                    .values_list('tag').annotate(count=Count('pk')))
+            counts.extend(TagCount(resource_type=model.type, tag_id=tag_id,
+                                   count=count) for tag_id, count in rows)
+        TagCount.objects.all().delete()
+        bulk_insert(TagCount, counts)
+        for model in (App, Data, Project):
+            caching.bump_version(model.type)
+        return len(counts)
+
+    @staticmethod
+    def facets(resource_type, limit=10):
+        """The most used tags for a resource type."""
+        return (TagCount.objects.filter(resource_type=resource_type)
+                .select_related('tag').order_by('-count', 'tag__name')[:limit])
+
+    @staticmethod
+    def for_tags(names):
+        """The counts of the named tags across every resource type."""
+        return (TagCount.objects.filter(tag__name__in=names)
+                .select_related('tag').order_by('-count', 'tag__name'))
+
+
+class Thumbnail(models.Model):
+    """
+    A resized copy of an uploaded app or project image, in one of the
+    `THUMBNAIL_SIZES` and `THUMBNAIL_FORMATS`. It's queued with an empty
+    `name` when the image is saved, and the `process_thumbnails` worker
+    fills the name in once the file has been written.
+    """
+    source = models.CharField(max_length=255)
+    size = models.CharField(max_length=20)
+    format = models.CharField(max_length=4)
+    name = models.CharField(max_length=255, blank=True)
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('source', 'size', 'format')
+
+    def __unicode__(self):
+        return u'%s %s %s' % (self.source, self.size, self.format)
+
+    @staticmethod
+    def enqueue(sources):
+        """Queue every missing size and format of the given images."""
+        existing = set(Thumbnail.objects.filter(source__in=sources)
+                       .values_list('source', 'size', 'format'))
+        now = datetime.now()
+        bulk_insert(Thumbnail, [
+            Thumbnail(source=source, size=size, format=format, queued_at=now)
+            for source in set(sources)
+            for size in settings.THUMBNAIL_SIZES
+            for format in settings.THUMBNAIL_FORMATS
+            if (source, size, format) not in existing])
+        transaction.commit_unless_managed()
+
+    @staticmethod
+    def image_saved(sender, instance, **kwargs):
+        """Signal handler that queues thumbnails of an uploaded image."""
+        if instance.image:
+            Thumbnail.enqueue([instance.image.name])
+
+    @staticmethod
+    def prefetch(instances):
+        """
+        Attach the finished thumbnails of a list of resources' images as a
+        `thumbnails` dictionary of `(size, format)` to URL, with one query.
+        """
+        instances = list(instances)
+        sources = [instance.image.name for instance in instances
+                   if getattr(instance, 'image', None)]
+        found = {}
+        if sources:
+            made = (Thumbnail.objects.filter(source__in=sources)
+                    .exclude(name='')
+                    .values_list('source', 'size', 'format', 'name'))
+            for source, size, format, name in made:
+                found.setdefault(source, {})[(size, format)] = (
+                    settings.MEDIA_URL + name)
+        for instance in instances:
+            image = getattr(instance, 'image', None)
+            instance.thumbnails = found.get(image and image.name, {})
+        return instances
 
 
 class Link(models.Model):
@@ -155,3 +526,30 @@ class Link(models.Model):
 
     def __unicode__(self):
         return self.url
+
+
+for resource in (App, Data, Project):
+    post_save.connect(caching.invalidate_resource, sender=resource)
+    post_delete.connect(caching.invalidate_resource, sender=resource)
+post_save.connect(Thumbnail.image_saved, sender=App)
+post_save.connect(Thumbnail.image_saved, sender=Project)
+post_save.connect(caching.invalidate_featured, sender=Project)
+post_delete.connect(caching.invalidate_featured, sender=Project)
+post_save.connect(caching.invalidate_rotation, sender=FeaturedRotation)
+post_delete.connect(caching.invalidate_rotation, sender=FeaturedRotation)
+post_save.connect(caching.invalidate_member, sender=User)
+post_delete.connect(caching.invalidate_member, sender=User)
+post_save.connect(caching.invalidate_tagged_item, sender=TaggedItem)
+post_delete.connect(caching.invalidate_tagged_item, sender=TaggedItem)
+post_save.connect(caching.invalidate_tag, sender=Tag)
+post_delete.connect(caching.invalidate_tag, sender=Tag)
+post_save.connect(autocomplete.tag_saved, sender=Tag)
+post_delete.connect(autocomplete.tag_deleted, sender=Tag)
+post_save.connect(autocomplete.tagged_item_saved, sender=TaggedItem)
+post_delete.connect(autocomplete.tagged_item_deleted, sender=TaggedItem)
+m2m_changed.connect(Supporter.projects_changed,
+                    sender=Supporter.projects.through)
+connection_created.connect(databases.connection_opened)
+if settings.DATABASE_CONNECTION_MAX_AGE:
+    request_finished.disconnect(close_connection)
+    request_finished.connect(databases.close_old_connections)
@@ -0,0 +1,67 @@
+"""Keyset pagination for the data catalog's listing pages."""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+
+class InvalidCursor(Exception):
+    """Raised when an `after` token can't be decoded."""
+
+
+def encode_cursor(pk):
+    """Turn a primary key into an opaque `after` token."""
+    return urlsafe_b64encode(str(pk)).rstrip('=')
+
+
+def decode_cursor(token):
+    """Turn an `after` token back into a primary key."""
+    try:
+        token = str(token)
+        return int(urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (TypeError, ValueError, UnicodeEncodeError):
+        raise InvalidCursor(token)
+
+
+class CursorPage(object):
+    """
+    A page of results found by seeking past the last primary key of the
+    previous page, rather than with an `OFFSET`. No `COUNT(*)` is needed,
+    so it only knows whether there's a next page.
+    """
+
+    def __init__(self, object_list, next_token=None):
+        self.object_list = object_list
+        self.next_token = next_token
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_token is not None
+
+    def has_previous(self):
+        return False
+
+
+class CursorPaginator(object):
+    """Paginate a QuerySet by primary key with opaque `after` tokens."""
+
+    def __init__(self, queryset, per_page):
+        if per_page < 1:
+            raise ValueError('per_page must be at least 1, not %r.' % per_page)
+        self.queryset = queryset.order_by('pk')
+        self.per_page = per_page
+
+    def page(self, after=None):
+        queryset = self.queryset
+        if after:
+            queryset = queryset.filter(pk__gt=decode_cursor(after))
+        # Ask for one extra row to find out if there's a next page.
+        object_list = list(queryset[:self.per_page + 1])
+        next_token = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_token = encode_cursor(object_list[-1].pk)
+        return CursorPage(object_list, next_token)
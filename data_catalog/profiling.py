@@ -0,0 +1,216 @@
+"""
+Sampled profiling of requests: how long each view took, and how much of
+that went to SQL, template rendering and the cache. Records are written as
+JSON lines to the `data_catalog.profiling` logger, which `settings.LOGGING`
+sends to a rotating file for the `profiling_report` command to summarize.
+"""
+
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+from django.utils import simplejson as json
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_installed = []
+
+
+def current():
+    """The profile of the request being handled by this thread, if sampled."""
+    return getattr(_local, 'profile', None)
+
+
+class Profile(object):
+    """What one request spent its time on."""
+
+    def __init__(self):
+        self.start = time.time()
+        self.view = None
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.query_offsets = dict((connection.alias, len(connection.queries))
+                                  for connection in connections.all())
+
+    def queries(self):
+        """The `(seconds, sql)` of each query run since the request began."""
+        queries = []
+        for connection in connections.all():
+            offset = self.query_offsets.get(connection.alias, 0)
+            for query in connection.queries[offset:]:
+                queries.append((float(query['time']), query['sql']))
+        return queries
+
+    def record(self, request, response):
+        queries = self.queries()
+        slowest = sorted(queries, reverse=True)[:settings.PROFILING_SLOWEST]
+        return {
+            'view': self.view,
+            'path': request.path,
+            'status': response.status_code,
+            'ms': round((time.time() - self.start) * 1000, 3),
+            'queries': len(queries),
+            'sql_ms': round(sum(seconds for seconds, sql in queries) * 1000, 3),
+            'template_ms': round(self.template_seconds * 1000, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'slowest': [[round(seconds * 1000, 3), sql]
+                        for seconds, sql in slowest],
+        }
+
+
+def timed_render(render):
+    """Time the outermost template render; includes count towards it."""
+    def wrapper(self, context):
+        profile = current()
+        if profile is None:
+            return render(self, context)
+        profile.template_depth += 1
+        start = time.time()
+        try:
+            return render(self, context)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_seconds += time.time() - start
+    return wrapper
+
+
+def counted_get(get):
+    def wrapper(key, *args, **kwargs):
+        value = get(key, *args, **kwargs)
+        profile = current()
+        if profile is not None:
+            if value is None:
+                profile.cache_misses += 1
+            else:
+                profile.cache_hits += 1
+        return value
+    return wrapper
+
+
+def counted_get_many(get_many):
+    def wrapper(keys, *args, **kwargs):
+        values = get_many(keys, *args, **kwargs)
+        profile = current()
+        if profile is not None:
+            profile.cache_hits += len(values)
+            profile.cache_misses += len(keys) - len(values)
+        return values
+    return wrapper
+
+
+def install():
+    """
+    Hook template rendering and the cache so sampled requests can count
+    their time and hits. The hooks cost an attribute lookup otherwise.
+    """
+    if _installed:
+        return
+    Template.render = timed_render(Template.render)
+    cache.get = counted_get(cache.get)
+    cache.get_many = counted_get_many(cache.get_many)
+    _installed.append(True)
+
+
+def view_name(view_func):
+    """A name for a view function, or for a view class instance."""
+    name = getattr(view_func, '__name__', None) or type(view_func).__name__
+    return '%s.%s' % (view_func.__module__, name)
+
+
+class ProfilingMiddleware(object):
+    """
+    Profile a `PROFILING_SAMPLE_RATE` fraction of the requests that resolve
+    to a view. It's left out of the request cycle when the rate is zero.
+    """
+
+    def __init__(self):
+        if not settings.PROFILING_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        install()
+
+    def process_request(self, request):
+        _local.profile = None
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            for connection in connections.all():
+                connection.use_debug_cursor = True
+            _local.profile = Profile()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = current()
+        if profile is not None:
+            profile.view = view_name(view_func)
+
+    def process_response(self, request, response):
+        profile = current()
+        if profile is None:
+            return response
+        _local.profile = None
+        for connection in connections.all():
+            connection.use_debug_cursor = None
+        if profile.view is not None:
+            logger.info(json.dumps(profile.record(request, response)))
+        return response
+
+
+def read_records(path, backups=0):
+    """
+    Yield the records in a profiling log and its rotated backups, oldest
+    first, skipping any line that was cut short.
+    """
+    paths = ['%s.%d' % (path, n) for n in range(backups, 0, -1)] + [path]
+    for path in paths:
+        try:
+            lines = open(path)
+        except IOError:
+            continue
+        for line in lines:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+        lines.close()
+
+
+def percentiles(timings):
+    """Summarize a list of timings in seconds as milliseconds."""
+    timings = sorted(timings)
+    pick = lambda p: timings[min(len(timings) - 1, int(len(timings) * p))]
+    return {
+        'p50_ms': round(pick(0.50) * 1000, 3),
+        'p95_ms': round(pick(0.95) * 1000, 3),
+        'p99_ms': round(pick(0.99) * 1000, 3),
+        'max_ms': round(timings[-1] * 1000, 3),
+    }
+
+
+def summarize(records, worst=10):
+    """
+    Group records by view, and pick out the `worst` slowest queries seen.
+    Returns `(views, queries)`: the timings, query counts and cache hits
+    of each view by name, and `(ms, view, sql)` for each slow query.
+    """
+    views, queries = {}, []
+    for record in records:
+        view = views.setdefault(record['view'], {
+            'requests': 0, 'timings': [], 'queries': 0, 'sql_ms': 0.0,
+            'template_ms': 0.0, 'cache_hits': 0, 'cache_misses': 0})
+        view['requests'] += 1
+        view['timings'].append(record['ms'] / 1000.0)
+        for key in ('queries', 'sql_ms', 'template_ms', 'cache_hits',
+                    'cache_misses'):
+            view[key] += record[key]
+        for ms, sql in record['slowest']:
+            queries.append((ms, record['view'], sql))
+    queries.sort(reverse=True)
+    return views, queries[:worst]
@@ -0,0 +1,63 @@
+"""Search results rendered from the fields stored in the search index."""
+
+from haystack import site
+from haystack.views import SearchView as BaseSearchView
+
+from data_catalog.databases import replica_reads
+from data_catalog.facets import search_facets
+from data_catalog.utils import prefetch_tags
+
+
+STORED_FIELDS = ('name', 'description', 'slug', 'type')
+
+
+def load_missing(results):
+    """
+    Fill in the stored fields of any results indexed before they were
+    stored, loading their resources and their tags with one query each
+    per model. Returns the results, each with a `url` to link to.
+    """
+    missing = {}
+    for result in results:
+        if result.slug is None and result.model is not None:
+            missing.setdefault(result.model, []).append(result)
+    for model, model_results in missing.items():
+        objects = site.get_index(model).read_queryset().in_bulk(
+            [result.pk for result in model_results])
+        prefetch_tags(objects.values())
+        for result in model_results:
+            instance = objects.get(int(result.pk))
+            if instance is None:
+                continue
+            result._object = instance
+            for field in STORED_FIELDS:
+                setattr(result, field, getattr(instance, field))
+            result.tags = [tag.name for tag in instance.tag_list]
+    for result in results:
+        result.url = '/%s/%s' % (result.type, result.slug)
+    return results
+
+
+class SearchView(BaseSearchView):
+    """
+    Haystack's search view, without loading every result from the
+    database: results come with their stored fields already, and their
+    tags are summed up as facets from the precomputed tag counts.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('load_all', False)
+        super(SearchView, self).__init__(*args, **kwargs)
+
+    @replica_reads
+    def __call__(self, request):
+        return super(SearchView, self).__call__(request)
+
+    def build_page(self):
+        paginator, page = super(SearchView, self).build_page()
+        page.object_list = load_missing(list(page.object_list))
+        self.facets = search_facets(page.object_list)
+        return paginator, page
+
+    def extra_context(self):
+        return {'facets': self.facets}
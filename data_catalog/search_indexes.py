@@ -1,21 +1,71 @@
 """Search indexes for the catalog using Django Haystack."""
 
-from haystack.indexes import RealTimeSearchIndex, CharField
+from django.db.models import signals
+from haystack.indexes import SearchIndex, CharField, MultiValueField
 from haystack import site
-from data_catalog.models import App, Data, Project
+from data_catalog.models import App, Data, Project, SearchQueueItem
 
 
-class AppIndex(RealTimeSearchIndex):
-    """A search index for the Project model."""
+class QueuedSearchIndex(SearchIndex):
+    """
+    A search index that queues saved and deleted resources instead of
+    writing to the index straight away. The `process_search_queue` command
+    writes them in batches.
+    """
+
+    def _setup_save(self, model):
+        signals.post_save.connect(self.enqueue_update, sender=model)
+
+    def _setup_delete(self, model):
+        signals.post_delete.connect(self.enqueue_delete, sender=model)
+
+    def _teardown_save(self, model):
+        signals.post_save.disconnect(self.enqueue_update, sender=model)
+
+    def _teardown_delete(self, model):
+        signals.post_delete.disconnect(self.enqueue_delete, sender=model)
+
+    def enqueue_update(self, instance, **kwargs):
+        SearchQueueItem.enqueue(type(instance), [instance.pk])
+
+    def enqueue_delete(self, instance, **kwargs):
+        SearchQueueItem.enqueue(type(instance), [instance.pk],
+                                SearchQueueItem.DELETE)
+
+
+class ResourceIndex(QueuedSearchIndex):
+    """
+    Stores the fields search results are rendered from, so a page of
+    results doesn't need to load each resource from the database.
+    """
+    name = CharField(model_attr='name')
+    description = CharField(model_attr='description')
+    slug = CharField(model_attr='slug')
+    type = CharField(model_attr='type', indexed=False)
+    tags = MultiValueField()
+
+    def prepare(self, obj):
+        # Batches come with their tags loaded by `prefetch_tags`, for this
+        # and the text templates. A resource on its own loads them here.
+        if not hasattr(obj, 'tag_list'):
+            obj.tag_list = list(obj.tags.all())
+        return super(ResourceIndex, self).prepare(obj)
+
+    def prepare_tags(self, obj):
+        return [tag.name for tag in obj.tag_list]
+
+
+class AppIndex(ResourceIndex):
+    """A search index for the App model."""
     text = CharField(document=True, use_template=True)
 
 
-class DataIndex(RealTimeSearchIndex):
+class DataIndex(ResourceIndex):
     """A search index for the Data model."""
     text = CharField(document=True, use_template=True)
 
 
-class ProjectIndex(RealTimeSearchIndex):
+class ProjectIndex(ResourceIndex):
     """A search index for the Project model."""
     text = CharField(document=True, use_template=True)
 
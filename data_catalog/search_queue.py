@@ -0,0 +1,96 @@
+"""Write queued changes to the search index in batches."""
+
+import time
+
+from django.db.models import get_model
+from haystack import site
+from haystack.constants import ID
+from whoosh.writing import AsyncWriter
+
+from data_catalog.models import SearchQueueItem
+from data_catalog.search_rebuild import is_rebuilding
+from data_catalog.utils import prefetch_tags
+
+BATCH_SIZE = 10000
+
+
+def write(updates, removals):
+    """
+    Index a list of instances of each `(index, instances)` pair and remove
+    the documents with the `removals` ids, with a single commit. Every model
+    shares one Whoosh index, and each commit rewrites its segments.
+    """
+    backend = site.get_index(site.get_indexed_models()[0]).backend
+    if not backend.setup_complete:
+        backend.setup()
+    backend.index = backend.index.refresh()
+    writer = AsyncWriter(backend.index)
+    for index, instances in updates:
+        for instance in prefetch_tags(instances):
+            document = index.full_prepare(instance)
+            for key in document:
+                document[key] = backend._from_python(document[key])
+            writer.update_document(**document)
+    for document_id in removals:
+        writer.delete_by_term(ID, document_id)
+    writer.commit()
+
+
+def process(batch_size=BATCH_SIZE):
+    """
+    Take up to `batch_size` items off the search queue and apply them.
+    Repeated items for the same resource are collapsed into the latest
+    one, and they're all written with a single commit. Returns the
+    number of resources `updated` and `removed`. Nothing is
+    taken while a full rebuild is running, so changes made during the
+    rebuild are written to the new index once it has been swapped in.
+    """
+    if is_rebuilding():
+        return {'updated': 0, 'removed': 0}
+    items = list(SearchQueueItem.objects.order_by('pk')[:batch_size]
+                 .values_list('pk', 'model', 'object_id', 'action'))
+    if not items:
+        return {'updated': 0, 'removed': 0}
+    latest = {}
+    for pk, label, object_id, action in items:
+        latest[(label, object_id)] = action
+    updates, removals = {}, []
+    for (label, object_id), action in latest.items():
+        if action == SearchQueueItem.UPDATE:
+            updates.setdefault(label, []).append(object_id)
+        else:
+            removals.append((label, object_id))
+    updated, indexed = 0, []
+    for label, object_ids in updates.items():
+        model = get_model(*label.split('.'))
+        instances = list(model.objects.filter(pk__in=object_ids))
+        # Anything deleted since it was queued comes out of the index.
+        found = set(instance.pk for instance in instances)
+        removals.extend((label, object_id) for object_id in object_ids
+                        if object_id not in found)
+        if instances:
+            indexed.append((site.get_index(model), instances))
+            updated += len(instances)
+    write(indexed, ['%s.%s' % removal for removal in removals])
+    SearchQueueItem.dequeue(items[-1][0])
+    return {'updated': updated, 'removed': len(removals)}
+
+
+def process_all(batch_size=BATCH_SIZE):
+    """Work through the whole queue, and return the combined counts."""
+    totals = {'updated': 0, 'removed': 0}
+    while True:
+        counts = process(batch_size)
+        if not any(counts.values()):
+            return totals
+        for key in totals:
+            totals[key] += counts[key]
+
+
+def run_forever(interval, batch_size=BATCH_SIZE, log=None):
+    """Keep processing the queue, checking it every `interval` seconds."""
+    while True:
+        counts = process_all(batch_size)
+        if log is not None and any(counts.values()):
+            log(counts)
+        time.sleep(interval)
@@ -0,0 +1,185 @@
+"""Rebuild the Whoosh search index in parallel, then swap it into place."""
+
+import errno
+import os
+import shutil
+import time
+from multiprocessing import Pool, cpu_count
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max, Min, get_model
+from haystack import site
+from whoosh import index as whoosh_index
+
+from data_catalog.utils import prefetch_tags
+
+
+class IndexNotLinked(Exception):
+    """Raised when the index path is a directory rather than a symlink."""
+
+
+def rebuild_marker():
+    """
+    While this file exists, holding the id of a running process, the search
+    queue leaves the index alone.
+    """
+    return settings.HAYSTACK_WHOOSH_PATH.rstrip(os.sep) + '.rebuilding'
+
+
+def mark_rebuilding():
+    marker = rebuild_marker()
+    with open(marker + '.tmp', 'w') as f:
+        f.write(str(os.getpid()))
+    os.rename(marker + '.tmp', marker)
+
+
+def process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError, e:
+        return e.errno == errno.EPERM
+    return True
+
+
+def is_rebuilding():
+    """
+    Whether a rebuild is running. A marker left by a rebuild whose process
+    has died is removed, so it can't hold up the queue.
+    """
+    marker = rebuild_marker()
+    try:
+        with open(marker) as f:
+            pid = int(f.read())
+    except IOError:
+        return False
+    except ValueError:
+        pid = None
+    if pid is not None and process_exists(pid):
+        return True
+    try:
+        os.remove(marker)
+    except OSError:
+        pass
+    return False
+
+
+def model_label(model):
+    return '%s.%s' % (model._meta.app_label, model._meta.module_name)
+
+
+def schema():
+    backend = site.get_index(site.get_indexed_models()[0]).backend
+    return backend.build_schema(site.all_searchfields())[1]
+
+
+def split_ranges(model, parts):
+    """Split a model's primary key space into `parts` inclusive ranges."""
+    bounds = model._default_manager.aggregate(low=Min('pk'), high=Max('pk'))
+    low, high = bounds['low'], bounds['high']
+    if low is None:
+        return []
+    step = max(1, (high - low + parts) // parts)
+    return [(start, min(start + step - 1, high))
+            for start in xrange(low, high + 1, step)]
+
+
+def write_segment(job):
+    """
+    Render the documents for one primary key range of a model into a
+    Whoosh index of their own, and return how many were written.
+    """
+    label, low, high, path, batch_size = job
+    # Forked workers mustn't share their parent's database connections, so
+    # each opens its own. Only an in-memory SQLite database, which closing
+    # would lose, is kept.
+    for connection in connections.all():
+        if connection.settings_dict['NAME'] != ':memory:':
+            connection.close()
+    model = get_model(*label.split('.'))
+    index = site.get_index(model)
+    backend = index.backend
+    segment = whoosh_index.create_in(path, schema())
+    writer = segment.writer()
+    count = 0
+    queryset = index.index_queryset().filter(pk__gte=low, pk__lte=high)
+    last_pk = low - 1
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not batch:
+            break
+        for instance in prefetch_tags(batch):
+            document = index.full_prepare(instance)
+            for key in document:
+                document[key] = backend._from_python(document[key])
+            writer.add_document(**document)
+        count += len(batch)
+        last_pk = batch[-1].pk
+    writer.commit()
+    return count
+
+
+def swap(path, new_path):
+    """
+    Point `path` at `new_path` by renaming a symlink over it, which is
+    atomic. `path` mustn't be a real directory, which can't be replaced in
+    one step.
+    """
+    link = path + '.swap'
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.abspath(new_path), link)
+    os.rename(link, path)
+
+
+def rebuild(workers=None, batch_size=500, keep_old=False):
+    """
+    Rebuild the index for every registered model across a process pool.
+    Each worker writes its own segment, the segments are merged into a
+    fresh index next to the live one, and the live path is swapped to it.
+    Search keeps using the old index until the swap. Returns the number
+    of `documents` written and the `seconds` it took.
+
+    The index path has to be a symlink, or not exist yet. Raises
+    `IndexNotLinked` for an index directory made by `rebuild_index`.
+    """
+    start = time.time()
+    workers = workers or cpu_count()
+    path = settings.HAYSTACK_WHOOSH_PATH.rstrip(os.sep)
+    if os.path.isdir(path) and not os.path.islink(path):
+        raise IndexNotLinked(path)
+    old_path = os.path.realpath(path) if os.path.islink(path) else None
+    new_path = '%s-%d' % (path, int(start * 1000))
+    segments_path = new_path + '.segments'
+    marker = rebuild_marker()
+    mark_rebuilding()
+    try:
+        jobs = []
+        for model in site.get_indexed_models():
+            for low, high in split_ranges(model, workers):
+                segment_path = os.path.join(segments_path, str(len(jobs)))
+                os.makedirs(segment_path)
+                jobs.append((model_label(model), low, high, segment_path,
+                             batch_size))
+        if workers > 1 and len(jobs) > 1:
+            pool = Pool(workers)
+            try:
+                counts = pool.map(write_segment, jobs)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            counts = map(write_segment, jobs)
+        os.makedirs(new_path)
+        merged = whoosh_index.create_in(new_path, schema())
+        writer = merged.writer()
+        for job in jobs:
+            writer.add_reader(whoosh_index.open_dir(job[3]).reader())
+        writer.commit()
+        swap(path, new_path)
+    finally:
+        shutil.rmtree(segments_path, ignore_errors=True)
+        os.remove(marker)
+    if old_path and not keep_old:
+        shutil.rmtree(old_path, ignore_errors=True)
+    return {'documents': sum(counts), 'seconds': time.time() - start}
@@ -0,0 +1,108 @@
+"""Compact JSON serialization of the data catalog's models."""
+
+from operator import attrgetter
+
+from django.db import models
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_unicode
+from django.utils.simplejson import JSONEncoder
+
+
+# The fields each model exposes, keyed by `app_label.model`. Models that
+# aren't listed expose all of their concrete fields.
+FIELDS = {
+    'data_catalog.app': ('id', 'name', 'slug', 'description', 'url', 'image'),
+    'data_catalog.data': ('id', 'name', 'slug', 'description', 'url'),
+    'data_catalog.project': ('id', 'name', 'slug', 'description',
+                             'organization', 'video_url', 'embed_url',
+                             'image', 'featured'),
+    'data_catalog.supporter': ('id', 'user'),
+    'auth.user': ('id', 'username'),
+    'taggit.tag': ('id', 'name', 'slug'),
+}
+
+COMPACT_SEPARATORS = (',', ':')
+
+_extractors = {}
+
+
+def model_label(model):
+    return '%s.%s' % (model._meta.app_label, model._meta.module_name)
+
+
+def _converter(field):
+    """How to turn a field's value into something JSON can encode."""
+    if isinstance(field, models.FileField):
+        return lambda value: value and value.name or None
+    if isinstance(field, (models.DateField, models.TimeField)):
+        return lambda value: value and value.isoformat()
+    if isinstance(field, (models.AutoField, models.BooleanField,
+                          models.IntegerField, models.FloatField,
+                          models.ForeignKey)):
+        return None
+    return lambda value: value if value is None else force_unicode(value)
+
+
+def extractor(model):
+    """
+    Return a function that turns an instance of `model` into a dictionary
+    of its whitelisted fields. The field lookups are worked out once per
+    model, instead of once per instance.
+    """
+    label = model_label(model)
+    if label not in _extractors:
+        names = FIELDS.get(label) or [f.name for f in model._meta.fields]
+        fields = [model._meta.get_field(name) for name in names]
+        getters = [(field.name, attrgetter(field.attname), _converter(field))
+                   for field in fields]
+
+        def extract(instance):
+            data = {}
+            for name, get, convert in getters:
+                value = get(instance)
+                data[name] = convert(value) if convert else value
+            return data
+        _extractors[label] = extract
+    return _extractors[label]
+
+
+def serialize(instance):
+    """Turn a model instance into a serializable dict."""
+    return extractor(type(instance))(instance)
+
+
+class CatalogJSONEncoder(JSONEncoder):
+    """Encodes model instances and QuerySets without touching the models."""
+
+    def default(self, obj):
+        if isinstance(obj, QuerySet):
+            extract = extractor(obj.model)
+            return [extract(instance) for instance in obj.iterator()]
+        if isinstance(obj, models.Model):
+            return serialize(obj)
+        return JSONEncoder.default(self, obj)
+
+
+def encoder(indent=None):
+    separators = COMPACT_SEPARATORS if indent is None else (',', ': ')
+    return CatalogJSONEncoder(ensure_ascii=False, indent=indent,
+                              separators=separators)
+
+
+def stream_queryset(queryset, chunk_size=100):
+    """
+    Encode a QuerySet as a JSON array, one chunk at a time. Rows are read
+    with `.iterator()`, so they are never all held in memory at once.
+    """
+    encode = encoder().encode
+    extract = extractor(queryset.model)
+    yield '['
+    chunk, first = [], True
+    for instance in queryset.iterator():
+        chunk.append(encode(extract(instance)))
+        if len(chunk) == chunk_size:
+            yield ('' if first else ',') + ','.join(chunk)
+            chunk, first = [], False
+    if chunk:
+        yield ('' if first else ',') + ','.join(chunk)
+    yield ']'
@@ -11,6 +11,9 @@ ACCOUNT_ACTIVATION_DAYS = 7
 DEFAULT_FROM_EMAIL = 'admin@' + CATALOG_URL
 LOGIN_REDIRECT_URL = '/'
 
+# The Data Couch account whose data sets are synced into the catalog.
+DATACOUCH_USER = 'newurbanmechs'
+
 # This should work both locally and on DotCloud.
 if os.path.exists('/home/dotcloud/current'):
     DB_PATH = '/home/dotcloud/'
@@ -20,5 +23,5 @@ else:
 
 __all__ = [
     CITY_NAME, CATALOG_URL, ACCOUNT_ACTIVATION_DAYS, DEFAULT_FROM_EMAIL,
-    LOGIN_REDIRECT_URL, DB_PATH
+    LOGIN_REDIRECT_URL, DB_PATH, DATACOUCH_USER
 ]
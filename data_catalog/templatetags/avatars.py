@@ -0,0 +1,45 @@
+"""
+Gravatar tags that remember each email's URL, so a page of supporters
+doesn't hash the same addresses on every render.
+"""
+
+from hashlib import md5
+from urllib import urlencode
+
+from django import template
+from django.conf import settings
+from django.utils.html import escape
+
+register = template.Library()
+
+GRAVATAR_URL_PREFIX = getattr(settings, 'GRAVATAR_URL_PREFIX',
+                              'http://www.gravatar.com/')
+GRAVATAR_DEFAULT_IMAGE = getattr(settings, 'GRAVATAR_DEFAULT_IMAGE', '')
+GRAVATAR_CACHE_SIZE = 10000
+
+_urls = {}
+
+
+def gravatar_url(email, size=80):
+    """The escaped Gravatar URL for an email address, memoized per size."""
+    key = (email, size)
+    url = _urls.get(key)
+    if url is None:
+        if len(_urls) >= GRAVATAR_CACHE_SIZE:
+            _urls.clear()
+        url = _urls[key] = escape('%savatar/%s/?%s' % (
+            GRAVATAR_URL_PREFIX, md5(email.encode('utf-8')).hexdigest(),
+            urlencode({'s': str(size), 'default': GRAVATAR_DEFAULT_IMAGE})))
+    return url
+
+
+@register.simple_tag
+def gravatar_img_for_email(email, size=80):
+    return '<img src="%s" height="%s" width="%s"/>' % (
+        gravatar_url(email, size), size, size)
+
+
+@register.simple_tag
+def gravatar_img_for_user(user, size=80):
+    return '<img src="%s" alt="Avatar for %s" height="%s" width="%s"/>' % (
+        gravatar_url(user.email, size), escape(user.username), size, size)
@@ -0,0 +1,20 @@
+"""Reference the site's static bundles by their content-hashed names."""
+
+from django import template
+
+from data_catalog import bundles
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle(name):
+    """
+    The `<link>` or `<script>` tags for a bundle in `STATIC_BUNDLES`: one
+    for the built bundle, or one per source file until it's been built.
+    """
+    if name.endswith('.css'):
+        tag = '<link href="%s" rel="stylesheet">'
+    else:
+        tag = '<script src="%s" type="text/javascript"></script>'
+    return '\n'.join(tag % url for url in bundles.urls(name))
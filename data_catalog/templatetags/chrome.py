@@ -0,0 +1,26 @@
+"""Render the header and footer fragments every page shares once."""
+
+from django import template
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+_fragments = {}
+
+
+@register.simple_tag(takes_context=True)
+def fragment(context, template_name):
+    """
+    Render a template that's the same on every page for everyone. It's
+    rendered once per process, unless `TEMPLATE_FRAGMENT_CACHING` is off,
+    so it mustn't use anything from the context but `settings`, like the
+    user or the page's path.
+    """
+    if not settings.TEMPLATE_FRAGMENT_CACHING:
+        return get_template(template_name).render(context)
+    if template_name not in _fragments:
+        _fragments[template_name] = mark_safe(
+            get_template(template_name).render(context))
+    return _fragments[template_name]
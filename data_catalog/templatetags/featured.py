@@ -0,0 +1,12 @@
+"""The featured project, rendered from the cached rotation."""
+
+from django import template
+
+from data_catalog.models import Project
+
+register = template.Library()
+
+
+@register.inclusion_tag('featured_project.html')
+def featured_project():
+    return {'featured': Project.featured_project()}
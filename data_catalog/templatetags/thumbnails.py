@@ -0,0 +1,34 @@
+"""Render a resource's image through its thumbnails, once they're made."""
+
+from django import template
+from django.utils.html import escape
+
+from data_catalog.models import Thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail(resource, size):
+    """
+    An `<img>` of a resource's image at the given thumbnail size, offering
+    WebP where it's been made. Until the worker has made the thumbnail,
+    the original image is used. Thumbnails attached by `Thumbnail.prefetch`
+    are used if present; otherwise they're looked up.
+    """
+    if not resource.image:
+        return ''
+    thumbnails = getattr(resource, 'thumbnails', None)
+    if thumbnails is None:
+        thumbnails = Thumbnail.prefetch([resource])[0].thumbnails
+    alt = escape('A thumbnail picture of %s' % resource.name)
+    jpeg = thumbnails.get((size, 'jpeg'))
+    if jpeg is None:
+        return '<img class="actual-thumbnail" src="%s" alt="%s" />' % (
+            escape(resource.image.url), alt)
+    webp = thumbnails.get((size, 'webp'))
+    source = ''
+    if webp:
+        source = '<source srcset="%s" type="image/webp" />' % escape(webp)
+    return ('<picture>%s<img class="actual-thumbnail" src="%s" alt="%s" />'
+            '</picture>' % (source, escape(jpeg), alt))
@@ -1,20 +1,61 @@
 """Tests for the data catalog app."""
 
-from django.test import TestCase
+import csv
+import gc
+import gzip
+import os
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from cStringIO import StringIO
+from hashlib import md5
+from urllib2 import HTTPError, URLError
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import HttpRequest, HttpResponse
 from django.utils import simplejson as json
-from taggit.models import Tag
+from taggit.models import Tag, TaggedItem
 from mock import patch, Mock
+from PIL import Image
+
+from haystack import site
+from haystack.models import SearchResult
 
-from data_catalog.models import App, Data, Project, Supporter
+from data_catalog import (bundles, caching, databases, datacouch, explain,
+                          profiling, search_queue, search_rebuild,
+                          thumbnails, video)
+from data_catalog.autocomplete import tag_index
+from data_catalog.benchmarks import endpoints, seed_catalog
+from data_catalog.export import ndjson
+from data_catalog.facets import search_facets
+from data_catalog.models import (App, Data, FeaturedRotation, Project,
+                                 Supporter, SyncState, SearchQueueItem,
+                                 TagCount, Thumbnail)
 from data_catalog.context_processors import settings_context
 from data_catalog.forms import AppForm, ProjectForm
-from data_catalog.utils import JSONResponse
+from data_catalog.pagination import CursorPaginator, encode_cursor
+from data_catalog.search import load_missing
+from data_catalog.templatetags import chrome
+from data_catalog.serializers import serialize
+from data_catalog.utils import JSONResponse, bulk_insert, prefetch_tags
 
 
 class TestViews(TestCase):
 
     def setUp(self):
+        tag_index.clear()
         self.user = User.objects.create_user('foo', 'foo@bar.com', 'bar')
 
     def test_home_page_is_working(self):
@@ -118,6 +159,183 @@ class TestViews(TestCase):
         self.assertEquals(response.status_code, 200)
 
 
+class TestAutocomplete(TestCase):
+
+    def setUp(self):
+        tag_index.clear()
+        app = App.objects.create(name='App', description='Test.',
+                                 url='http://test.com')
+        app.tags.add('Public Safety', 'Safety Inspections')
+        data = Data.objects.create(name='Data', description='Test.')
+        data.tags.add('Safety Inspections', 'Food Safety')
+
+    def autocomplete(self, **params):
+        response = self.client.get('/autocomplete', params)
+        return json.loads(response.content)['tags']
+
+    def test_most_used_tags_come_first(self):
+        tags = self.autocomplete(q='safety')
+        self.assertEqual(tags, ['Safety Inspections', 'Food Safety',
+                                'Public Safety'])
+
+    def test_infix_matches_are_case_insensitive(self):
+        self.assertEqual(self.autocomplete(q='D SAF'), ['Food Safety'])
+        self.assertEqual(self.autocomplete(q='xyz'), [])
+
+    def test_limit_parameter(self):
+        self.assertEqual(self.autocomplete(q='safety', limit=1),
+                         ['Safety Inspections'])
+        self.assertEqual(len(self.autocomplete(q='safety', limit='x')), 3)
+        self.assertEqual(self.autocomplete(q='saf', limit=0),
+                         ['Safety Inspections'])
+        self.assertEqual(self.autocomplete(q='saf', limit=-3),
+                         ['Safety Inspections'])
+        self.assertEqual(tag_index.search('saf', 0), [])
+
+    def test_index_is_only_loaded_once(self):
+        self.autocomplete(q='safety')
+        with self.assertNumQueries(0):
+            tag_index.search('food')
+
+    def test_index_is_updated_by_tag_changes(self):
+        self.autocomplete(q='safety')
+        tag = Tag.objects.create(name='Fire Safety')
+        App.objects.get().tags.add(tag)
+        App.objects.get().tags.add('Food Safety')
+        self.assertEqual(tag_index.search('safety'),
+                         ['Safety Inspections', 'Food Safety', 'Fire Safety',
+                          'Public Safety'])
+        tag.name = 'Fire Hydrants'
+        tag.save()
+        Tag.objects.get(name='Public Safety').delete()
+        self.assertEqual(tag_index.search('safety'),
+                         ['Safety Inspections', 'Food Safety'])
+        self.assertEqual(tag_index.search('hydrant'), ['Fire Hydrants'])
+
+    def test_index_is_reloaded_after_other_processes_change_tags(self):
+        self.autocomplete(q='safety')
+        # Another process renames a tag, which this one has no signal for.
+        Tag.objects.filter(name='Food Safety').update(name='Food Hygiene')
+        caching.bump_version('tag')
+        self.assertEqual(tag_index.search('hygiene'), [])
+        tag_index.checked_at = 0
+        self.assertEqual(tag_index.search('hygiene'), ['Food Hygiene'])
+
+
+class TestAPI(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        for i in range(5):
+            data = Data.objects.create(name='Data %d' % i, description='Test.',
+                                       url='http://data.com/%d' % i)
+            data.tags.add('GIS', 'even' if i % 2 == 0 else 'odd')
+
+    def get(self, path='/api/v1/data', **params):
+        response = self.client.get(path, params)
+        return response, json.loads(response.content)
+
+    def test_listing_resources(self):
+        response, content = self.get()
+        self.assertEquals(response.status_code, 200)
+        self.assertEqual(len(content['objects']), 5)
+        self.assertEqual(sorted(content['objects'][0]['tags']), ['GIS', 'even'])
+        self.assertEqual(content['next'], None)
+
+    def test_field_selection(self):
+        response, content = self.get(fields='name,slug')
+        self.assertEqual(content['objects'][0], {'name': 'Data 0',
+                                                 'slug': 'data-0'})
+        response, content = self.get(fields='name,_state')
+        self.assertEquals(response.status_code, 400)
+
+    def test_cursor_paging(self):
+        response, content = self.get(limit=3, fields='name')
+        self.assertEqual(len(content['objects']), 3)
+        response, content = self.get(limit=3, fields='name',
+                                     after=content['next'])
+        self.assertEqual(content['objects'], [{'name': 'Data 3'},
+                                              {'name': 'Data 4'}])
+        self.assertEqual(content['next'], None)
+
+    def test_limit_must_be_in_range(self):
+        for limit in (0, -1, -3, 101, 'x'):
+            response, content = self.get(limit=limit)
+            self.assertEquals(response.status_code, 400)
+        self.assertRaises(ValueError, CursorPaginator, Data.objects.all(), 0)
+
+    def test_tag_filters_must_all_match(self):
+        response, content = self.get(tag=['GIS', 'odd'], fields='name')
+        self.assertEqual(content['objects'], [{'name': 'Data 1'},
+                                              {'name': 'Data 3'}])
+
+    def test_conditional_get_does_not_touch_the_database(self):
+        response, content = self.get()
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/data', HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 304)
+
+    def test_etag_changes_when_resources_change(self):
+        etag = self.get()[0]['ETag']
+        self.assertEqual(self.get()[0]['ETag'], etag)
+        self.assertNotEqual(self.get(fields='name')[0]['ETag'], etag)
+        Data.objects.create(name='New', description='Test.')
+        response = self.client.get('/api/v1/data', HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class TestExport(TestCase):
+
+    def setUp(self):
+        app = App.objects.create(name='App', description='An app.',
+                                 url='http://app.com')
+        app.tags.add('GIS')
+        Data.objects.create(name=u'Caf\xe9s', description='Data, with commas.')
+
+    def test_ndjson_export(self):
+        response = self.client.get('/export/catalog.ndjson')
+        lines = [json.loads(line) for line in response.content.splitlines()]
+        self.assertEqual([(line['type'], line['name'], line['tags'])
+                          for line in lines],
+                         [('app', 'App', ['GIS']), ('data', u'Caf\xe9s', [])])
+
+    def test_csv_export_of_one_type(self):
+        response = self.client.get('/export/catalog.csv', {'type': 'data'})
+        rows = list(csv.reader(StringIO(response.content)))
+        self.assertEqual(rows[0], ['type', 'id', 'name', 'slug', 'description',
+                                   'url', 'tags'])
+        self.assertEqual(rows[1][2:5], ['Caf\xc3\xa9s', 'cafes',
+                                        'Data, with commas.'])
+        self.assertEqual(len(rows), 2)
+
+    def test_gzipped_export(self):
+        response = self.client.get('/export/catalog.ndjson',
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.GzipFile(fileobj=StringIO(response.content)).read()
+        self.assertEqual(len(content.splitlines()), 2)
+
+    def test_unknown_type(self):
+        response = self.client.get('/export/catalog.csv', {'type': 'users'})
+        self.assertEquals(response.status_code, 400)
+
+    def test_memory_stays_flat_at_100k_rows(self):
+        bulk_insert(Data, [Data(name='Data %d' % i, slug='data-%d' % i,
+                                description='Test.') for i in xrange(100000)])
+        live, lines = [], 0
+        for line in ndjson([Data], batch_size=1000):
+            lines += 1
+            if lines % 25000 == 0:
+                gc.collect()
+                live.append(len([obj for obj in gc.get_objects()
+                                 if isinstance(obj, Data)]))
+        self.assertEqual(lines, 100001)
+        # Only the current batch of instances is ever alive.
+        self.assertTrue(max(live) <= 1000, live)
+
+
 class TestContextProcessors(TestCase):
 
     def test_settings_context_processors(self):
@@ -126,6 +344,53 @@ class TestContextProcessors(TestCase):
         self.assertEqual(settings['CITY_NAME'], 'Boston')
         self.assertEqual(settings['CATALOG_URL'], 'buildingboston.org')
 
+    def test_settings_are_read_once(self):
+        with patch.object(settings, 'CITY_NAME', 'Tulsa'):
+            city = settings_context(Mock())['settings']['CITY_NAME']
+        self.assertEqual(city, 'Boston')
+
+    def test_requests_get_their_own_settings(self):
+        settings_context(Mock())['settings']['CITY_NAME'] = 'Tulsa'
+        self.assertEqual(settings_context(Mock())['settings']['CITY_NAME'],
+                         'Boston')
+
+
+class TestChrome(TestCase):
+
+    def setUp(self):
+        chrome._fragments.clear()
+        self.settings = patch.object(settings, 'TEMPLATE_FRAGMENT_CACHING',
+                                     True)
+        self.settings.start()
+        User.objects.create_user('foo', 'foo@bar.com', 'bar')
+
+    def tearDown(self):
+        self.settings.stop()
+        chrome._fragments.clear()
+
+    def test_fragments_are_rendered_once_for_everyone(self):
+        self.client.get('/about')
+        self.client.login(username='foo', password='bar')
+        self.client.get('/about')
+        self.client.get('/faq')
+        self.assertEqual(sorted(chrome._fragments), [
+            'footer.html', 'header/navigation.html', 'header/search.html'])
+
+    def test_the_login_menu_is_not_cached(self):
+        response = self.client.get('/about')
+        self.assertContains(response, 'class="menu">Login</a>')
+        self.client.login(username='foo', password='bar')
+        response = self.client.get('/faq')
+        self.assertContains(response, 'foo')
+        self.assertContains(response, 'href="/logout/?next=/faq"')
+        self.assertNotContains(response, 'class="menu">Login</a>')
+
+    def test_fragments_are_rendered_every_time_when_off(self):
+        settings.TEMPLATE_FRAGMENT_CACHING = False
+        response = self.client.get('/about')
+        self.assertContains(response, 'id="search-bar"')
+        self.assertEqual(chrome._fragments, {})
+
 
 class TestModels(TestCase):
 
@@ -168,17 +433,17 @@ class TestModels(TestCase):
         project = Project.objects.get(name='Test')
         self.assertEquals(str(project), 'Test')
 
-    def test_more_than_one_project_can_be_featured(self):
+    def test_featuring_a_project_unfeatures_the_others(self):
         Project.objects.create(name='Test 1', description='Featured project',
                                video_url='http://vimeo.com/12345',
                                featured=True).save()
         featured = Project.objects.filter(featured=True)
-        self.assertTrue(len(featured), 1)
+        self.assertEqual(len(featured), 1)
         Project.objects.create(name='Test 2', description='Another featured',
                                video_url='http://vimeo.com/123456',
                                featured=True).save()
-        featured = Project.objects.filter(featured=True)
-        self.assertTrue(len(featured), 2)
+        self.assertQuerysetEqual(Project.objects.filter(featured=True),
+                                 ['Test 2'], lambda project: project.name)
 
     def test_a_supporter_does_not_need_links_and_projects(self):
         project = Project.objects.create(name='Test', description='Test cause.',
@@ -232,6 +497,280 @@ class TestModels(TestCase):
         self.assertQuerysetEqual(project.supporters.all(), [],
                                  lambda supporter: supporter.user.username)
 
+    def test_supporter_count_follows_adding_and_removing(self):
+        project = Project.objects.create(name='Test', description='Test cause.',
+                                         video_url='http://vimeo.com/12345')
+        foo = User.objects.create_user('foo', 'foo@bar.com', 'bar')
+        baz = User.objects.create_user('baz', 'baz@bar.com', 'bar')
+        Supporter.add_project_supporter(project, foo)
+        Supporter.add_project_supporter(project, foo)
+        Supporter.add_project_supporter(project, baz)
+        self.assertEqual(project.supporter_count, 2)
+        Supporter.remove_project_supporter(project, foo)
+        Supporter.remove_project_supporter(project, foo)
+        self.assertEqual(project.supporter_count, 1)
+        self.assertEqual(Project.objects.get(pk=project.pk).supporter_count, 1)
+
+    def test_supporter_count_follows_the_many_to_many_managers(self):
+        project = Project.objects.create(name='Test', description='Test cause.',
+                                         video_url='http://vimeo.com/12345')
+        count = lambda: Project.objects.get(pk=project.pk).supporter_count
+        foo = Supporter.objects.create(
+            user=User.objects.create_user('foo', 'foo@bar.com', 'bar'))
+        baz = Supporter.objects.create(
+            user=User.objects.create_user('baz', 'baz@bar.com', 'bar'))
+        foo.projects.add(project)
+        self.assertEqual(count(), 1)
+        project.supporters.add(baz)
+        self.assertEqual(project.supporter_count, 2)
+        foo.projects.clear()
+        self.assertEqual(count(), 1)
+        baz.projects.remove(project)
+        self.assertEqual(count(), 0)
+
+
+class TestBulkImport(TestCase):
+
+    def data_set(self, i, description='A data set.'):
+        return {'name': 'Data %d' % i, 'url': 'http://data.com/%d' % i,
+                'description': description}
+
+    def test_bulk_import_reports_counts(self):
+        Data.bulk_import([self.data_set(1), self.data_set(2)])
+        counts = Data.bulk_import([self.data_set(1),
+                                   self.data_set(2, 'Changed.'),
+                                   self.data_set(3)])
+        self.assertEqual(counts, {'created': 1, 'updated': 1, 'unchanged': 1})
+        self.assertEqual(Data.objects.get(name='Data 2').description,
+                         'Changed.')
+
+    def test_bulk_import_generates_unique_slugs(self):
+        Data.objects.create(name='Crime', description='Existing.')
+        Data.bulk_import([
+            {'name': 'Crime', 'url': 'http://a.com', 'description': ''},
+            {'name': 'Crime', 'url': 'http://b.com', 'description': ''},
+        ])
+        self.assertQuerysetEqual(Data.objects.order_by('id'),
+                                 ['crime', 'crime-2', 'crime-3'],
+                                 lambda data: data.slug)
+
+    def test_renamed_data_sets_are_updated_rather_than_added(self):
+        Data.bulk_import([self.data_set(1), self.data_set(2)])
+        renamed = dict(self.data_set(1), name='Renamed')
+        counts = Data.bulk_import([renamed, self.data_set(2)])
+        self.assertEqual(counts, {'created': 0, 'updated': 1, 'unchanged': 1})
+        self.assertQuerysetEqual(Data.objects.order_by('id'),
+                                 [('Renamed', 'data-1'), ('Data 2', 'data-2')],
+                                 lambda data: (data.name, data.slug))
+
+    @patch.object(Data, '_update_search_index')
+    def test_bulk_import_query_count_does_not_grow_with_rows(self, update):
+        with self.assertNumQueries(2):
+            Data.bulk_import([self.data_set(i) for i in range(100)])
+        data_sets = [self.data_set(i, 'Changed.') for i in range(100)]
+        # The rows, the descriptions of those imported again, the update.
+        with self.assertNumQueries(3):
+            Data.bulk_import(data_sets)
+        self.assertEqual(len(update.call_args[0][1]), 100)
+
+
+class TestPagination(TestCase):
+
+    def setUp(self):
+        for i in range(20):
+            Data.objects.create(name='Data %d' % i, description='Test data.')
+
+    def test_cursor_pages_walk_the_whole_table(self):
+        paginator = CursorPaginator(Data.objects.all(), 9)
+        names, after = [], None
+        while True:
+            page = paginator.page(after)
+            names.extend(data.name for data in page.object_list)
+            if not page.has_next():
+                break
+            after = page.next_token
+        self.assertEqual(names, ['Data %d' % i for i in range(20)])
+
+    def test_cursor_page_does_not_count(self):
+        paginator = CursorPaginator(Data.objects.all(), 9)
+        after = encode_cursor(Data.objects.all()[8].pk)
+        with self.assertNumQueries(1):
+            page = paginator.page(after)
+        self.assertEqual(len(page), 9)
+
+    def test_data_page_with_after_token(self):
+        after = encode_cursor(Data.objects.all()[17].pk)
+        response = self.client.get('/data', {'after': after})
+        resources = response.context['resources']
+        self.assertEqual([data.name for data in resources.object_list],
+                         ['Data 18', 'Data 19'])
+        self.assertFalse(resources.has_next())
+
+    def test_invalid_after_token_is_not_found(self):
+        response = self.client.get('/apps', {'after': '!!'})
+        self.assertEquals(response.status_code, 404)
+
+    def test_page_numbers_still_work(self):
+        response = self.client.get('/data', {'page': 3})
+        resources = response.context['resources']
+        self.assertEqual([data.name for data in resources.object_list],
+                         ['Data 18', 'Data 19'])
+
+
+class TestSearchQueue(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = patch.object(settings, 'HAYSTACK_WHOOSH_PATH',
+                                     self.directory)
+        self.settings.start()
+        self.reset_backends()
+
+    def tearDown(self):
+        self.settings.stop()
+        self.reset_backends()
+        shutil.rmtree(self.directory)
+
+    def reset_backends(self):
+        for model in site.get_indexed_models():
+            site.get_index(model).backend.setup_complete = False
+
+    def indexed(self):
+        from whoosh import index
+        searcher = index.open_dir(self.directory).searcher()
+        try:
+            return sorted((fields['name'], fields.get('tags'))
+                          for fields in searcher.all_stored_fields())
+        finally:
+            searcher.close()
+
+    def test_saving_and_deleting_queue_the_resource(self):
+        data = Data.objects.create(name='Crime', description='Test.')
+        data.save()
+        data.delete()
+        self.assertQuerysetEqual(SearchQueueItem.objects.order_by('pk'),
+                                 ['update', 'update', 'delete'],
+                                 lambda item: item.action)
+
+    def test_queue_is_coalesced_into_one_commit(self):
+        crime = Data.objects.create(name='Crime', description='Test.')
+        crime.save()
+        Data.objects.create(name='Food', description='Test.')
+        App.objects.create(name='Crime App', description='Test.')
+        Data.bulk_import([{'name': 'Parking', 'url': 'http://parking.com'},
+                          {'name': 'Trees', 'url': 'http://trees.com'}])
+        with patch.object(search_queue, 'AsyncWriter',
+                          wraps=search_queue.AsyncWriter) as writer:
+            counts = search_queue.process_all()
+        self.assertEqual(counts, {'updated': 5, 'removed': 0})
+        self.assertEqual(writer.call_count, 1)
+        self.assertEqual([name for name, tags in self.indexed()],
+                         ['Crime', 'Crime App', 'Food', 'Parking', 'Trees'])
+        self.assertEqual(SearchQueueItem.objects.count(), 0)
+
+    def test_deleted_resources_are_removed(self):
+        crime = Data.objects.create(name='Crime', description='Test.')
+        Data.objects.create(name='Food', description='Test.')
+        food_trucks = Data.objects.create(name='Food Trucks',
+                                          description='Test.')
+        search_queue.process_all()
+        crime.delete()
+        food_trucks.delete()
+        with patch.object(search_queue, 'AsyncWriter',
+                          wraps=search_queue.AsyncWriter) as writer:
+            counts = search_queue.process_all()
+        self.assertEqual(counts, {'updated': 0, 'removed': 2})
+        self.assertEqual(writer.call_count, 1)
+        self.assertEqual(self.indexed(), [('Food', '')])
+
+    def test_tags_are_loaded_for_the_whole_batch(self):
+        for i in range(5):
+            Data.objects.create(name='Data %d' % i,
+                                description='Test.').tags.add('GIS')
+        # The queue, the resources, their tags and clearing the queue.
+        with self.assertNumQueries(4):
+            search_queue.process()
+        self.assertEqual(self.indexed(), [('Data %d' % i, 'GIS')
+                                          for i in range(5)])
+
+
+class TestSearchRebuild(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'whoosh')
+        self.settings = patch.object(settings, 'HAYSTACK_WHOOSH_PATH',
+                                     self.path)
+        self.settings.start()
+        bulk_insert(Data, [Data(name='Data %d' % i, slug='data-%d' % i,
+                                description='Test.') for i in xrange(40)])
+        App.objects.create(name='Crime App', description='Test.')
+
+    def tearDown(self):
+        self.settings.stop()
+        shutil.rmtree(self.directory)
+
+    def document_count(self):
+        from whoosh import index
+        return index.open_dir(self.path).doc_count()
+
+    def test_segments_are_merged_and_swapped_in(self):
+        result = search_rebuild.rebuild(workers=2, batch_size=7)
+        self.assertEqual(result['documents'], 41)
+        self.assertTrue(os.path.islink(self.path))
+        self.assertEqual(self.document_count(), 41)
+        self.assertFalse(os.path.exists(search_rebuild.rebuild_marker()))
+
+    def test_workers_open_their_own_database_connections(self):
+        file_backed = Mock(settings_dict={'NAME': 'catalog.db'})
+        in_memory = Mock(settings_dict={'NAME': ':memory:'})
+        os.makedirs(self.path)
+        with patch.object(connections, 'all',
+                          Mock(return_value=[file_backed, in_memory])):
+            search_rebuild.write_segment(('data_catalog.data', 0, 0,
+                                          self.path, 10))
+        self.assertTrue(file_backed.close.called)
+        self.assertFalse(in_memory.close.called)
+
+    def test_index_directories_are_not_swapped(self):
+        os.makedirs(self.path)
+        self.assertRaises(search_rebuild.IndexNotLinked,
+                          search_rebuild.rebuild, workers=1)
+        self.assertFalse(os.path.islink(self.path))
+        self.assertEqual(os.listdir(self.directory), ['whoosh'])
+
+    def test_old_index_is_removed_after_the_next_swap(self):
+        search_rebuild.rebuild(workers=1)
+        first = os.path.realpath(self.path)
+        Data.objects.filter(name='Data 0').delete()
+        search_rebuild.rebuild(workers=1)
+        self.assertNotEqual(os.path.realpath(self.path), first)
+        self.assertFalse(os.path.exists(first))
+        self.assertEqual(self.document_count(), 40)
+
+    def test_queue_waits_while_a_rebuild_is_running(self):
+        search_rebuild.mark_rebuilding()
+        counts = search_queue.process()
+        self.assertEqual(counts, {'updated': 0, 'removed': 0})
+        self.assertTrue(SearchQueueItem.objects.exists())
+
+    def test_markers_left_by_dead_rebuilds_are_removed(self):
+        process = subprocess.Popen(['true'])
+        process.wait()
+        with open(search_rebuild.rebuild_marker(), 'w') as f:
+            f.write(str(process.pid))
+        self.assertFalse(search_rebuild.is_rebuilding())
+        self.assertFalse(os.path.exists(search_rebuild.rebuild_marker()))
+
+    def test_ranges_cover_every_primary_key(self):
+        ranges = search_rebuild.split_ranges(Data, 3)
+        pks = Data.objects.values_list('pk', flat=True)
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges[0][0], min(pks))
+        self.assertEqual(ranges[-1][1], max(pks))
+        for (low, high), (next_low, next_high) in zip(ranges, ranges[1:]):
+            self.assertEqual(high + 1, next_low)
+
 
 class TestForms(TestCase):
 
@@ -271,6 +810,52 @@ class TestSearch(TestCase):
         app.save()
 
 
+class TestSearchResults(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = patch.object(settings, 'HAYSTACK_WHOOSH_PATH',
+                                     self.directory)
+        self.settings.start()
+        self.reset_backends()
+
+    def tearDown(self):
+        self.settings.stop()
+        self.reset_backends()
+        shutil.rmtree(self.directory)
+
+    def reset_backends(self):
+        for model in site.get_indexed_models():
+            site.get_index(model).backend.setup_complete = False
+
+    def test_results_render_from_stored_fields(self):
+        app = App.objects.create(name='Crime App', description='Maps crime.')
+        data = Data.objects.create(name='Crime Data', description='Reports.')
+        for instance in (app, data):
+            index = site.get_index(type(instance))
+            index.backend.update(index, [instance])
+        responses = []
+        self.assertNumQueries(0, lambda: responses.append(
+            self.client.get('/search', {'q': 'crime'})))
+        response = responses[0]
+        self.assertContains(response, 'href="/app/crime-app"')
+        self.assertContains(response, 'Maps crime.')
+        self.assertContains(response, 'href="/data/crime-data"')
+
+    def test_results_without_stored_fields_are_loaded_in_bulk(self):
+        apps = [App.objects.create(name='App %d' % i, description='Test.')
+                for i in xrange(3)]
+        data = Data.objects.create(name='Crime', description='Test.')
+        results = [SearchResult('data_catalog', 'app', str(app.pk), 1.0)
+                   for app in apps]
+        results.append(SearchResult('data_catalog', 'data', str(data.pk), 1.0))
+        self.assertNumQueries(4, load_missing, results)
+        self.assertEqual([result.url for result in results],
+                         ['/app/app-0', '/app/app-1', '/app/app-2',
+                          '/data/crime'])
+        self.assertEqual(results[-1].object, data)
+
+
 class TestTagging(TestCase):
 
     def test_getting_all_objects_associated_with_a_tag(self):
@@ -287,6 +872,944 @@ class TestTagging(TestCase):
                                  lambda item: str(item.content_type))
 
 
+class TestTagPrefetching(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        for i in range(12):
+            data = Data.objects.create(name='Data %d' % i, description='Test.')
+            data.tags.add('GIS', 'tag %d' % i)
+
+    def test_tags_are_attached_to_each_instance(self):
+        app = App.objects.create(name='App', description='Test.',
+                                 url='http://test.com')
+        app.tags.add('app')
+        resources = prefetch_tags([app] + list(Data.objects.all()[:2]))
+        self.assertEqual([[tag.name for tag in resource.tag_list]
+                          for resource in resources],
+                         [['app'], ['GIS', 'tag 0'], ['GIS', 'tag 1']])
+
+    def test_list_view_queries_do_not_grow_with_page_size(self):
+        # The first page has nine resources, and the second has three. The
+        # fourth query reads the tag facets.
+        with self.assertNumQueries(4):
+            response = self.client.get('/data', {'page': 1})
+        self.assertContains(response, 'tag 8')
+        with self.assertNumQueries(4):
+            response = self.client.get('/data', {'page': 2})
+        self.assertContains(response, 'tag 11')
+
+
+class TestFacets(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.crime = App.objects.create(name='Crime App', description='Test.')
+        self.crime.tags.add('GIS', 'Public Safety')
+        self.food = App.objects.create(name='Food App', description='Test.')
+        self.food.tags.add('GIS', 'Food')
+        data = Data.objects.create(name='Crime Data', description='Test.')
+        data.tags.add('Public Safety')
+        TagCount.refresh()
+
+    def counts(self, resource_type):
+        return [(tag_count.tag.name, tag_count.count)
+                for tag_count in TagCount.facets(resource_type)]
+
+    def test_tags_are_counted_per_resource_type(self):
+        self.assertEqual(self.counts('app'),
+                         [('GIS', 2), ('Food', 1), ('Public Safety', 1)])
+        self.assertEqual(self.counts('data'), [('Public Safety', 1)])
+        self.assertEqual(self.counts('project'), [])
+
+    def test_counts_only_change_when_refreshed(self):
+        self.crime.tags.remove('GIS')
+        self.assertEqual(self.counts('app')[0], ('GIS', 2))
+        TagCount.refresh()
+        self.assertEqual(self.counts('app')[0], ('Food', 1))
+
+    def test_listing_requires_every_tag_by_default(self):
+        response = self.client.get('/apps', {'tag': ['GIS', 'Food']})
+        self.assertContains(response, 'Food App')
+        self.assertNotContains(response, 'Crime App')
+
+    def test_listing_can_match_any_tag(self):
+        response = self.client.get('/apps', {'tag': ['Food', 'Public Safety'],
+                                             'match': 'any'})
+        self.assertContains(response, 'Food App')
+        self.assertContains(response, 'Crime App')
+
+    def test_filtered_listings_are_cached_apart(self):
+        self.assertContains(self.client.get('/apps'), 'Crime App')
+        response = self.client.get('/apps', {'tag': 'Food'})
+        self.assertNotContains(response, 'Crime App')
+
+    def test_listing_shows_facet_counts(self):
+        response = self.client.get('/apps', {'tag': 'GIS'})
+        self.assertContains(response, '<a href="?">GIS</a>')
+        self.assertContains(response, '<small>(2)</small>')
+        self.assertContains(response, 'href="?tag=GIS&amp;tag=Food"')
+
+    def test_search_facets_come_from_the_counts(self):
+        result = SearchResult('data_catalog', 'app', str(self.crime.pk), 1.0,
+                              tags=['Public Safety'])
+        facets = []
+        self.assertNumQueries(1, lambda: facets.extend(search_facets([result])))
+        self.assertEqual([(f['resource_type'], f['count'], f['url'])
+                          for f in facets],
+                         [('app', 1, '/apps?tag=Public+Safety'),
+                          ('data', 1, '/data?tag=Public+Safety')])
+
+    def test_api_can_match_any_tag(self):
+        response = self.client.get('/api/v1/apps',
+                                   {'tag': ['Food', 'Public Safety'],
+                                    'match': 'any'})
+        names = [app['name'] for app in json.loads(response.content)['objects']]
+        self.assertEqual(sorted(names), ['Crime App', 'Food App'])
+
+
+class TestSupporterPages(TestCase):
+
+    def setUp(self):
+        self.project = Project.objects.create(name='Test', description='Test.',
+                                              video_url='http://vimeo.com/1')
+        for i in xrange(60):
+            user = User.objects.create_user('user%d' % i, 'user%d@bar.com' % i,
+                                            'bar')
+            Supporter.add_project_supporter(self.project, user)
+
+    def test_supporters_are_paginated_without_a_query_each(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/project/test/')
+        self.assertContains(response, '60 supporters')
+        self.assertContains(response, 'class="individual_supporter"', 48)
+        self.assertContains(response, '?supporters=2')
+        response = self.client.get('/project/test/', {'supporters': 2})
+        self.assertContains(response, 'class="individual_supporter"', 12)
+        self.assertContains(response, 'user59')
+
+
+class TestConcurrentSupport(TransactionTestCase):
+    """Support clicks racing each other, each thread on its own connection."""
+
+    def setUp(self):
+        # Every thread opens its own connection, and an in-memory SQLite
+        # database isn't shared between them, so these tests use a file.
+        self.directory = tempfile.mkdtemp()
+        self.name = connection.settings_dict['NAME']
+        connection.settings_dict['NAME'] = os.path.join(self.directory,
+                                                        'threads.db')
+        self.in_threads([lambda: call_command('syncdb', interactive=False,
+                                              verbosity=0)])
+        self.in_threads([self.create_catalog])
+
+    def tearDown(self):
+        connection.settings_dict['NAME'] = self.name
+        shutil.rmtree(self.directory)
+
+    def create_catalog(self):
+        Project.objects.create(name='Test', description='Test.',
+                               video_url='http://vimeo.com/1')
+        for i in xrange(10):
+            User.objects.create_user('user%d' % i, 'user%d@bar.com' % i, 'bar')
+
+    def in_threads(self, funcs):
+        """Start every function at once in its own thread, and wait."""
+        start = threading.Event()
+        results, errors = [], []
+
+        def run(func):
+            start.wait()
+            try:
+                results.append(func())
+            except Exception, e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(func,))
+                   for func in funcs]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return results
+
+    def toggle(self, supporting, user_ids):
+        return lambda: [Supporter.set_support(u'test', User.objects.get(pk=pk),
+                                              supporting) for pk in user_ids]
+
+    def counts(self):
+        return self.in_threads([lambda: (
+            Project.objects.get(slug='test').supporter_count,
+            Project.objects.get(slug='test').supporters.count())])[0]
+
+    def test_double_clicks_count_each_supporter_once(self):
+        user_ids = self.in_threads([lambda: list(
+            User.objects.values_list('pk', flat=True))])[0]
+        self.in_threads([self.toggle(True, user_ids) for _ in xrange(4)])
+        self.assertEqual(self.counts(), (10, 10))
+        self.in_threads([self.toggle(False, user_ids[:4]) for _ in xrange(4)])
+        self.assertEqual(self.counts(), (6, 6))
+
+
+class TestSupportToggle(TestCase):
+
+    def setUp(self):
+        self.project = Project.objects.create(name='Test', description='Test.',
+                                              video_url='http://vimeo.com/1')
+        self.user = User.objects.create_user('foo', 'foo@bar.com', 'bar')
+        Supporter.objects.create(user=self.user)
+
+    def test_supporting_resolves_the_project_and_supporter_together(self):
+        # Look up, insert, count and read back the count.
+        self.assertNumQueries(4, Supporter.set_support, u'test', self.user,
+                              True)
+        self.assertEqual(Supporter.set_support(u'test', self.user, True), 1)
+        self.assertEqual(Supporter.set_support(u'test', self.user, False), 0)
+        self.assertEqual(Supporter.set_support(u'test', self.user, False), 0)
+
+    def test_unknown_projects_raise(self):
+        self.assertRaises(Project.DoesNotExist, Supporter.set_support,
+                          u'missing', self.user, True)
+
+    def test_ajax_support_returns_the_count(self):
+        self.client.login(username='foo', password='bar')
+        for _ in xrange(2):
+            response = self.client.post('/support/test/', {'project': 'test'},
+                                        HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(json.loads(response.content),
+                         {'success': True, 'supporter_count': 1})
+
+
+class TestCommunity(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        for i in xrange(45):
+            User.objects.create_user('user%d' % i, 'user%d@bar.com' % i, 'bar')
+
+    def test_page_renders_the_first_batch(self):
+        response = self.client.get('/community')
+        self.assertContains(response, 'Avatar for user39')
+        self.assertNotContains(response, 'Avatar for user40')
+        self.assertContains(response, 'data-next="%s"'
+                            % response.context['next_token'])
+
+    def test_later_batches_are_served_as_json(self):
+        token = self.client.get('/community').context['next_token']
+        response = self.client.get('/community/members', {'after': token})
+        content = json.loads(response.content)
+        self.assertEqual(len(content['members']), 5)
+        self.assertTrue('Avatar for user44' in content['members'][-1])
+        self.assertEqual(content['next'], None)
+
+    def test_bad_tokens_are_not_found(self):
+        response = self.client.get('/community/members', {'after': '!!'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cached_fragments_skip_loading_users(self):
+        self.client.get('/community')
+        with self.assertNumQueries(1):
+            response = self.client.get('/community')
+        self.assertContains(response, 'Avatar for user0')
+
+    def test_saving_a_user_refreshes_their_fragment(self):
+        self.client.get('/community')
+        user = User.objects.get(username='user0')
+        user.email = 'new@bar.com'
+        user.save()
+        response = self.client.get('/community')
+        self.assertContains(response, md5('new@bar.com').hexdigest())
+
+    def test_featured_project_is_cached_until_it_changes(self):
+        project = Project.objects.create(name='Test', description='Test.',
+                                         video_url='http://vimeo.com/1',
+                                         featured=True)
+        self.assertEqual(Project.featured_project(), project)
+        self.assertNumQueries(0, Project.featured_project)
+        project.featured = False
+        project.save()
+        self.assertEqual(Project.featured_project(), None)
+        self.assertNumQueries(0, Project.featured_project)
+        other = Project.objects.create(name='Other', description='Test.',
+                                       video_url='http://vimeo.com/2',
+                                       featured=True)
+        self.assertEqual(Project.featured_project(), other)
+
+
+class TestFeaturedRotation(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.projects = [
+            Project.objects.create(name='Test %d' % i, description='Test.',
+                                   video_url='http://vimeo.com/%d' % i)
+            for i in xrange(3)]
+        self.day = settings.FEATURED_ROTATION_SECONDS
+
+    def test_scheduled_projects_take_turns_without_queries(self):
+        for position, project in enumerate(reversed(self.projects)):
+            FeaturedRotation.objects.create(project=project, position=position)
+        Project.featured_project()
+        with self.assertNumQueries(0):
+            names = [Project.featured_project(now=day * self.day).name
+                     for day in xrange(4)]
+        self.assertEqual(names, ['Test 2', 'Test 1', 'Test 0', 'Test 2'])
+
+    def test_rescheduling_drops_the_cached_rotation(self):
+        FeaturedRotation.objects.create(project=self.projects[0])
+        self.assertEqual(Project.featured_project(), self.projects[0])
+        FeaturedRotation.objects.all().delete()
+        FeaturedRotation.objects.create(project=self.projects[1])
+        self.assertEqual(Project.featured_project(), self.projects[1])
+
+    def test_editing_a_featured_project_refreshes_it(self):
+        project = self.projects[0]
+        project.featured = True
+        project.save()
+        self.assertEqual(Project.featured_project().name, 'Test 0')
+        project.name = 'Renamed'
+        project.save()
+        self.assertEqual(Project.featured_project().name, 'Renamed')
+
+    def test_community_page_shows_the_featured_project(self):
+        project = self.projects[1]
+        project.featured = True
+        project.save()
+        self.assertContains(self.client.get('/community'), 'Test 1')
+
+
+class TestVideo(TestCase):
+
+    def project(self, video_url):
+        return Project(name='Test', description='Test.', video_url=video_url)
+
+    def test_providers_recognize_their_url_forms(self):
+        urls = {
+            'http://www.youtube.com/watch?v=dQw4w9WgXcQ': 'dQw4w9WgXcQ',
+            'http://www.youtube.com/watch?feature=share&v=a-b_c': 'a-b_c',
+            'http://youtu.be/dQw4w9WgXcQ': 'dQw4w9WgXcQ',
+            'https://www.youtube.com/embed/dQw4w9WgXcQ': 'dQw4w9WgXcQ',
+        }
+        for url, video_id in urls.items():
+            self.assertEqual(video.parse(url), ('youtube', video_id))
+        self.assertEqual(video.parse('http://vimeo.com/12345'),
+                         ('vimeo', '12345'))
+        self.assertEqual(video.parse('http://vimeo.com/channels/staff/678'),
+                         ('vimeo', '678'))
+        self.assertEqual(video.parse('http://example.com/1'), (None, None))
+
+    def test_embed_url_is_only_made_when_the_video_changes(self):
+        project = self.project('http://youtu.be/abc')
+        with patch.object(video, 'embed_url', wraps=video.embed_url) as embed:
+            project.save()
+            project.description = 'Changed.'
+            project.save()
+            Project.objects.get(pk=project.pk).save()
+            project.video_url = 'http://vimeo.com/12345'
+            project.save()
+        self.assertEqual(embed.call_count, 2)
+        self.assertEqual(project.embed_url, 'http://player.vimeo.com/video/'
+                         '12345?portrait=0&byline=0&title=0')
+
+    def test_unknown_videos_raise(self):
+        self.assertRaises(video.UnknownVideoURL,
+                          self.project('http://example.com/1').save)
+
+    def test_bulk_resolving_skips_unknown_videos(self):
+        projects = [self.project('http://youtu.be/abc'),
+                    self.project('http://example.com/1'),
+                    self.project('http://youtu.be/abc')]
+        self.assertEqual(video.resolve_embed_urls(projects), [projects[1]])
+        self.assertEqual([project.embed_url for project in projects],
+                         ['http://www.youtube.com/embed/abc', '',
+                          'http://www.youtube.com/embed/abc'])
+
+
+class TestThumbnails(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.storage = patch.object(default_storage, '_wrapped',
+                                    FileSystemStorage(self.directory, '/media/'))
+        self.storage.start()
+
+    def tearDown(self):
+        self.storage.stop()
+        shutil.rmtree(self.directory)
+
+    def create_app(self, name, color='red'):
+        output = StringIO()
+        Image.new('RGB', (800, 600), color).save(output, 'PNG')
+        app = App(name=name, description='Test.', url='http://test.com')
+        app.image.save('%s.png' % name.lower(), ContentFile(output.getvalue()))
+        return app
+
+    def test_saving_an_image_queues_its_thumbnails(self):
+        self.create_app('Crime')
+        self.assertEqual(sorted(Thumbnail.objects.values_list('format',
+                                                              flat=True)),
+                         ['jpeg', 'webp'])
+        self.assertFalse(Thumbnail.objects.exclude(name='').exists())
+
+    def test_thumbnails_are_written_next_to_the_original(self):
+        self.create_app('Crime')
+        self.assertEqual(thumbnails.process_all(), {'made': 2, 'dropped': 0})
+        jpeg = Thumbnail.objects.get(format='jpeg')
+        self.assertTrue(re.match(r'^apps/crime\.card\.[0-9a-f]{12}\.jpg$',
+                                 jpeg.name))
+        image = Image.open(os.path.join(self.directory, jpeg.name))
+        self.assertEqual(image.size, settings.THUMBNAIL_SIZES['card'])
+
+    def test_changed_images_get_new_names(self):
+        self.create_app('Crime', 'red')
+        self.create_app('Food', 'blue')
+        thumbnails.process_all()
+        names = Thumbnail.objects.filter(format='jpeg').values_list('name',
+                                                                    flat=True)
+        digests = set(name.split('.')[-2] for name in names)
+        self.assertEqual(len(digests), 2)
+
+    def test_listing_falls_back_until_thumbnails_are_made(self):
+        self.create_app('Crime')
+        response = self.client.get('/apps')
+        self.assertContains(response, 'src="/media/apps/crime.png"')
+        thumbnails.process_all()
+        response = self.client.get('/apps')
+        self.assertContains(response, '<source srcset="/media/apps/crime.card.')
+        self.assertNotContains(response, 'src="/media/apps/crime.png"')
+
+    def test_missing_images_are_dropped(self):
+        app = self.create_app('Crime')
+        default_storage.delete(app.image.name)
+        with patch.object(thumbnails, 'logger') as logger:
+            counts = thumbnails.process_all()
+        self.assertEqual(counts, {'made': 0, 'dropped': 2})
+        self.assertEqual(logger.warning.call_count, 2)
+        self.assertEqual(Thumbnail.objects.count(), 0)
+
+    def test_thumbnails_of_deleted_images_are_pruned(self):
+        app = self.create_app('Crime')
+        self.create_app('Food')
+        thumbnails.process_all()
+        default_storage.delete(app.image.name)
+        self.assertEqual(thumbnails.process_all(), {'made': 0, 'dropped': 2})
+        self.assertQuerysetEqual(Thumbnail.objects.order_by('format'),
+                                 ['apps/food.png'] * 2,
+                                 lambda thumbnail: thumbnail.source)
+
+    def test_images_pil_fails_on_are_dropped(self):
+        self.create_app('Crime')
+        self.create_app('Food')
+        self.create_app('Trees')
+        errors = [SyntaxError('not a PNG file'), IOError('truncated'),
+                  Image.DecompressionBombError('too big'),
+                  ValueError('bad mode')]
+
+        def open_image(content):
+            if errors:
+                raise errors.pop()
+            return open_image.original(content)
+
+        open_image.original = Image.open
+        with patch.object(thumbnails, 'logger'):
+            with patch.object(Image, 'open', side_effect=open_image):
+                counts = thumbnails.process_all()
+        self.assertEqual(counts, {'made': 2, 'dropped': 4})
+        self.assertEqual(Thumbnail.objects.exclude(name='').count(), 2)
+
+    def test_other_errors_leave_thumbnails_queued(self):
+        self.create_app('Crime')
+        with patch.object(Thumbnail, 'save', side_effect=DatabaseError):
+            self.assertRaises(DatabaseError, thumbnails.process_all)
+        self.assertEqual(Thumbnail.objects.filter(name='').count(), 2)
+
+
+class TestStaticBundles(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, 'css'))
+        os.mkdir(os.path.join(self.directory, 'js'))
+        self.write('css/a.css', '/* Reset. */\nbody {\n  color: red;\n}\n')
+        self.write('css/b.css', 'a { background: url(../img/x.png); }\n')
+        self.write('js/a.js', '// Setup.\nvar a = 1;\n\n  var b = 2;\n')
+        self.write('js/b.js', '/*\n * Docs.\n */\nvar c = a + b\n')
+        self.settings = patch.multiple(
+            settings, STATICFILES_DIRS=(self.directory,), DEBUG=False,
+            STATIC_BUNDLES={'site.css': ('css/a.css', 'css/b.css'),
+                            'site.js': ('js/a.js', 'js/b.js')})
+        self.settings.start()
+        bundles._manifest.clear()
+
+    def tearDown(self):
+        self.settings.stop()
+        bundles._manifest.clear()
+        shutil.rmtree(self.directory)
+
+    def write(self, path, content):
+        output = open(os.path.join(self.directory, path), 'w')
+        output.write(content)
+        output.close()
+
+    def read(self, path):
+        return open(os.path.join(self.directory, path)).read()
+
+    def test_bundles_are_minified_and_named_by_content(self):
+        manifest = bundles.build()
+        self.assertTrue(re.match(r'^bundles/site\.[0-9a-f]{12}\.css$',
+                                 manifest['site.css']))
+        self.assertEqual(self.read(manifest['site.css']),
+                         'body{color:red}\n'
+                         'a{background:url(/static/img/x.png)}\n')
+        self.assertEqual(self.read(manifest['site.js']),
+                         'var a = 1;\nvar b = 2;;\nvar c = a + b\n')
+        self.assertEqual(json.loads(self.read('bundles/manifest.json')),
+                         manifest)
+
+    def test_comments_followed_by_code_are_kept(self):
+        js = '/* a */ var a = 1; /* b */\n  /* c */\nvar b = 2;\n'
+        self.assertEqual(bundles.minify_js(js),
+                         '/* a */ var a = 1; /* b */\nvar b = 2;')
+
+    def test_missing_manifests_are_only_looked_for_once(self):
+        with patch.object(bundles, 'open', create=True,
+                          side_effect=IOError) as open_manifest:
+            self.assertEqual(bundles.urls('site.css'),
+                             ['/static/css/a.css', '/static/css/b.css'])
+            bundles.urls('site.js')
+        self.assertEqual(open_manifest.call_count, 1)
+
+    def test_bundles_have_gzipped_copies(self):
+        manifest = bundles.build()
+        path = os.path.join(self.directory, manifest['site.js'])
+        self.assertEqual(gzip.open(path + '.gz').read(), self.read(path))
+
+    def test_changed_sources_get_new_names(self):
+        before = bundles.build()
+        self.write('css/b.css', 'a { color: blue; }\n')
+        after = bundles.build()
+        self.assertNotEqual(before['site.css'], after['site.css'])
+        self.assertEqual(before['site.js'], after['site.js'])
+
+    def test_pages_use_the_built_bundles(self):
+        response = self.client.get('/')
+        self.assertContains(response, 'href="/static/css/a.css"')
+        manifest = bundles.build()
+        response = self.client.get('/')
+        self.assertContains(response, 'href="/static/%s"' % manifest['site.css'])
+        self.assertContains(response, 'src="/static/%s"' % manifest['site.js'])
+        self.assertNotContains(response, '/static/css/a.css')
+
+    def test_debugging_uses_the_source_files(self):
+        bundles.build()
+        settings.DEBUG = True
+        self.assertEqual(bundles.urls('site.js'),
+                         ['/static/js/a.js', '/static/js/b.js'])
+
+
+class TestProfiling(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.logger = patch.object(profiling, 'logger')
+        self.logger.start()
+
+    def tearDown(self):
+        self.logger.stop()
+
+    def profile(self, path, rate=1):
+        with patch.object(settings, 'PROFILING_SAMPLE_RATE', rate):
+            self.client.get(path)
+        return [json.loads(call[0][0])
+                for call in profiling.logger.info.call_args_list]
+
+    def test_sampled_requests_are_recorded(self):
+        Data.objects.create(name='Crime', description='Test.',
+                            url='http://test.com')
+        record, = self.profile('/data')
+        self.assertEqual(record['view'], 'data_catalog.views.data')
+        self.assertEqual(record['status'], 200)
+        self.assertTrue(record['queries'] > 0)
+        self.assertTrue(record['template_ms'] > 0)
+        self.assertTrue(record['cache_misses'] > 0)
+        self.assertTrue(len(record['slowest']) <= settings.PROFILING_SLOWEST)
+        self.assertTrue(record['slowest'][0][1].startswith('SELECT'))
+
+    def test_cache_hits_are_counted(self):
+        self.profile('/data')
+        second = self.profile('/data')[-1]
+        self.assertTrue(second['cache_hits'] > 0)
+
+    def test_view_classes_are_named(self):
+        record, = self.profile('/search?q=crime')
+        self.assertEqual(record['view'], 'data_catalog.search.SearchView')
+
+    def test_nothing_is_recorded_when_off(self):
+        self.assertEqual(self.profile('/data', rate=0), [])
+
+    def test_unresolved_requests_are_skipped(self):
+        self.assertEqual(self.profile('/no/such/page'), [])
+
+    def test_report_summarizes_the_log(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'profiling.log')
+        output = open(path, 'w')
+        for ms in range(1, 101):
+            output.write(json.dumps({
+                'view': 'views.data', 'ms': ms, 'queries': 2, 'sql_ms': 1.0,
+                'template_ms': 3.0, 'cache_hits': 1, 'cache_misses': 1,
+                'slowest': [[ms / 10.0, 'SELECT %d' % ms]]}) + '\n')
+        output.write('{"view": "views.da')
+        output.close()
+        views, queries = profiling.summarize(profiling.read_records(path), 2)
+        self.assertEqual(views['views.data']['requests'], 100)
+        self.assertEqual(queries, [(10.0, 'views.data', 'SELECT 100'),
+                                   (9.9, 'views.data', 'SELECT 99')])
+        stdout = StringIO()
+        with patch('sys.stdout', stdout):
+            call_command('profiling_report', log=path, queries=1)
+        shutil.rmtree(directory)
+        report = stdout.getvalue()
+        self.assertTrue(re.search(r'views\.data +100 +51\.0 +96\.0 +100\.0 '
+                                  r'+2\.0 +1\.0 +3\.0 +50%', report))
+        self.assertTrue('SELECT 100' in report)
+        self.assertFalse('SELECT 99' in report)
+
+
+class TestBenchmarks(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.settings = patch.object(settings, 'HAYSTACK_WHOOSH_PATH',
+                                     self.directory)
+        self.settings.start()
+        self.reset_backends()
+
+    def tearDown(self):
+        self.settings.stop()
+        self.reset_backends()
+        shutil.rmtree(self.directory)
+
+    def reset_backends(self):
+        for model in site.get_indexed_models():
+            site.get_index(model).backend.setup_complete = False
+
+    def test_seeded_catalogs_are_repeatable(self):
+        catalog = seed_catalog(apps=3, data=4, projects=5, tags=6, users=7,
+                               supporters=2)
+        self.assertEqual(len(catalog['tags']), 6)
+        self.assertEqual(catalog['slugs']['project'],
+                         ['project-%d' % i for i in range(5)])
+        self.assertEqual(Supporter.projects.through.objects.count(), 14)
+        self.assertEqual(sum(Project.objects.values_list('supporter_count',
+                                                         flat=True)), 14)
+        self.assertEqual(TaggedItem.objects.count(), 36)
+        tagged = list(TaggedItem.objects.order_by('pk')
+                      .values_list('tag__name', 'object_id'))
+        for model in (App, Data, Project, Supporter, User, Tag, TaggedItem):
+            model.objects.all().delete()
+        seed_catalog(apps=3, data=4, projects=5, tags=6, users=7,
+                     supporters=2)
+        self.assertEqual(list(TaggedItem.objects.order_by('pk')
+                              .values_list('tag__name', 'object_id')), tagged)
+
+    def test_endpoints_run_offline(self):
+        with patch.object(datacouch, 'urlopen') as urlopen:
+            results = endpoints(apps=2, data=3, projects=2, tags=4, users=3,
+                                requests=2)
+        self.assertFalse(urlopen.called)
+        self.assertEqual(sorted(results), [
+            'autocomplete', 'data_cold', 'data_tagged', 'data_warm',
+            'datacouch_sync', 'projects_cold', 'search', 'support'])
+        self.assertTrue(results['data_cold']['queries_per_call'] > 0)
+        self.assertEqual(Data.objects.count(), 6)
+
+    def test_benchmarks_run_one_after_another(self):
+        stdout, errors = StringIO(), []
+
+        def run():
+            # In a thread, so the scratch database it makes and destroys is
+            # its own, rather than this test's.
+            try:
+                call_command('benchmark', 'bulk_import', 'endpoints',
+                             parameters=['rows=20', 'apps=2', 'data=3',
+                                         'projects=2', 'tags=4', 'users=3',
+                                         'requests=2'],
+                             json='-', stdout=stdout)
+            except Exception, e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        with patch.object(datacouch, 'urlopen'):
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join()
+        self.assertEqual(errors, [])
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(sorted(report), ['bulk_import', 'endpoints'])
+        self.assertEqual(report['bulk_import']['parameters'], {'rows': 20})
+
+
+class TestHotQueries(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        results = explain.audit()
+        self.assertEqual([label for label, plan, full_scan in results
+                          if full_scan], [])
+        plans = dict((label, ' '.join(plan)) for label, plan, full_scan
+                     in results)
+        self.assertTrue(re.search(r'name=\? AND url=\?',
+                                  plans['Data by name and URL']))
+
+    def test_full_scans_fail_the_audit(self):
+        queries = explain.hot_queries() + [
+            ('Data by description', Data.objects.filter(description=''))]
+        stdout, stderr = StringIO(), StringIO()
+        with patch.object(explain, 'hot_queries', return_value=queries):
+            with patch('sys.stdout', stdout):
+                with patch('sys.stderr', stderr):
+                    self.assertRaises(SystemExit, call_command,
+                                      'explain_hot_queries')
+        self.assertTrue('Data by description.' in stderr.getvalue())
+        self.assertTrue('FAIL Data by description' in stdout.getvalue())
+        self.assertTrue('ok   Featured project' in stdout.getvalue())
+
+
+class TestDatabases(TransactionTestCase):
+    """Reads and writes routed between a primary and a replica file."""
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.name = connection.settings_dict['NAME']
+        primary = os.path.join(self.directory, 'primary.db')
+        connection.settings_dict['NAME'] = primary
+        self.in_thread(lambda: call_command('syncdb', interactive=False,
+                                            verbosity=0))
+        self.in_thread(lambda: Data.objects.create(name='Replicated',
+                                                   description='Test.'))
+        replica = os.path.join(self.directory, 'replica.db')
+        shutil.copy(primary, replica)
+        connections.databases['replica'] = dict(connection.settings_dict,
+                                                NAME=replica)
+        self.settings = patch.object(settings, 'DATABASE_READ_REPLICA',
+                                     'replica')
+        self.settings.start()
+        # Only on the primary, as though the replica were behind.
+        self.in_thread(lambda: Data.objects.create(name='Not Replicated',
+                                                   description='Test.'))
+        # And as though it had been written a while ago.
+        cache.delete(databases.RECENT_WRITE_KEY)
+
+    def tearDown(self):
+        self.settings.stop()
+        del connections.databases['replica']
+        connections._connections.pop('replica', None)
+        connection.settings_dict['NAME'] = self.name
+        shutil.rmtree(self.directory)
+
+    def in_thread(self, func):
+        """
+        Run a function in a thread, whose connections open the files rather
+        than the in-memory test database, and close them after.
+        """
+        results, errors = [], []
+
+        def run():
+            try:
+                results.append(func())
+            except Exception, e:
+                errors.append(e)
+            finally:
+                for alias in connections.databases:
+                    connections[alias].close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        if errors:
+            raise errors[0]
+        return results[0]
+
+    def names(self):
+        return sorted(Data.objects.values_list('name', flat=True))
+
+    def test_listings_read_from_the_replica(self):
+        response = self.in_thread(lambda: self.client.get('/data'))
+        self.assertContains(response, 'Replicated')
+        self.assertNotContains(response, 'Not Replicated')
+
+    def test_browsers_that_just_wrote_read_from_the_primary(self):
+        self.client.cookies[databases.PRIMARY_COOKIE] = str(time.time() + 5)
+        response = self.in_thread(lambda: self.client.get('/data'))
+        self.assertContains(response, 'Not Replicated')
+        cache.clear()
+        self.client.cookies[databases.PRIMARY_COOKIE] = str(time.time() - 1)
+        response = self.in_thread(lambda: self.client.get('/data'))
+        self.assertNotContains(response, 'Not Replicated')
+
+    def test_writes_set_the_primary_cookie(self):
+        middleware = databases.PrimaryCookieMiddleware()
+        request = HttpRequest()
+        middleware.process_request(request)
+        response = middleware.process_response(request, HttpResponse())
+        self.assertFalse(databases.PRIMARY_COOKIE in response.cookies)
+        middleware.process_request(request)
+        caching.bump_version('data')
+        response = middleware.process_response(request, HttpResponse())
+        self.assertTrue(float(response.cookies[databases.PRIMARY_COOKIE].value)
+                        > time.time())
+
+    def test_replica_reads_are_not_cached_right_after_a_write(self):
+        caching.bump_version('data')
+        response = self.in_thread(lambda: self.client.get('/api/v1/data'))
+        self.assertFalse(response.has_header('ETag'))
+        self.in_thread(lambda: self.client.get('/data'))
+        self.assertEqual(caching.get_listing('data', 1, 'list-view'), None)
+        cache.delete(databases.RECENT_WRITE_KEY)
+        self.in_thread(lambda: self.client.get('/data'))
+        self.assertTrue(caching.get_listing('data', 1, 'list-view'))
+
+    def test_reading_a_lost_version_is_not_a_write(self):
+        cache.clear()
+        caching.get_version('data')
+        self.assertEqual(cache.get(databases.RECENT_WRITE_KEY), None)
+
+    def test_support_changes_are_writes(self):
+        user = User.objects.create_user('supporter', 's@example.com', 'pw')
+        project = Project.objects.create(name='Project', description='Test.',
+                                         organization='Org',
+                                         video_url='http://vimeo.com/1')
+        cache.delete(databases.RECENT_WRITE_KEY)
+        Supporter.set_support(project, user, True)
+        self.assertTrue(cache.get(databases.RECENT_WRITE_KEY))
+
+    def test_streamed_responses_read_from_the_replica(self):
+        def export():
+            response = self.client.get('/export/catalog.ndjson',
+                                       {'type': 'data'})
+            return [json.loads(line)['name'] for line in
+                    response.content.splitlines()]
+
+        self.assertEqual(self.in_thread(export), ['Replicated'])
+
+    def test_other_reads_use_the_primary(self):
+        self.assertEqual(self.in_thread(self.names),
+                         ['Not Replicated', 'Replicated'])
+
+    def test_writes_go_to_the_primary(self):
+        @databases.replica_reads
+        def edit(request):
+            data = Data.objects.get(name='Replicated')
+            data.description = 'Edited.'
+            data.save()
+            return self.names(), User.objects.all().db
+
+        names, user_database = self.in_thread(lambda: edit(HttpRequest()))
+        self.assertEqual(names, ['Replicated'])
+        self.assertEqual(user_database, 'default')
+        description = lambda alias: self.in_thread(lambda: Data.objects.using(
+            alias).get(name='Replicated').description)
+        self.assertEqual(description('default'), 'Edited.')
+        self.assertEqual(description('replica'), 'Test.')
+
+    def test_replica_reads_are_off_without_a_replica(self):
+        settings.DATABASE_READ_REPLICA = None
+        view = databases.replica_reads(lambda request: self.names())
+        names = self.in_thread(lambda: view(HttpRequest()))
+        self.assertEqual(names, ['Not Replicated', 'Replicated'])
+
+    def test_sqlite_uses_write_ahead_logging(self):
+        def journal_mode():
+            cursor = connection.cursor()
+            cursor.execute('PRAGMA journal_mode')
+            return cursor.fetchone()[0]
+
+        self.assertEqual(self.in_thread(journal_mode), 'wal')
+
+    def test_connections_are_kept_until_they_are_old(self):
+        def finish_requests():
+            Data.objects.count()
+            databases.close_old_connections()
+            kept = connection.connection is not None
+            connection.created_at -= 120
+            databases.close_old_connections()
+            return kept, connection.connection is None
+
+        with patch.object(settings, 'DATABASE_CONNECTION_MAX_AGE', 60):
+            self.assertEqual(self.in_thread(finish_requests), (True, True))
+
+
+class TestListingCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        Data.objects.create(name='Crime', description='Test.')
+
+    def test_listing_is_served_from_cache(self):
+        self.client.get('/data')
+        self.assertTrue(caching.get_listing('data', 1, 'list-view'))
+        with self.assertNumQueries(0):
+            response = self.client.get('/data')
+        self.assertContains(response, 'Crime')
+
+    def test_listings_are_cached_per_page_and_layout(self):
+        self.client.get('/data')
+        self.assertEqual(caching.get_listing('data', 2, 'list-view'), None)
+        self.assertEqual(caching.get_listing('data', 1, None), None)
+
+    def test_page_is_normalized_before_caching(self):
+        for page in ('junk', '1', ' 1', 'x' * 300 + '\x01'):
+            self.client.get('/data', {'page': page})
+        self.client.get('/data', {'page': 7})
+        self.assertTrue(caching.get_listing('data', 1, 'list-view'))
+        self.assertEqual(caching.get_listing('data', 7, 'list-view'), None)
+        after = encode_cursor(Data.objects.get().pk - 1)
+        self.client.get('/data', {'after': after + '=='})
+        self.assertTrue(caching.get_listing(
+            'data', 'after-%d' % (Data.objects.get().pk - 1), 'list-view'))
+
+    def test_saving_a_resource_invalidates_its_listing(self):
+        self.client.get('/data')
+        self.client.get('/apps')
+        Data.objects.create(name='Food Trucks', description='Test.')
+        self.assertEqual(caching.get_listing('data', 1, 'list-view'), None)
+        self.assertTrue(caching.get_listing('app', 1, None))
+        response = self.client.get('/data')
+        self.assertContains(response, 'Food Trucks')
+
+    def test_deleting_a_resource_invalidates_its_listing(self):
+        self.client.get('/data')
+        Data.objects.all().delete()
+        response = self.client.get('/data')
+        self.assertNotContains(response, 'Crime')
+
+    def test_tagging_a_resource_invalidates_its_listing(self):
+        self.client.get('/data')
+        Data.objects.get().tags.add('GIS')
+        response = self.client.get('/data')
+        self.assertContains(response, 'GIS')
+
+    def test_per_process_caches_keep_listings_briefly(self):
+        self.assertEqual(caching.timeout(), settings.LISTING_CACHE_TIMEOUT)
+        with patch.object(caching, 'cache', LocMemCache('test', {})):
+            self.assertEqual(caching.timeout(), settings.LOCAL_CACHE_TIMEOUT)
+
+    def test_bulk_import_invalidates_the_data_listing(self):
+        self.client.get('/data')
+        Data.bulk_import([{'name': 'Parking', 'url': 'http://parking.com'}])
+        response = self.client.get('/data')
+        self.assertContains(response, 'Parking')
+
+
 class TestUtils(TestCase):
 
     def test_JSON_response_against_model(self):
@@ -301,3 +1824,122 @@ class TestUtils(TestCase):
     def test_JSON_response_fails_when_passed_a_mock_object(self):
         data = Mock()
         self.assertRaises(TypeError, JSONResponse, data)
+
+    def test_JSON_response_is_compact_by_default(self):
+        self.assertEqual(JSONResponse({'tags': ['GIS']}).content,
+                         '{"tags":["GIS"]}')
+        self.assertTrue('\n' in JSONResponse({'tags': []}, indent=2).content)
+
+    def test_JSON_response_streams_querysets(self):
+        for i in range(3):
+            Data.objects.create(name='Data %d' % i, description='Test.')
+        response = JSONResponse(Data.objects.all())
+        content = json.loads(response.content)
+        self.assertEqual([data['name'] for data in content],
+                         ['Data 0', 'Data 1', 'Data 2'])
+
+    def test_serializing_does_not_change_the_model(self):
+        project = Project.objects.create(name='Test', description='Test.',
+                                         video_url='http://vimeo.com/12345')
+        data = serialize(project)
+        self.assertEqual(data['name'], 'Test')
+        self.assertEqual(data['image'], None)
+        self.assertFalse('_state' in data)
+        self.assertFalse('user' in data)
+        self.assertTrue(project.featured is False)
+        project.save()
+
+
+def datacouch_response(etag='"v1"', last_modified=''):
+    """A stand-in for Data Couch that serves the test data fixture."""
+    path = os.path.join(os.path.dirname(__file__), 'testdata', 'datacouch.json')
+    response = Mock()
+    response.read.return_value = open(path).read()
+    response.info.return_value = {'ETag': etag,
+                                  'Last-Modified': last_modified}
+    return response
+
+
+class TestAvatars(TestCase):
+
+    def test_gravatar_urls_are_hashed_once_per_email(self):
+        from data_catalog.templatetags import avatars
+        avatars._urls.clear()
+        with patch.object(avatars, 'md5', wraps=avatars.md5) as md5:
+            first = avatars.gravatar_url('foo@bar.com')
+            second = avatars.gravatar_url('foo@bar.com')
+        self.assertEqual(first, second)
+        self.assertEqual(md5.call_count, 1)
+        self.assertTrue('/avatar/f3ada405ce890b6f8204094deb12d8a8/' in first)
+
+
+class TestDataCouch(TestCase):
+
+    @patch('data_catalog.datacouch.urlopen')
+    def test_sync_creates_data_sets(self, urlopen):
+        urlopen.return_value = datacouch_response()
+        counts = datacouch.sync('newurbanmechs')
+        self.assertEqual(counts, {'created': 2, 'updated': 0, 'unchanged': 0})
+        self.assertQuerysetEqual(Data.objects.order_by('id'),
+                                 ['dc-food-trucks', 'dc-crime-2011'],
+                                 lambda data: data.slug)
+        self.assertEqual(SyncState.objects.get().etag, '"v1"')
+
+    @patch('data_catalog.datacouch.urlopen')
+    def test_sync_only_applies_changed_rows(self, urlopen):
+        urlopen.return_value = datacouch_response()
+        datacouch.sync('newurbanmechs')
+        data = Data.objects.get(slug='dc-food-trucks')
+        data.description = 'Out of date.'
+        data.save()
+        urlopen.return_value = datacouch_response(etag='"v2"')
+        counts = datacouch.sync('newurbanmechs')
+        self.assertEqual(counts, {'created': 0, 'updated': 1, 'unchanged': 1})
+        data = Data.objects.get(slug='dc-food-trucks')
+        self.assertEqual(data.description, 'Food truck locations and schedules.')
+
+    @patch('data_catalog.datacouch.urlopen')
+    def test_sync_sends_conditional_headers(self, urlopen):
+        SyncState.objects.create(source='newurbanmechs', etag='"v1"',
+                                 last_modified='Mon, 03 Oct 2011 10:00:00 GMT')
+        urlopen.side_effect = HTTPError('url', 304, 'Not Modified', {}, None)
+        self.assertEqual(datacouch.sync('newurbanmechs'), None)
+        request = urlopen.call_args[0][0]
+        self.assertEqual(request.get_header('If-none-match'), '"v1"')
+        self.assertEqual(request.get_header('If-modified-since'),
+                         'Mon, 03 Oct 2011 10:00:00 GMT')
+        self.assertEqual(Data.objects.count(), 0)
+
+    @patch('data_catalog.datacouch.urlopen')
+    def test_data_page_does_not_contact_datacouch(self, urlopen):
+        self.client.get('/data')
+        self.assertFalse(urlopen.called)
+
+    @patch('data_catalog.datacouch.connection')
+    @patch('data_catalog.datacouch.time')
+    @patch('data_catalog.datacouch.urlopen')
+    def test_failed_syncs_do_not_stop_the_loop(self, urlopen, time, connection):
+        class Stop(Exception):
+            pass
+
+        bad_json = datacouch_response()
+        bad_json.read.return_value = '{"rows": ['
+        urlopen.side_effect = [URLError('down'), socket.timeout('timed out'),
+                               bad_json, datacouch_response()]
+        sync, errors = datacouch.sync, [DatabaseError('locked')]
+
+        def sync_or_fail(user):
+            if errors:
+                raise errors.pop()
+            return sync(user)
+
+        logged = []
+        time.sleep.side_effect = [None, None, None, None, Stop]
+        with patch.object(datacouch, 'sync', side_effect=sync_or_fail):
+            self.assertRaises(Stop, datacouch.run_forever, 60,
+                              'newurbanmechs', logged.append)
+        self.assertEqual([type(counts) for counts in logged],
+                         [DatabaseError, URLError, socket.timeout,
+                          ValueError, dict])
+        self.assertTrue(connection.close.called)
+        self.assertEqual(Data.objects.count(), 2)
@@ -0,0 +1,147 @@
+"""Make the queued thumbnails of uploaded app and project images."""
+
+import logging
+import os
+import struct
+import time
+from cStringIO import StringIO
+from hashlib import sha1
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from data_catalog import caching
+from data_catalog.models import Thumbnail
+
+logger = logging.getLogger(__name__)
+
+# What Pillow raises for broken or hostile images, and storage for files it
+# can't read.
+IMAGE_ERRORS = (IOError, OSError, EOFError, SyntaxError, ValueError,
+                struct.error, Image.DecompressionBombError)
+
+# PIL's name for each format, the file extension, and the options to save
+# it with.
+FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 85, 'optimize': True}),
+    'webp': ('WEBP', 'webp', {'quality': 80}),
+}
+
+
+def can_write(format):
+    Image.init()
+    return format in FORMATS and FORMATS[format][0] in Image.SAVE
+
+
+def thumbnail_name(source, size, format, content):
+    """
+    Name a thumbnail after its source image, size and a hash of the image,
+    so a changed upload never reuses a stale thumbnail's URL.
+    """
+    digest = sha1(content)
+    digest.update(('%s:%s' % (size, format)).encode('utf-8'))
+    digest = digest.hexdigest()[:12]
+    return '%s.%s.%s.%s' % (os.path.splitext(source)[0], size, digest,
+                            FORMATS[format][1])
+
+
+def make(thumbnail):
+    """Write one thumbnail next to its source image, and record its name."""
+    pil_format, extension, options = FORMATS[thumbnail.format]
+    source = default_storage.open(thumbnail.source)
+    try:
+        content = source.read()
+    finally:
+        source.close()
+    name = thumbnail_name(thumbnail.source, thumbnail.size, thumbnail.format,
+                          content)
+    if not default_storage.exists(name):
+        image = Image.open(StringIO(content))
+        image = ImageOps.fit(image.convert('RGB'),
+                             settings.THUMBNAIL_SIZES[thumbnail.size],
+                             Image.ANTIALIAS)
+        output = StringIO()
+        image.save(output, pil_format, **options)
+        default_storage.save(name, ContentFile(output.getvalue()))
+    thumbnail.name = name
+    thumbnail.save()
+
+
+def process(batch_size=50):
+    """
+    Make up to `batch_size` queued thumbnails. Thumbnails whose images
+    can't be read or are in a format Pillow can't write are dropped from
+    the queue, so a bad upload can't hold up the rest, and an image that's
+    gone takes its finished thumbnails with it. Returns the number `made`
+    and `dropped`.
+    """
+    made, dropped = 0, 0
+    queued = Thumbnail.objects.filter(name='').order_by('pk')[:batch_size]
+    for thumbnail in queued:
+        supported = (thumbnail.size in settings.THUMBNAIL_SIZES and
+                     can_write(thumbnail.format))
+        if not supported:
+            thumbnail.delete()
+            dropped += 1
+            continue
+        if not default_storage.exists(thumbnail.source):
+            logger.warning('Dropped thumbnail %s: image is gone', thumbnail)
+            Thumbnail.objects.filter(source=thumbnail.source).delete()
+            dropped += 1
+            continue
+        try:
+            make(thumbnail)
+            made += 1
+        except IMAGE_ERRORS, e:
+            logger.warning('Dropped thumbnail %s: %r', thumbnail, e)
+            thumbnail.delete()
+            dropped += 1
+    if made:
+        # Listings render with whichever thumbnails existed at the time.
+        caching.bump_version('app')
+        caching.bump_version('project')
+    return {'made': made, 'dropped': dropped}
+
+
+def prune(batch_size=500):
+    """
+    Delete the finished thumbnails of images that no longer exist, and
+    return how many were deleted.
+    """
+    sources = (Thumbnail.objects.exclude(name='').order_by()
+               .values_list('source', flat=True).distinct())
+    gone = [source for source in sources if not default_storage.exists(source)]
+    deleted = 0
+    for start in xrange(0, len(gone), batch_size):
+        thumbnails = Thumbnail.objects.filter(
+            source__in=gone[start:start + batch_size])
+        deleted += thumbnails.count()
+        thumbnails.delete()
+    return deleted
+
+
+def process_all(batch_size=50):
+    """
+    Work through the whole queue, then prune the thumbnails of images that
+    are gone, and return the combined counts.
+    """
+    totals = {'made': 0, 'dropped': 0}
+    while True:
+        counts = process(batch_size)
+        if not any(counts.values()):
+            break
+        for key in totals:
+            totals[key] += counts[key]
+    totals['dropped'] += prune()
+    return totals
+
+
+def run_forever(interval, batch_size=50, log=None):
+    """Keep making thumbnails, checking the queue every `interval` seconds."""
+    while True:
+        counts = process_all(batch_size)
+        if log is not None and any(counts.values()):
+            log(counts)
+        time.sleep(interval)
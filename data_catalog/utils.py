@@ -1,40 +1,121 @@
 """Utility functions used by the data catalog."""
 
-from django.db.models import Model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import AutoField, Q
 from django.db.models.query import QuerySet
 from django.http import HttpResponse
-from django.utils.encoding import force_unicode
-from django.utils.simplejson import dumps, JSONEncoder
+from autoslug.utils import crop_slug
+from taggit.models import TaggedItem
 
+from data_catalog.serializers import encoder, stream_queryset
 
-# The following snippets are taken from:
-# http://djangosnippets.org/snippets/2411/
 
-def jsonify_model(model):
-    """Turn a model into a serializable dict."""
-    model_dict = model.__dict__
-    for key, value in model_dict.items():
-        if key.startswith('_'):
-            del model_dict[key]
+class JSONResponse(HttpResponse):
+    """
+    Return an HTTP response that's JSON content. Output is compact unless
+    an `indent` is given, and a QuerySet passed on its own is streamed.
+    """
+    status_code = 200
+
+    def __init__(self, data, indent=None):
+        if isinstance(data, QuerySet) and indent is None:
+            json_response = stream_queryset(data)
         else:
-            model_dict[key] = force_unicode(value)
-    return model_dict
+            json_response = encoder(indent).encode(data)
+        HttpResponse.__init__(self, json_response, mimetype="text/javascript")
 
 
-class API_JSONEncoder(JSONEncoder):
-    """Help encode data into JSON."""
-    def default(self, obj):
-        if isinstance(obj, QuerySet):
-            return [jsonify_model(o) for o in obj]
-        if isinstance(obj, Model):
-            return jsonify_model(obj)
-        return JSONEncoder.default(self, obj)
+def unique_slug(field, value, taken):
+    """
+    Generate a unique slug for an `AutoSlugField` the same way the field
+    does on save, but checking against a set of `taken` slugs instead of
+    querying the database for each candidate. The new slug is added to
+    `taken`.
+    """
+    original_slug = slug = crop_slug(field, field.slugify(value) or
+                                     field.model._meta.module_name)
+    index = 1
+    while slug in taken:
+        index += 1
+        tail_length = len(field.index_sep) + len(str(index))
+        if field.max_length < len(original_slug) + tail_length:
+            original_slug = original_slug[:field.max_length - tail_length]
+        slug = '%s%s%d' % (original_slug, field.index_sep, index)
+    taken.add(slug)
+    return slug
 
 
-class JSONResponse(HttpResponse):
-    """Return an HTTP response that's JSON content."""
-    status_code = 200
+def bulk_insert(model, instances, batch_size=500):
+    """
+    Insert model instances with a single `executemany` per batch. Django
+    1.3 has no `bulk_create`, and like it this skips `save()` and the
+    `post_save` signal.
+    """
+    qn = connection.ops.quote_name
+    fields = [f for f in model._meta.local_fields
+              if not isinstance(f, AutoField)]
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        qn(model._meta.db_table),
+        ', '.join(qn(f.column) for f in fields),
+        ', '.join(['%s'] * len(fields)))
+    cursor = connection.cursor()
+    for start in xrange(0, len(instances), batch_size):
+        cursor.executemany(sql, [
+            [f.get_db_prep_save(getattr(obj, f.attname), connection=connection)
+             for f in fields]
+            for obj in instances[start:start + batch_size]])
 
-    def __init__(self, data):
-        json_response = dumps(data, ensure_ascii=False, indent=2, cls=API_JSONEncoder)
-        HttpResponse.__init__(self, json_response, mimetype="text/javascript")
+
+def bulk_update(model, field_name, values, batch_size=500):
+    """
+    Set a single field on many rows with one `executemany` per batch.
+    `values` is a list of `(pk, value)` pairs.
+    """
+    qn = connection.ops.quote_name
+    field = model._meta.get_field(field_name)
+    sql = 'UPDATE %s SET %s = %%s WHERE %s = %%s' % (
+        qn(model._meta.db_table), qn(field.column), qn(model._meta.pk.column))
+    cursor = connection.cursor()
+    for start in xrange(0, len(values), batch_size):
+        cursor.executemany(sql, [
+            (field.get_db_prep_save(value, connection=connection), pk)
+            for pk, value in values[start:start + batch_size]])
+
+
+def prefetch_tags(instances):
+    """
+    Load the tags for a list of model instances with a single query, grouped
+    by content type and object id, and attach them to each instance as a
+    `tag_list`. Returns the instances as a list.
+    """
+    instances = list(instances)
+    by_key, object_ids = {}, {}
+    for instance in instances:
+        content_type = ContentType.objects.get_for_model(instance)
+        by_key[(content_type.pk, instance.pk)] = instance
+        object_ids.setdefault(content_type.pk, []).append(instance.pk)
+        instance.tag_list = []
+    if not instances:
+        return instances
+    lookup = Q()
+    for content_type, ids in object_ids.items():
+        lookup |= Q(content_type=content_type, object_id__in=ids)
+    items = TaggedItem.objects.filter(lookup).select_related('tag')
+    for item in items.order_by('pk'):
+        by_key[(item.content_type_id, item.object_id)].tag_list.append(item.tag)
+    return instances
+
+
+def filter_by_tags(queryset, names, match_any=False):
+    """
+    Narrow a queryset of tagged resources to those with all of the named
+    tags, or with any of them when `match_any` is set.
+    """
+    if not names:
+        return queryset
+    if match_any:
+        return queryset.filter(tags__name__in=names).distinct()
+    for name in names:
+        queryset = queryset.filter(tags__name=name)
+    return queryset
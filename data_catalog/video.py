@@ -0,0 +1,102 @@
+"""
+A registry of the video hosts a project's video can come from, with
+precompiled patterns for pulling out the video id and building the URL to
+embed it with.
+"""
+
+import re
+
+
+class UnknownVideoURL(ValueError):
+    """Raised when a video URL isn't from any registered provider."""
+
+
+class Provider(object):
+    """A video host: how to find a video's id, and where to embed it."""
+
+    def __init__(self, name, pattern, embed_url):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.embed_url = embed_url
+
+    def video_id(self, url):
+        match = self.pattern.search(url)
+        return match and match.group(1)
+
+
+PROVIDERS = []
+
+
+def register(provider):
+    """Add a provider, which is tried after those already registered."""
+    PROVIDERS.append(provider)
+    return provider
+
+
+register(Provider(
+    'youtube',
+    r'(?:youtube\.com/(?:watch\?(?:.*&)?v=|embed/|v/|shorts/)|youtu\.be/)'
+    r'([\w-]+)',
+    'http://www.youtube.com/embed/%s'))
+register(Provider(
+    'vimeo',
+    r'vimeo\.com/(?:.*/)?(\d+)',
+    'http://player.vimeo.com/video/%s?portrait=0&byline=0&title=0'))
+
+
+_parsed = {}
+PARSED_CACHE_SIZE = 10000
+
+
+def find_provider(url):
+    """
+    Return the `(provider, video id)` for a video URL, or `(None, None)`
+    if no provider recognizes it. Results are memoized.
+    """
+    parsed = _parsed.get(url)
+    if parsed is None:
+        parsed = None, None
+        for provider in PROVIDERS:
+            video_id = provider.video_id(url)
+            if video_id:
+                parsed = provider, video_id
+                break
+        if len(_parsed) >= PARSED_CACHE_SIZE:
+            _parsed.clear()
+        _parsed[url] = parsed
+    return parsed
+
+
+def parse(url):
+    """Return the `(provider name, video id)` for a video URL."""
+    provider, video_id = find_provider(url)
+    return provider and provider.name, video_id
+
+
+def embed_url(url):
+    """The URL to embed a video with. Raises `UnknownVideoURL` if none."""
+    provider, video_id = find_provider(url)
+    if provider is None:
+        raise UnknownVideoURL('Not a YouTube or Vimeo link: %s' % url)
+    return provider.embed_url % video_id
+
+
+def resolve_embed_urls(projects):
+    """
+    Set the `embed_url` of many projects in one pass, parsing each distinct
+    video URL once. Projects whose URLs aren't recognized are left alone
+    and returned, rather than stopping the rest.
+    """
+    embeds, failed = {}, []
+    for project in projects:
+        url = project.video_url
+        if url not in embeds:
+            try:
+                embeds[url] = embed_url(url)
+            except UnknownVideoURL:
+                embeds[url] = None
+        if embeds[url] is None:
+            failed.append(project)
+        else:
+            project.embed_url = embeds[url]
+    return failed
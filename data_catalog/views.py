@@ -1,18 +1,28 @@
 """Views for the Boston Data Catalog."""
 
-from urllib2 import urlopen
+from hashlib import md5
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.mail import send_mail
-from django.core.paginator import Paginator, EmptyPage
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.http import Http404
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.decorators.cache import cache_page
-from django.utils import simplejson as json
-from taggit.models import Tag
-
+from django.template.loader import render_to_string
+from data_catalog import caching, databases
+from data_catalog.databases import replica_reads
+from data_catalog.autocomplete import tag_index
+from data_catalog.facets import filter_query, listing_facets
 from data_catalog.forms import AppForm, DataForm, ProjectForm, SupportForm
-from data_catalog.models import App, Data, Project, Supporter, User
-from data_catalog.utils import JSONResponse
+from data_catalog.models import (App, Data, Project, Supporter, Thumbnail,
+                                 User)
+from data_catalog.pagination import (CursorPaginator, InvalidCursor,
+                                     decode_cursor, encode_cursor)
+from data_catalog.utils import JSONResponse, filter_by_tags, prefetch_tags
+
+
+SUPPORTERS_PER_PAGE = 48
+COMMUNITY_BATCH_SIZE = 40
 
 
 def home(request):
@@ -20,67 +30,171 @@ def home(request):
     return render(request, 'home.html')
 
 
+@replica_reads
 def apps(request):
     """Render the apps page."""
-    context = create_context(request, 'apps')
-    return render(request, 'apps.html', context)
+    return render_listing(request, 'apps', 'apps.html')
 
 
-@cache_page(60 * 10)
+@replica_reads
 def data(request):
-    """Render the data page. Currently caching for ten minutes."""
-    ping_datacouch()
-    context = create_context(request, 'data')
-    return render(request, 'data.html', context)
-
-
-def ping_datacouch():
-    """Ping Data Couch to see if there are any new data sets."""
-    user = 'newurbanmechs'
-    url = 'http://datacouch.com/api/datasets/' + user
-    json_data = urlopen(url).read()
-    data_sets = json.loads(json_data)
-    rows = data_sets['rows']
-    Data.check_exists(rows)
+    """
+    Render the data page. New data sets from Data Couch are stored by the
+    `sync_datacouch` command.
+    """
+    return render_listing(request, 'data', 'data.html', layout='list-view')
 
 
+@replica_reads
 def projects(request):
     """Render all the available projects."""
-    context = create_context(request, 'projects')
-    return render(request, 'projects.html', context)
+    return render_listing(request, 'projects', 'projects.html')
+
+
+def render_listing(request, model_name, template, layout=None):
+    """
+    Render a listing page around a cached fragment of its resources. The
+    fragment is kept per page, tag filter and layout until a resource of
+    that type is saved, deleted or tagged, or the tag counts are refreshed.
+    """
+    path = model_name.rstrip('s')
+    filters = filter_query(sorted(request.GET.getlist('tag')),
+                           request.GET.get('match') == 'any')
+
+    def key(page):
+        if filters:
+            return '%s-%s' % (page, md5(filters).hexdigest())
+        return page
+
+    page = listing_page(request)
+    listing = None
+    if page is not None:
+        listing = caching.get_listing(path, key(page), layout)
+    if listing is None:
+        context = create_context(request, model_name)
+        context['layout'] = layout
+        listing = render_to_string('multiple_resources.html', context)
+        # Pages out of range show the last page, so they're cached as that
+        # page rather than under keys of their own.
+        page = getattr(context['resources'], 'number', page)
+        if databases.can_cache():
+            caching.set_listing(path, key(page), layout, listing)
+    context = add_breadcrumb(model_name, {'path': path, 'listing': listing})
+    return render(request, template, context)
+
+
+def listing_page(request):
+    """
+    The page of a listing a request asks for, as it's cached: the page
+    number, with anything that isn't one meaning the first page, or the
+    primary key an `after` token seeks past. `None` when only counting the
+    resources can tell which page will be shown.
+    """
+    after = request.GET.get('after')
+    if after:
+        try:
+            return 'after-%d' % decode_cursor(after)
+        except InvalidCursor:
+            raise Http404
+    if settings.CURSOR_PAGINATION:
+        return 1
+    try:
+        number = int(request.GET.get('page', 1))
+    except ValueError:
+        return 1
+    if number < 1:
+        return None
+    return number
 
 
 def create_context(request, model_name):
     """
     This function reduces boilerplate by creating a common context dictionary,
-    and also determines whether the number of model instances returned can be
-    reduced by a tag.
+    and also narrows the resources by any `tag` filters: all of them, or any
+    of them with `match=any`.
     """
     page = request.GET.get('page')
+    after = request.GET.get('after')
+    tags = request.GET.getlist('tag')
+    match_any = request.GET.get('match') == 'any'
     available_models = {'apps': App, 'data': Data, 'projects': Project}
     model = available_models[model_name]
-    resources = model.objects.all()
-    paginator = Paginator(resources, 9)
-    try:
-        resources = paginator.page(page)
-    except EmptyPage:
-        resources = paginator.page(paginator.num_pages)
-    except:
-        resources = paginator.page(1)
+    resources = filter_by_tags(model.objects.all(), tags, match_any)
+    if after or settings.CURSOR_PAGINATION:
+        # Seek past the last row instead of counting and offsetting, which
+        # keeps deep pages of large catalogs fast.
+        try:
+            resources = CursorPaginator(resources, 9).page(after)
+        except InvalidCursor:
+            raise Http404
+    else:
+        paginator = Paginator(resources, 9)
+        try:
+            resources = paginator.page(page)
+        except EmptyPage:
+            resources = paginator.page(paginator.num_pages)
+        except:
+            resources = paginator.page(1)
+    resources.object_list = Thumbnail.prefetch(
+        prefetch_tags(resources.object_list))
     path = model_name.rstrip('s')
-    context = {'path': path, 'resources': resources}
+    context = {
+        'path': path,
+        'resources': resources,
+        'tags': tags,
+        'match_any': match_any,
+        'facets': listing_facets(path, tags, match_any),
+        'filter_query': filter_query(tags, match_any),
+        'match_query': filter_query(tags, not match_any),
+    }
     context = add_breadcrumb(model_name, context)
     return context
 
 
 def community(request):
-    """Render the community page."""
-    featured = Project.featured_project()
-    community = User.objects.all()
-    context = {'featured': featured, 'community': community}
+    """
+    Render the community page with the first batch of members. The rest are
+    loaded from `community_members` as the carousel scrolls.
+    """
+    members, next_token = member_fragments()
+    context = {'members': members, 'next_token': next_token}
     return render(request, 'community.html', context)
 
 
+def community_members(request):
+    """The next batch of community members' gravatars as JSON."""
+    try:
+        members, next_token = member_fragments(request.GET.get('after'))
+    except InvalidCursor:
+        raise Http404
+    return JSONResponse({'members': members, 'next': next_token})
+
+
+def member_fragments(after=None, per_page=COMMUNITY_BATCH_SIZE):
+    """
+    Return a batch of rendered member gravatars after the given token,
+    and the token for the next batch. Users are only loaded for fragments
+    that aren't cached already.
+    """
+    users = User.objects.order_by('pk')
+    if after:
+        users = users.filter(pk__gt=decode_cursor(after))
+    user_ids = list(users.values_list('pk', flat=True)[:per_page + 1])
+    next_token = None
+    if len(user_ids) > per_page:
+        user_ids = user_ids[:per_page]
+        next_token = encode_cursor(user_ids[-1])
+    fragments = caching.get_member_fragments(user_ids)
+    missing = [pk for pk in user_ids if pk not in fragments]
+    if missing:
+        rendered = dict((user.pk, render_to_string('community_member.html',
+                                                   {'member': user}))
+                        for user in User.objects.filter(pk__in=missing))
+        caching.set_member_fragments(rendered)
+        fragments.update(rendered)
+    return [fragments[pk] for pk in user_ids if pk in fragments], next_token
+
+
 def community_member(request, username):
     """Render the profile page of a community member by username."""
     profile = User.objects.get(username=username)
@@ -107,19 +221,35 @@ def individual_resource(request, resource_type, slug):
     available_resources = {'app': App, 'project': Project}
     model = available_resources[resource_type]
     resource = get_object_or_404(model, slug=slug)
+    prefetch_tags([resource])
     context = {
         'resource': resource,
         'path': resource_type,
         'resource_type': resource_type
     }
     if resource_type == 'project':
-        supporters = resource.supporters.all()
-        context.update({'supporters': supporters})
+        context['supporters'] = supporters_page(resource,
+                                                request.GET.get('supporters'))
     template = 'individual_resource/resource.html'
     context = add_breadcrumb(resource_type, context)
     return render(request, template, context)
 
 
+def supporters_page(project, page, per_page=SUPPORTERS_PER_PAGE):
+    """
+    One page of a project's supporters along with their users. The page
+    count comes from the project's `supporter_count` rather than a count
+    query.
+    """
+    supporters = project.supporters.select_related('user').order_by('pk')
+    paginator = Paginator(supporters, per_page)
+    paginator._count = project.supporter_count
+    try:
+        return paginator.page(page or 1)
+    except (EmptyPage, PageNotAnInteger):
+        return paginator.page(1)
+
+
 def redirect_to_data_couch(request, slug):
     """Redirect to Data Couch so that a user can see an actual data set."""
     resource = Data.objects.get(slug=slug)
@@ -161,7 +291,7 @@ def my_projects(request):
     user = request.user
     if not user.is_authenticated():
         return redirect(projects)
-    projects = Project.objects.filter(user=user)
+    projects = prefetch_tags(Project.objects.filter(user=user))
     context = {'projects': projects}
     return render(request, 'my_projects.html', context)
 
@@ -205,7 +335,10 @@ def support(request):
 
 
 def support_project(request, project_slug):
-    """Allow a user to support a project."""
+    """
+    Allow a user to support a project. Supporting it again, say from a
+    double click, changes nothing.
+    """
     user = request.user
     if not user.is_authenticated():
         url = '/login/?next=project/%s' % (project_slug)
@@ -213,10 +346,12 @@ def support_project(request, project_slug):
     elif request.method == 'POST':
         form = SupportForm(request.POST)
         if form.is_valid():
-            project = get_object_or_404(Project, slug=project_slug)
-            Supporter.add_project_supporter(project, user)
+            try:
+                count = Supporter.add_project_supporter(project_slug, user)
+            except Project.DoesNotExist:
+                raise Http404
             if request.is_ajax():
-                success = {'success': True}
+                success = {'success': True, 'supporter_count': count}
                 return JSONResponse(success)
             else:
                 url = '/project/%s' % (project_slug)
@@ -227,19 +362,19 @@ def support_project(request, project_slug):
 def autocomplete(request):
     """
     Handle all autocomplete requests from the data catalog's
-    search bar.
+    search bar. Returns the most used tags matching the query, up to
+    `limit` of them.
     """
     data = {}
     query = request.GET.get('q')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), 100))
+    except ValueError:
+        limit = 10
     if not query:
         data['tags'] = None
     else:
-        results = Tag.objects.filter(name__icontains=query).values('name')
-        if results:
-            tags = [tag['name'] for tag in results]
-        else:
-            tags = []
-        data['tags'] = tags
+        data['tags'] = tag_index.search(query, limit)
     return JSONResponse(data)
 
 
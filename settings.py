@@ -4,7 +4,8 @@ import os
 from django.conf.global_settings import TEMPLATE_CONTEXT_PROCESSORS
 from data_catalog.settings_city import (CITY_NAME, CATALOG_URL,
                                         ACCOUNT_ACTIVATION_DAYS, DB_PATH,
-                                        LOGIN_REDIRECT_URL, DEFAULT_FROM_EMAIL)
+                                        LOGIN_REDIRECT_URL, DEFAULT_FROM_EMAIL,
+                                        DATACOUCH_USER)
 
 DEBUG = True
 TEMPLATE_DEBUG = DEBUG
@@ -32,12 +33,72 @@ TEMPLATE_CONTEXT_PROCESSORS += (
     'data_catalog.context_processors.settings_context',
 )
 
+# Page the apps, data and projects listings with `after` tokens instead of
+# page numbers. Large catalogs should turn this on, since it skips the
+# `COUNT(*)` and `OFFSET` that page numbers need.
+CURSOR_PAGINATION = False
+
+# Listing invalidation only reaches other processes through a shared cache:
+# the web processes and every worker (`sync_datacouch`, `refresh_tag_counts`,
+# `process_thumbnails` and so on) must use the same one. Files on local disk
+# are shared by processes on one server; point this at memcached when there
+# are more servers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': DB_PATH + 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# How long rendered listing pages stay cached. Saving or tagging a
+# resource moves its listings onto a new cache version right away, so
+# this can be long, but only with a shared cache. A per-process cache never
+# hears about other processes' changes, so it keeps them no longer than
+# LOCAL_CACHE_TIMEOUT.
+LISTING_CACHE_TIMEOUT = 60 * 60 * 24
+LOCAL_CACHE_TIMEOUT = 60 * 10
+
+# When projects are scheduled in the featured rotation, each one is shown
+# for this many seconds before the next takes its place.
+FEATURED_ROTATION_SECONDS = 60 * 60 * 24
+
 # Database settings below...
-DATABASE_ENGINE = 'django.db.backends.sqlite3'
-if os.path.exists('/home/dotcloud'):
-    DATABASE_NAME = '/home/dotcloud/test.db'
-else:
-    DATABASE_NAME = 'test.db'
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': DB_PATH + 'test.db',
+        # Seconds to wait for another connection's write lock before giving
+        # up, rather than failing straight away.
+        'OPTIONS': {'timeout': 20},
+    },
+    # A read replica for the listings, search and the API. Point it at a
+    # copy kept up to date by replication, and set DATABASE_READ_REPLICA.
+    # 'replica': {
+    #     'ENGINE': 'django.db.backends.postgresql_psycopg2',
+    #     'NAME': 'catalog',
+    #     'HOST': 'replica.example.com',
+    # },
+}
+DATABASE_ROUTERS = ('data_catalog.databases.ReplicaRouter',)
+DATABASE_READ_REPLICA = None
+
+# How many seconds the replica can be behind. For that long after a write,
+# the browser that made it reads the pages that use the replica from the
+# primary instead, and nothing read from the replica is cached.
+DATABASE_REPLICA_LAG = 5
+
+# Run on each new SQLite connection. Write-ahead logging lets readers carry
+# on while a write is in progress, instead of waiting for it.
+SQLITE_PRAGMAS = (
+    'journal_mode = WAL',
+    'synchronous = NORMAL',
+)
+
+# Keep database connections open between requests for up to this many
+# seconds, instead of opening one per request. Zero closes them after
+# every request, as Django does by default.
+DATABASE_CONNECTION_MAX_AGE = 0
 
 # Local time zone for this installation. Choices can be found here:
 # http://en.wikipedia.org/wiki/List_of_tz_zones_by_name
@@ -71,6 +132,12 @@ MEDIA_ROOT = 'media'
 # Examples: "http://media.lawrence.com/media/", "http://example.com/media/"
 MEDIA_URL = '/media/'
 
+# The sizes uploaded app and project images are resized to, and the formats
+# each size is saved in, by the `process_thumbnails` worker. WebP is skipped
+# when PIL can't write it.
+THUMBNAIL_SIZES = {'card': (260, 180)}
+THUMBNAIL_FORMATS = ('webp', 'jpeg')
+
 # Absolute path to the directory static files should be collected to.
 # Don't put anything in this directory yourself; store your static files
 # in apps' "static/" subdirectories and in STATICFILES_DIRS.
@@ -94,6 +161,23 @@ STATICFILES_DIRS = (
     'static',
 )
 
+# The site's stylesheets and scripts, concatenated into one file each by
+# `manage.py bundle_static`. Bundles are written to STATIC_BUNDLE_DIR under
+# the first of STATICFILES_DIRS, named after a hash of their contents.
+STATIC_BUNDLES = {
+    'site.css': (
+        'css/bootstrap.css',
+        'css/bootstrap.docs.css',
+        'css/main.css',
+    ),
+    'site.js': (
+        'js/libs/bootstrap/bootstrap-dropdown.js',
+        'js/libs/jquery.backgroundposition.js',
+        'js/bootstrap.main.js',
+    ),
+}
+STATIC_BUNDLE_DIR = 'bundles'
+
 # List of finder classes that know how to find static files in
 # various locations.
 STATICFILES_FINDERS = (
@@ -110,16 +194,35 @@ TEMPLATE_LOADERS = (
     'django.template.loaders.filesystem.Loader',
     'django.template.loaders.app_directories.Loader',
 )
+if not DEBUG:
+    # Parse each template once per process, instead of on every render.
+    TEMPLATE_LOADERS = (
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    )
+
+# Render the header and footer fragments marked with `{% fragment %}` once
+# per process, instead of on every page.
+TEMPLATE_FRAGMENT_CACHING = not DEBUG
 
 MIDDLEWARE_CLASSES = (
+    'data_catalog.profiling.ProfilingMiddleware',
+    'data_catalog.databases.PrimaryCookieMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 )
 
+# The fraction of requests the profiling middleware samples, which it writes
+# to PROFILING_LOG, along with the PROFILING_SLOWEST queries each ran. See
+# `manage.py profiling_report`. Zero turns the middleware off.
+PROFILING_SAMPLE_RATE = 0
+PROFILING_LOG = 'profiling.log'
+PROFILING_LOG_BYTES = 10 * 1024 * 1024
+PROFILING_LOG_BACKUPS = 3
+PROFILING_SLOWEST = 3
+
 ROOT_URLCONF = 'urls'
 
 TEMPLATE_DIRS = (
@@ -144,15 +247,18 @@ INSTALLED_APPS = (
     'south',
     'taggit',
     'haystack',
-    #'debug_toolbar',
 )
 
 HAYSTACK_SITECONF = 'search_sites'
 HAYSTACK_SEARCH_ENGINE = 'whoosh'
 HAYSTACK_WHOOSH_PATH = 'whoosh/site_index'
 
-# Setting needed for Django Debug Toolbar.
-# INTERNAL_IPS = ('127.0.0.1',)
+# Turn on Django Debug Toolbar, for local development only.
+DEBUG_TOOLBAR = False
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS += ('debug_toolbar',)
+    MIDDLEWARE_CLASSES += ('debug_toolbar.middleware.DebugToolbarMiddleware',)
+    INTERNAL_IPS = ('127.0.0.1',)
 
 
 # A sample logging configuration. The only tangible logging
@@ -167,7 +273,15 @@ LOGGING = {
         'mail_admins': {
             'level': 'ERROR',
             'class': 'django.utils.log.AdminEmailHandler'
-        }
+        },
+        'profiling': {
+            'level': 'INFO',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': PROFILING_LOG,
+            'maxBytes': PROFILING_LOG_BYTES,
+            'backupCount': PROFILING_LOG_BACKUPS,
+            'delay': True,
+        },
     },
     'loggers': {
         'django.request': {
@@ -175,5 +289,10 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': True,
         },
+        'data_catalog.profiling': {
+            'handlers': ['profiling'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     }
 }
@@ -172,12 +172,42 @@
         return this;
     }
 
+    ns.event.loadMembers = function(carousel, item, index, state) {
+        // Fetch the next batch of community members as the carousel
+        // nears the end of the ones it has.
+        var list = $('#mycarousel'),
+            next = list.attr('data-next');
+
+        if (!next || ns.cache.loadingMembers || index < carousel.size() - 5) {
+            return;
+        }
+        ns.cache.loadingMembers = true;
+        $.ajax({
+            url: '/community/members',
+            dataType: 'json',
+            data: {
+                after: next
+            },
+            success: function(data) {
+                var size = carousel.size();
+                $.each(data.members, function(i, member) {
+                    carousel.add(size + i + 1, member);
+                });
+                carousel.size(size + data.members.length);
+                list.attr('data-next', data.next || '');
+                ns.cache.loadingMembers = false;
+            }
+        });
+    }
+
     ns.dom.communityScroller = function() {
-        var carousel = $('#mycarousel');
+        var carousel = $('#mycarousel'),
+            more = !!carousel.attr('data-next');
         if (carousel.length > 0) {
             carousel.jcarousel({
                 scroll: 5,
-                wrap: 'circular'
+                wrap: more ? 'last' : 'circular',
+                itemLastInCallback: more ? ns.event.loadMembers : null
             });
         }
         return this;
@@ -5,6 +5,8 @@ from django.conf import settings
 from django.conf.urls.defaults import patterns, include, url
 from django.views.generic.simple import direct_to_template
 
+from data_catalog.search import SearchView
+
 admin.autodiscover()
 
 
@@ -15,6 +17,7 @@ urlpatterns = patterns('data_catalog.views',
     url(r'^faq$', direct_to_template, {'template': 'faq.html'}),
     url(r'^apps$', 'apps'),
     url(r'^community$', 'community'),
+    url(r'^community/members$', 'community_members'),
     url(r'^data$', 'data'),
     url(r'^request/data$', 'request_data'),
     url(r'^projects$', 'projects'),
@@ -29,13 +32,19 @@ urlpatterns = patterns('data_catalog.views',
     url(r'^my/projects$', 'my_projects'),
     url(r'^community/(?P<username>[-\w]+)/$', 'community_member'),
     url(r'^thanks/$', 'thanks'),
-    url(r'^search$', include('haystack.urls')),
+    url(r'^search$', SearchView(), name='haystack_search'),
     url(r'^autocomplete$', 'autocomplete'),
     url(r'^submit/(?P<resource>app|data|project)$', 'submit_resource'),
     url(r'^(?P<name>\w+)\.txt$', 'send_text_file'),
 )
 
 
+urlpatterns += patterns('data_catalog.api',
+    url(r'^api/v1/(?P<resource_type>apps|data|projects)$', 'resources'),
+    url(r'^export/catalog\.(?P<format>ndjson|csv)$', 'export'),
+)
+
+
 urlpatterns += patterns('',
     url(r'^admin/', include(admin.site.urls)),
     url(r'^', include('registration.urls')),